@@ -0,0 +1,212 @@
+"""Block device enumeration from sysfs and the udev database"""
+
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+from .sysfs import read_sysfs_attr
+
+# Size suffixes used by lsblk, powers of 1024
+SIZE_UNITS = ("B", "K", "M", "G", "T", "P", "E")
+
+# Sector size used by /sys/block/*/size regardless of the logical block size
+SYSFS_SECTOR_SIZE = 512
+
+HCTL_PATTERN = re.compile(r"^\d+:\d+:\d+:\d+$")
+
+
+class SysfsBlockDeviceSource:
+    """Reads whole-disk block devices from sysfs and the udev database
+
+    Produces the same fields as `lsblk -p -d -J -o NAME,WWN,VENDOR,MODEL,
+    REV,SERIAL,SIZE,PTUUID,HCTL,TRAN,TYPE` without running a subprocess:
+    vendor, model, revision and HCTL come from /sys/block/*/device, the
+    WWN and serial from the udev database with device/wwid and
+    device/vpd_pg80 as fallback.
+    """
+
+    def __init__(self, sysfs_root: str = "/sys", udev_root: str = "/run/udev/data",
+                 logger: Optional[logging.Logger] = None):
+        """Initialize the block device source
+
+        Args:
+            sysfs_root: Root of the sysfs tree
+            udev_root: Directory of the udev database
+            logger: Logger instance
+        """
+        self.sysfs_root = sysfs_root
+        self.udev_root = udev_root
+        self.logger = logger or logging.getLogger(__name__)
+
+    def is_available(self) -> bool:
+        """Check if sysfs block devices can be read"""
+        return os.path.isdir(os.path.join(self.sysfs_root, "block"))
+
+    def get_block_devices(self) -> List[Dict[str, str]]:
+        """Get all whole-disk block devices
+
+        Returns:
+            List of dicts with lsblk field names (name, wwn, vendor, model,
+            rev, serial, size, ptuuid, hctl, tran, type)
+        """
+        block_dir = os.path.join(self.sysfs_root, "block")
+        devices = []
+
+        for kernel_name in sorted(os.listdir(block_dir)):
+            device = self._read_device(os.path.join(block_dir, kernel_name), kernel_name)
+            if device:
+                devices.append(device)
+
+        self.logger.debug(f"Read {len(devices)} block devices from sysfs")
+        return devices
+
+    def get_block_device(self, kernel_name: str) -> Optional[Dict[str, str]]:
+        """Get a single block device
+
+        Args:
+            kernel_name: Kernel device name (e.g. sda)
+
+        Returns:
+            Device fields as returned by get_block_devices(), or None if it does not exist
+        """
+        block_path = os.path.join(self.sysfs_root, "block", kernel_name)
+        if not os.path.isdir(block_path):
+            return None
+        return self._read_device(block_path, kernel_name)
+
+    def _read_device(self, block_path: str, kernel_name: str) -> Optional[Dict[str, str]]:
+        """Read one block device
+
+        Args:
+            block_path: Path of the device in /sys/block
+            kernel_name: Kernel device name (e.g. sda, nvme0n1, dm-0)
+
+        Returns:
+            Device fields, or None for devices lsblk would not show
+        """
+        # Like lsblk, skip RAM disks and unused loop devices
+        if kernel_name.startswith("ram"):
+            return None
+        if kernel_name.startswith("loop") and read_sysfs_attr(block_path, "size") in ("", "0"):
+            return None
+
+        udev = self._read_udev_properties(read_sysfs_attr(block_path, "dev"))
+        device_path = os.path.join(block_path, "device")
+
+        name = f"/dev/{kernel_name}"
+        device_type = "disk"
+        if kernel_name.startswith("dm-"):
+            dm_name = read_sysfs_attr(block_path, "dm/name")
+            if dm_name:
+                name = f"/dev/mapper/{dm_name}"
+            device_type = "mpath" if read_sysfs_attr(block_path, "dm/uuid").startswith("mpath-") else "dm"
+        elif kernel_name.startswith("loop"):
+            device_type = "loop"
+        elif kernel_name.startswith("sr"):
+            device_type = "rom"
+
+        return {
+            "name": name,
+            "wwn": self._get_wwn(block_path, udev),
+            "vendor": read_sysfs_attr(device_path, "vendor"),
+            "model": read_sysfs_attr(device_path, "model") or udev.get("ID_MODEL", ""),
+            "rev": read_sysfs_attr(device_path, "rev") or read_sysfs_attr(device_path, "firmware_rev"),
+            "serial": self._get_serial(device_path, udev),
+            "size": self._format_size(read_sysfs_attr(block_path, "size")),
+            "ptuuid": udev.get("ID_PART_TABLE_UUID", ""),
+            "hctl": self._get_hctl(device_path),
+            "tran": self._get_transport(kernel_name, device_path, udev),
+            "type": device_type
+        }
+
+    def _get_wwn(self, block_path: str, udev: Dict[str, str]) -> str:
+        """Get the WWN as printed by lsblk (0x-prefixed NAA, or eui.)"""
+        wwn = udev.get("ID_WWN_WITH_EXTENSION") or udev.get("ID_WWN")
+        if wwn:
+            return wwn
+
+        wwid = read_sysfs_attr(block_path, "device/wwid") or read_sysfs_attr(block_path, "wwid")
+        if wwid.startswith("naa."):
+            return f"0x{wwid[4:].lower()}"
+        if wwid.startswith("eui."):
+            return wwid.lower()
+        return ""
+
+    def _get_serial(self, device_path: str, udev: Dict[str, str]) -> str:
+        """Get the serial number from udev, VPD page 0x80 or the NVMe controller"""
+        serial = udev.get("ID_SCSI_SERIAL") or udev.get("ID_SERIAL_SHORT")
+        if serial:
+            return serial
+
+        # VPD page 0x80: 4 byte header, byte 3 is the length of the serial
+        try:
+            with open(os.path.join(device_path, "vpd_pg80"), 'rb') as f:
+                page = f.read()
+            if len(page) > 4:
+                return page[4:4 + page[3]].decode('ascii', errors='replace').strip()
+        except OSError:
+            pass
+
+        return read_sysfs_attr(device_path, "serial")
+
+    def _get_hctl(self, device_path: str) -> str:
+        """Get the SCSI host:channel:target:lun of a device"""
+        try:
+            entries = os.listdir(os.path.join(device_path, "scsi_device"))
+        except OSError:
+            return ""
+        return next((entry for entry in entries if HCTL_PATTERN.match(entry)), "")
+
+    def _get_transport(self, kernel_name: str, device_path: str, udev: Dict[str, str]) -> str:
+        """Get the transport type (sas, sata, nvme, usb)"""
+        if kernel_name.startswith("nvme"):
+            return "nvme"
+        if os.path.exists(os.path.join(device_path, "sas_address")):
+            return "sas"
+
+        bus = udev.get("ID_BUS", "")
+        if bus == "ata":
+            return "sata"
+        return bus if bus in ("usb", "scsi") else ""
+
+    def _read_udev_properties(self, major_minor: str) -> Dict[str, str]:
+        """Read the udev properties of a block device
+
+        Args:
+            major_minor: Device number as 'major:minor'
+
+        Returns:
+            Dict of udev properties (E: lines of the database entry)
+        """
+        properties = {}
+        if not major_minor:
+            return properties
+
+        try:
+            with open(os.path.join(self.udev_root, f"b{major_minor}"), 'r', errors='replace') as f:
+                for line in f:
+                    if line.startswith("E:") and "=" in line:
+                        key, _, value = line[2:].rstrip("\n").partition("=")
+                        properties[key] = value
+        except OSError:
+            pass
+
+        return properties
+
+    @staticmethod
+    def _format_size(sectors: str) -> str:
+        """Format a size in 512 byte sectors like lsblk (e.g. '3.6T', '500G')"""
+        if not sectors.isdigit():
+            return ""
+
+        size = float(int(sectors) * SYSFS_SECTOR_SIZE)
+        unit = 0
+        while size >= 1024 and unit < len(SIZE_UNITS) - 1:
+            size /= 1024
+            unit += 1
+
+        formatted = f"{size:.1f}"
+        if formatted.endswith(".0"):
+            formatted = formatted[:-2]
+        return f"{formatted}{SIZE_UNITS[unit]}"
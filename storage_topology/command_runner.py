@@ -0,0 +1,181 @@
+"""Asyncio-based subprocess runner for controller CLI tools"""
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, List, Optional, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+
+@dataclass
+class CommandResult:
+    """Result of a finished command"""
+
+    cmd: List[str]                   # Executed command
+    returncode: int                  # Exit status
+    output: bytes                    # Captured output (stdout, optionally merged with stderr)
+    elapsed: float = 0.0             # Wall-clock run time in seconds
+
+    def check(self) -> bytes:
+        """Return the output, raising CalledProcessError on a non-zero exit status
+
+        Raises:
+            subprocess.CalledProcessError: If the command failed
+        """
+        if self.returncode != 0:
+            raise subprocess.CalledProcessError(self.returncode, self.cmd, output=self.output)
+        return self.output
+
+
+class CommandRunner:
+    """Runs CLI commands as asyncio subprocesses
+
+    Many invocations can run concurrently on one event loop without a
+    thread per call. Every call has an optional timeout after which the
+    child process is killed; cancelled calls kill their child as well.
+    An optional deadline caps the timeout of every call, so that no
+    command runs past it. Synchronous wrappers are provided for callers
+    outside an event loop.
+    """
+
+    DEFAULT_MAX_CONCURRENCY = 4
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 timeout: Optional[float] = None, deadline: Optional[float] = None,
+                 logger: Optional[logging.Logger] = None):
+        """Initialize the command runner
+
+        Args:
+            max_concurrency: Default number of commands run at the same time by run_many()
+            timeout: Default per-command timeout in seconds (None for no timeout)
+            deadline: Absolute time.monotonic() value after which no command may run
+            logger: Logger instance
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.deadline = deadline
+        self.logger = logger or logging.getLogger(__name__)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, or None if there is no deadline"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    async def run_async(self, cmd: Sequence[str], timeout: Optional[float] = None,
+                        merge_stderr: bool = True) -> CommandResult:
+        """Run a single command
+
+        Args:
+            cmd: Command to execute as list of strings
+            timeout: Timeout in seconds (default: runner timeout)
+            merge_stderr: Whether stderr is captured together with stdout (otherwise inherited)
+
+        Returns:
+            CommandResult of the finished command
+
+        Raises:
+            subprocess.TimeoutExpired: If the command did not finish in time
+                or the deadline has already passed
+            OSError: If the command could not be started
+        """
+        cmd = list(cmd)
+        timeout = self.timeout if timeout is None else timeout
+
+        remaining = self.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                self.logger.debug(f"Deadline exceeded, not running: {' '.join(cmd)}")
+                raise subprocess.TimeoutExpired(cmd, 0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        started = time.monotonic()
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT if merge_stderr else None,
+            # Own process group, so a timeout also kills helpers spawned by the tool
+            start_new_session=True
+        )
+
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            self.logger.debug(f"Killed command after {timeout:.1f}s: {' '.join(cmd)}")
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+
+        return CommandResult(cmd=cmd, returncode=process.returncode, output=output,
+                             elapsed=time.monotonic() - started)
+
+    async def run_many_async(self, cmds: Sequence[Sequence[str]], timeout: Optional[float] = None,
+                             max_concurrency: Optional[int] = None
+                             ) -> List[Union[CommandResult, Exception]]:
+        """Run many commands concurrently
+
+        Args:
+            cmds: Commands to execute
+            timeout: Per-command timeout in seconds (default: runner timeout)
+            max_concurrency: Maximum number of commands running at once (default: runner setting)
+
+        Returns:
+            List with a CommandResult or the raised exception for each command, in input order
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self.max_concurrency))
+
+        async def run_bounded(cmd: Sequence[str]) -> CommandResult:
+            async with semaphore:
+                return await self.run_async(cmd, timeout)
+
+        return await asyncio.gather(*(run_bounded(cmd) for cmd in cmds), return_exceptions=True)
+
+    def run(self, cmd: Sequence[str], timeout: Optional[float] = None,
+            merge_stderr: bool = True) -> CommandResult:
+        """Synchronous wrapper for run_async()"""
+        return self._run_sync(self.run_async(cmd, timeout, merge_stderr))
+
+    def run_many(self, cmds: Sequence[Sequence[str]], timeout: Optional[float] = None,
+                 max_concurrency: Optional[int] = None) -> List[Union[CommandResult, Exception]]:
+        """Synchronous wrapper for run_many_async()"""
+        if not cmds:
+            return []
+        return self._run_sync(self.run_many_async(cmds, timeout, max_concurrency))
+
+    @staticmethod
+    def _run_sync(coro: Awaitable[T]) -> T:
+        """Run a coroutine to completion from synchronous code
+
+        When called from a thread that already runs an event loop, the
+        coroutine is executed on a private loop in a helper thread.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        """Kill a child process and its process group, then reap it"""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+        await process.wait()
@@ -1,15 +1,29 @@
 """Configuration management for storage topology"""
 
+import hashlib
 import os
 import logging
 from typing import Dict, List, Optional
 import yaml
 
-from .models import EnclosureConfig, DiskMapping
+from .disk_matcher import DiskMatcher
+from .models import (DEFAULT_NVME_ENCLOSURE, Disk, Enclosure, EnclosureConfig, DiskMapping, DiskRule,
+                     NvmeSlotConfig)
+from .state import get_state_file, read_json, write_json
+
+# Use the libyaml loader if PyYAML was built with it, it parses large configs much faster
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 class ConfigManager:
-    """Manages loading and accessing configuration from YAML file"""
+    """Manages loading and accessing configuration from YAML file
+
+    The parsed tables are cached in the state directory, keyed by the path,
+    modification time and size of the configuration file, so an unchanged
+    configuration is loaded without parsing YAML.
+    """
+
+    CACHE_VERSION = 3
 
     def __init__(self, config_file: str = "./storage_topology.conf", logger: Optional[logging.Logger] = None):
         """Initialize configuration manager
@@ -21,10 +35,22 @@ class ConfigManager:
         self.config_file = os.path.expanduser(config_file)
         self.logger = logger or logging.getLogger(__name__)
 
+        # One cache file per configuration path
+        path_hash = hashlib.sha256(os.path.abspath(self.config_file).encode()).hexdigest()[:16]
+        self.cache_file = get_state_file(f"config-cache-{path_hash}.json")
+
         self.enclosures: Dict[str, EnclosureConfig] = {}
         self.disk_mappings: Dict[str, DiskMapping] = {}
+        self.disk_rules: List[DiskRule] = []
+        self.nvme_slots: Dict[str, NvmeSlotConfig] = {}
+
+        # Enclosure configs keyed by their stripped ID, for product ID lookups
+        self._enclosures_by_stripped_id: Dict[str, EnclosureConfig] = {}
 
         self.load()
+        self._add_nvme_enclosure_defaults()
+        self._build_enclosure_index()
+        self.disk_matcher = DiskMatcher(self.disk_mappings, self.disk_rules, logger=self.logger)
 
     def load(self) -> None:
         """Load configuration from YAML file
@@ -41,8 +67,21 @@ class ConfigManager:
         disks:
           - serial: "ABC123"      # Disk serial number
             enclosure: "Top"      # Custom enclosure name
-            slot: 5               # Physical slot number
+            slot: 5               # Physical slot number (omitted: computed slot)
             disk: 1               # Logical disk number
+          - serial_pattern: "WD-WMAYP*"   # Serial glob (or serial_regex)
+            enclosure: "Archive"
+          - wwn_range: ["0x5000c500a0000000", "0x5000c500a00000ff"]
+            enclosure: "Batch 7"
+          - match_enclosure: "50030480:00a0dabf"  # Enclosure ID, logical ID or product ID
+            slot_range: "0-11"    # Controller slot numbers
+            enclosure: "Top"
+            slot: 1               # Physical slot of the first slot in the range
+
+        nvme_slots:
+          - slot: "12"            # PCIe slot name from /sys/bus/pci/slots
+            enclosure: "NVMe"     # Enclosure name (default: PCIe)
+            bay: 1                # Physical bay number (default: slot name)
         ```
         """
         if not os.path.exists(self.config_file):
@@ -50,10 +89,20 @@ class ConfigManager:
             return
 
         try:
+            stat = os.stat(self.config_file)
+            cache_key = {
+                "path": os.path.abspath(self.config_file),
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size
+            }
+            if self._load_cache(cache_key):
+                self.logger.info(f"Loaded user configuration from {self.config_file} (cached)")
+                return
+
             self.logger.info(f"Loading user configuration from {self.config_file}")
 
             with open(self.config_file, 'r') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=YamlLoader)
 
             if not config:
                 self.logger.warning(f"Configuration file {self.config_file} is empty or invalid")
@@ -67,6 +116,12 @@ class ConfigManager:
             if 'disks' in config:
                 self._load_disk_mappings(config['disks'])
 
+            # Load NVMe bay mappings
+            if 'nvme_slots' in config:
+                self._load_nvme_slots(config['nvme_slots'])
+
+            self._save_cache(cache_key)
+
         except yaml.YAMLError as e:
             self.logger.error(f"Error parsing YAML in configuration file: {e}")
         except IOError as e:
@@ -74,6 +129,57 @@ class ConfigManager:
         except Exception as e:
             self.logger.error(f"Unexpected error loading configuration: {e}")
 
+    def _load_cache(self, cache_key: Dict) -> bool:
+        """Load the parsed tables from the cache
+
+        Args:
+            cache_key: Path, modification time and size of the configuration file
+
+        Returns:
+            bool: True if the cache matched the configuration file and was loaded
+        """
+        if not self.cache_file:
+            return False
+
+        data = read_json(self.cache_file)
+        if not isinstance(data, dict) or data.get("version") != self.CACHE_VERSION or data.get("key") != cache_key:
+            return False
+
+        try:
+            enclosures = [EnclosureConfig.from_dict(entry) for entry in data.get("enclosures", [])]
+            disk_mappings = [DiskMapping.from_dict(entry) for entry in data.get("disks", [])]
+            disk_rules = [DiskRule.from_dict(entry) for entry in data.get("disk_rules", [])]
+            nvme_slots = [NvmeSlotConfig.from_dict(entry) for entry in data.get("nvme_slots", [])]
+        except (AttributeError, TypeError, ValueError) as e:
+            self.logger.debug(f"Ignoring invalid configuration cache {self.cache_file}: {e}")
+            return False
+
+        self.enclosures = {config.id: config for config in enclosures}
+        self.disk_mappings = {mapping.serial: mapping for mapping in disk_mappings}
+        self.disk_rules = disk_rules
+        self.nvme_slots = {slot.slot: slot for slot in nvme_slots}
+        return True
+
+    def _save_cache(self, cache_key: Dict) -> None:
+        """Save the parsed tables to the cache
+
+        Args:
+            cache_key: Path, modification time and size of the configuration file
+        """
+        if not self.cache_file:
+            return
+
+        data = {
+            "version": self.CACHE_VERSION,
+            "key": cache_key,
+            "enclosures": [config.to_dict() for config in self.enclosures.values()],
+            "disks": [mapping.to_dict() for mapping in self.disk_mappings.values()],
+            "disk_rules": [rule.to_dict() for rule in self.disk_rules],
+            "nvme_slots": [slot.to_dict() for slot in self.nvme_slots.values()]
+        }
+        if not write_json(self.cache_file, data):
+            self.logger.debug(f"Could not write configuration cache {self.cache_file}")
+
     def _load_enclosures(self, enclosures_data: List[Dict]) -> None:
         """Load enclosure configurations from data
 
@@ -106,7 +212,7 @@ class ConfigManager:
         for disk_config_data in disks_data:
             serial = disk_config_data.get('serial')
             if not serial:
-                self.logger.warning("Skipping disk mapping without serial number")
+                self._load_disk_rule(disk_config_data)
                 continue
 
             try:
@@ -116,6 +222,70 @@ class ConfigManager:
             except Exception as e:
                 self.logger.warning(f"Error loading disk mapping for {serial}: {e}")
 
+    def _load_disk_rule(self, disk_config_data: Dict) -> None:
+        """Load a pattern or range based disk mapping
+
+        Args:
+            disk_config_data: Disk mapping dictionary without serial number
+        """
+        rule_keys = ('serial_pattern', 'serial_regex', 'wwn_range', 'slot_range')
+        if not any(disk_config_data.get(key) for key in rule_keys):
+            self.logger.warning("Skipping disk mapping without serial number, pattern or range")
+            return
+
+        try:
+            disk_rule = DiskRule.from_dict(disk_config_data)
+            self.disk_rules.append(disk_rule)
+            self.logger.debug(f"Loaded disk rule: {disk_rule}")
+        except Exception as e:
+            self.logger.warning(f"Error loading disk rule {disk_config_data}: {e}")
+
+    def _load_nvme_slots(self, slots_data: List[Dict]) -> None:
+        """Load NVMe bay mappings from data
+
+        Args:
+            slots_data: List of PCIe slot mapping dictionaries
+        """
+        self.logger.info(f"Found {len(slots_data)} NVMe slot mappings")
+
+        for slot_config_data in slots_data:
+            slot = slot_config_data.get('slot')
+            if slot is None or slot == "":
+                self.logger.warning("Skipping NVMe slot mapping without slot name")
+                continue
+
+            try:
+                slot_config = NvmeSlotConfig.from_dict(slot_config_data)
+                self.nvme_slots[slot_config.slot] = slot_config
+                self.logger.debug(f"Loaded NVMe slot mapping for slot {slot}: {slot_config}")
+            except Exception as e:
+                self.logger.warning(f"Error loading NVMe slot mapping for slot {slot}: {e}")
+
+    def _add_nvme_enclosure_defaults(self) -> None:
+        """Number NVMe bays as configured unless their enclosure has its own config
+
+        NVMe slot numbers are the physical bay numbers already, so their
+        enclosures default to a config that keeps them unchanged.
+        """
+        names = {DEFAULT_NVME_ENCLOSURE} | {slot.enclosure for slot in self.nvme_slots.values()}
+        for name in names:
+            if name not in self.enclosures:
+                self.enclosures[name] = EnclosureConfig(id=name, name=name, start_slot=1)
+
+    def _build_enclosure_index(self) -> None:
+        """Index the enclosure configs by stripped ID
+
+        IDs without surrounding whitespace take precedence over IDs that
+        only match once stripped.
+        """
+        self._enclosures_by_stripped_id = {}
+        for config_id, config in self.enclosures.items():
+            if isinstance(config_id, str) and config_id == config_id.strip():
+                self._enclosures_by_stripped_id.setdefault(config_id, config)
+        for config_id, config in self.enclosures.items():
+            if isinstance(config_id, str):
+                self._enclosures_by_stripped_id.setdefault(config_id.strip(), config)
+
     def get_enclosure_config(self, logical_id: str = None, enclosure_id: str = None,
                             product_id: str = None) -> Optional[EnclosureConfig]:
         """Get enclosure configuration by ID
@@ -130,37 +300,13 @@ class ConfigManager:
         Returns:
             EnclosureConfig if found, None otherwise
         """
-        # Try to find by product ID first (for storcli)
+        # Try to find by product ID first (for storcli), exact or ignoring surrounding whitespace
         if product_id:
-            product_id_stripped = product_id.strip()
-            self.logger.debug(
-                f"Looking for config with product_id='{product_id}' (stripped='{product_id_stripped}'), "
-                f"available keys: {list(self.enclosures.keys())}"
-            )
-
-            # Try exact match
-            if product_id in self.enclosures:
-                config = self.enclosures[product_id]
-                self.logger.debug(f"Found config for product ID (exact) {product_id}: {config}")
+            config = self.enclosures.get(product_id) or self._enclosures_by_stripped_id.get(product_id.strip())
+            if config:
+                self.logger.debug(f"Found config for product ID {product_id.strip()}: {config}")
                 return config
 
-            # Try stripped version
-            if product_id_stripped in self.enclosures:
-                config = self.enclosures[product_id_stripped]
-                self.logger.debug(f"Found config for product ID (stripped) {product_id_stripped}: {config}")
-                return config
-
-            # Try matching any config key when stripped
-            for config_id, config_entry in self.enclosures.items():
-                if isinstance(config_id, str):
-                    config_id_stripped = config_id.strip()
-                    if config_id_stripped == product_id_stripped:
-                        self.logger.debug(
-                            f"Found config for product ID (matched stripped) '{config_id}' "
-                            f"(stripped='{config_id_stripped}') == '{product_id_stripped}': {config_entry}"
-                        )
-                        return config_entry
-
         # Try by logical ID
         if logical_id and logical_id in self.enclosures:
             config = self.enclosures[logical_id]
@@ -175,6 +321,18 @@ class ConfigManager:
 
         return None
 
+    def match_disk(self, disk: Disk, enclosure: Optional[Enclosure] = None) -> Optional[DiskMapping]:
+        """Get the custom mapping of a disk by serial number, pattern or range
+
+        Args:
+            disk: Disk to look up
+            enclosure: Enclosure of the disk, if known
+
+        Returns:
+            DiskMapping if found (slot 0 keeps the computed slot), None otherwise
+        """
+        return self.disk_matcher.match(disk, enclosure)
+
     def get_disk_mapping(self, serial: str) -> Optional[DiskMapping]:
         """Get custom disk mapping by serial number
 
@@ -192,4 +350,8 @@ class ConfigManager:
 
     def has_disk_mappings(self) -> bool:
         """Check if any custom disk mappings are loaded"""
-        return len(self.disk_mappings) > 0
+        return len(self.disk_mappings) > 0 or len(self.disk_rules) > 0
+
+    def get_nvme_slots(self) -> Dict[str, NvmeSlotConfig]:
+        """Get the NVMe bay mappings keyed by PCIe slot name"""
+        return self.nvme_slots
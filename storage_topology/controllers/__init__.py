@@ -3,5 +3,10 @@
 from .base import BaseController
 from .storcli import StorcliController
 from .sas_ircu import SasIrcuController
+from .sas_end_device import SasEndDeviceController
+from .ses import SesController
+from .nvme import NvmeController
+from .composite import CompositeController
 
-__all__ = ["BaseController", "StorcliController", "SasIrcuController"]
+__all__ = ["BaseController", "StorcliController", "SasIrcuController", "SasEndDeviceController",
+           "SesController", "NvmeController", "CompositeController"]
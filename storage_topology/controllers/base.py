@@ -1,24 +1,31 @@
 """Base controller abstraction"""
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 import logging
 import subprocess
 import json
+import time
 
+from ..command_runner import CommandRunner
+from ..led_timer import LedTimerService
 from ..models import Disk, Enclosure
 
 
 class BaseController(ABC):
     """Abstract base class for storage controllers"""
 
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, runner: Optional[CommandRunner] = None):
         """Initialize the controller
 
         Args:
             logger: Logger instance for output
+            runner: Command runner used to execute CLI tools
         """
         self.logger = logger or logging.getLogger(__name__)
+        self.runner = runner or CommandRunner(logger=self.logger)
+        self.led_timer: Optional[LedTimerService] = None
+        self._complete = True
 
     @abstractmethod
     def is_available(self) -> bool:
@@ -74,6 +81,82 @@ class BaseController(ABC):
         """
         pass
 
+    def get_disk_for_device(self, kernel_name: str) -> Optional[Disk]:
+        """Read the disk behind a single block device again
+
+        Used after hotplug events, so one new or changed disk does not
+        require a full controller scan. Backends that can only list all
+        disks at once keep this default.
+
+        Args:
+            kernel_name: Kernel name of the block device (e.g. 'sda')
+
+        Returns:
+            Disk with its current location, or None if it cannot be resolved on its own
+        """
+        return None
+
+    def may_report_device(self, kernel_name: str) -> bool:
+        """Check if a block device can be one of this backend's disks
+
+        Lets a composite of several backends tell which of them would
+        report a hotplugged device in a full scan. Backends that cannot
+        rule out any device keep this default.
+
+        Args:
+            kernel_name: Kernel name of the block device (e.g. 'sda')
+
+        Returns:
+            bool: False if this backend never reports the device
+        """
+        return True
+
+    def refresh_slot(self, enclosure: str, slot: int, controller: Optional[str] = None) -> Optional[List[Disk]]:
+        """Read a single bay again
+
+        Used after a drive replacement, so one bay does not require a full
+        controller scan. Backends that can only list all disks at once keep
+        this default.
+
+        Args:
+            enclosure: Enclosure ID as reported by this backend
+            slot: Slot number as reported by this backend
+            controller: Controller ID, if known
+
+        Returns:
+            Disks now in the bay (empty if it is empty), or None if the bay cannot be read on its own
+        """
+        return None
+
+    def invalidate_snapshot(self) -> None:
+        """Drop any controller output cached for the current run
+
+        Controllers that capture their raw command output once per run
+        extend this so that the next query talks to the hardware again.
+        """
+        self._complete = True
+
+    def set_led_timer(self, led_timer: Optional[LedTimerService]) -> None:
+        """Attach a timer service that turns LEDs off after --wait without blocking
+
+        Args:
+            led_timer: LED timer service, or None to wait in the foreground
+        """
+        self.led_timer = led_timer
+
+    @property
+    def complete(self) -> bool:
+        """Whether all commands of the current run finished in time"""
+        return self._complete
+
+    def get_incomplete_sources(self) -> List[str]:
+        """Get the sources whose data is incomplete because of timeouts
+
+        Returns:
+            List[str]: Controller types that hit a timeout or the deadline
+        """
+        return [] if self.complete else [self.controller_type]
+
     @property
     @abstractmethod
     def controller_type(self) -> str:
@@ -100,19 +183,21 @@ class BaseController(ABC):
 
         Raises:
             subprocess.CalledProcessError: If command fails and handle_errors is False
+            subprocess.TimeoutExpired: If command times out and handle_errors is False
         """
         self.logger.debug(f"Executing command: {' '.join(cmd)}")
 
         try:
-            output_bytes = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-
-            try:
-                output = output_bytes.decode(decode_method)
-            except UnicodeDecodeError:
-                self.logger.debug(f"{decode_method} decoding failed, falling back to latin-1")
-                output = output_bytes.decode('latin-1')
+            output_bytes = self.runner.run(cmd).check()
+            return self._decode_output(output_bytes, decode_method)
 
-            return output
+        except subprocess.TimeoutExpired as e:
+            self._complete = False
+            if handle_errors:
+                self.logger.error(f"Timeout executing command {' '.join(cmd)}: {e}")
+                return ""
+            else:
+                raise
 
         except subprocess.CalledProcessError as e:
             if handle_errors:
@@ -121,6 +206,143 @@ class BaseController(ABC):
             else:
                 raise
 
+    def _execute_commands(self, cmds: Sequence[List[str]], handle_errors: bool = True,
+                          decode_method: str = 'utf-8', max_concurrency: Optional[int] = None) -> List[str]:
+        """Execute many commands concurrently and return their outputs
+
+        Args:
+            cmds: Commands to execute
+            handle_errors: Whether to handle errors or let the first one propagate
+            decode_method: Method to decode command output
+            max_concurrency: Maximum number of commands running at once
+
+        Returns:
+            List[str]: Output of each command in input order ("" for failed
+            commands when handle_errors is True)
+
+        Raises:
+            subprocess.CalledProcessError: If a command fails and handle_errors is False
+            subprocess.TimeoutExpired: If a command times out and handle_errors is False
+        """
+        for cmd in cmds:
+            self.logger.debug(f"Executing command: {' '.join(cmd)}")
+
+        outputs = []
+        for cmd, result in zip(cmds, self.runner.run_many(cmds, max_concurrency=max_concurrency)):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                outputs.append(self._decode_output(result.check(), decode_method))
+
+            except subprocess.TimeoutExpired as e:
+                self._complete = False
+                if handle_errors:
+                    self.logger.error(f"Timeout executing command {' '.join(cmd)}: {e}")
+                    outputs.append("")
+                else:
+                    raise
+
+            except subprocess.CalledProcessError as e:
+                if handle_errors:
+                    self.logger.error(f"Error executing command {' '.join(cmd)}: {e}")
+                    outputs.append("")
+                else:
+                    raise
+
+        return outputs
+
+    def _turn_off_later(self, off_cmds: List[List[str]], wait_seconds: int,
+                        parts: Optional[List[List[List[str]]]] = None) -> None:
+        """Run LED turn-off commands after wait_seconds
+
+        The commands are handed to the LED timer service when one is
+        attached, so the caller returns immediately. Without it (or if the
+        service cannot be used) this blocks for wait_seconds.
+
+        Args:
+            off_cmds: Commands turning the LEDs off
+            wait_seconds: Number of seconds the LEDs should stay on
+            parts: For each bulk command, the per-LED turn-off commands it covers,
+                so turning one of those LEDs on again cancels only its part
+        """
+        if not off_cmds:
+            return
+
+        if self.led_timer and self.led_timer.schedule(off_cmds, wait_seconds, parts):
+            self.logger.info(f"LEDs will be turned off in {wait_seconds} seconds")
+            return
+
+        time.sleep(wait_seconds)
+
+        off_success = 0
+        off_failed = 0
+        for cmd, result in zip(off_cmds, self.runner.run_many(off_cmds)):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                result.check()
+                off_success += 1
+            except Exception as e:
+                self.logger.debug(f"Turn-off command {' '.join(cmd)} failed: {e}")
+                off_failed += 1
+
+        self.logger.info(f"Ran {off_success} LED turn-off commands after wait period")
+        if off_failed > 0:
+            self.logger.warning(f"Failed to run {off_failed} LED turn-off commands")
+
+    def _cancel_turn_off(self, off_cmds: List[List[str]]) -> None:
+        """Drop pending timed turn-offs, e.g. when an LED is turned on without --wait"""
+        if self.led_timer:
+            self.led_timer.cancel(off_cmds)
+
+    def _write_led_attribute(self, attributes: List[str], value: str) -> Optional[str]:
+        """Switch an LED through a sysfs attribute (SES locate/fault, PCIe slot attention)
+
+        Args:
+            attributes: Paths of the attribute, tried in order until a write
+                succeeds (e.g. one per path to a dual-ported enclosure)
+            value: Value to write ('1' on, '0' off)
+
+        Returns:
+            Path of the written attribute, or None on failure
+        """
+        for attribute in attributes:
+            try:
+                with open(attribute, 'w') as f:
+                    f.write(value)
+                return attribute
+            except OSError as e:
+                self.logger.debug(f"Failed to write {attribute}: {e}")
+
+        return None
+
+    @staticmethod
+    def _led_attribute_off_command(attribute: str) -> List[str]:
+        """Build a command writing 0 to a sysfs LED attribute, for delayed turn-offs"""
+        return ["sh", "-c", 'echo 0 > "$1"', "sh", attribute]
+
+    def _tag_disks(self, disks: List[Disk]) -> List[Disk]:
+        """Tag disks with their source and its completeness
+
+        Args:
+            disks: Disks collected by this controller
+
+        Returns:
+            List[Disk]: The same disks
+        """
+        for disk in disks:
+            disk.source = self.controller_type
+            disk.complete = self.complete
+        return disks
+
+    def _decode_output(self, output_bytes: bytes, decode_method: str = 'utf-8') -> str:
+        """Decode command output, falling back to latin-1"""
+        try:
+            return output_bytes.decode(decode_method)
+        except UnicodeDecodeError:
+            self.logger.debug(f"{decode_method} decoding failed, falling back to latin-1")
+            return output_bytes.decode('latin-1')
+
     def _parse_json_output(self, output: str, error_msg: str = "") -> Dict[str, Any]:
         """Parse JSON output with error handling
 
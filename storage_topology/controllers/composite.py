@@ -0,0 +1,240 @@
+"""Composite controller combining several backends"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from .base import BaseController
+from ..identifiers import normalize_serial, normalize_wwn
+from ..models import Disk, Enclosure
+
+T = TypeVar("T")
+
+
+class CompositeController(BaseController):
+    """Runs several controller backends in parallel and merges their topology
+
+    Used when a system has more than one kind of controller, e.g. a MegaRAID
+    card next to NVMe drives in PCIe slots. The backend listed first keeps
+    its controller IDs as they are, so they stay the same as on a system
+    with only that backend. Controller IDs of the other backends are
+    namespaced with the backend type ('nvme:pcie', 'ses:2') so that disks
+    and enclosures of different backends never collide.
+
+    Backends that see the same hardware (e.g. sas3ircu and the SES sysfs
+    backend on one HBA) report the same disks. Duplicates are dropped by
+    WWN or serial number, keeping the disk of the backend listed first.
+    A disk one backend reports more than once (one path per HBA) is kept
+    as is, so the disk mapper can merge its paths.
+    Enclosures are kept per backend, as every disk refers to the
+    enclosure of its own backend, except that an enclosure whose logical
+    ID an earlier backend already reported is dropped.
+    """
+
+    NAMESPACE_SEPARATOR = ":"
+
+    def __init__(self, controllers: List[BaseController], logger=None):
+        """Initialize CompositeController
+
+        Args:
+            controllers: Available controller backends, in priority order
+            logger: Logger instance
+        """
+        super().__init__(logger)
+        self.controllers = controllers
+
+    @property
+    def controller_type(self) -> str:
+        """Get controller type identifier"""
+        return "composite"
+
+    def is_available(self) -> bool:
+        """Check if any of the backends is available"""
+        return any(controller.is_available() for controller in self.controllers)
+
+    def get_disks(self) -> List[Disk]:
+        """Get disks from all backends with namespaced controller IDs"""
+        disks = []
+        seen_identities = set()
+
+        for controller, controller_disks in self._run_all(lambda c: c.get_disks(), []):
+            # Paths of one disk reported by the same backend (e.g. two HBAs) are all kept for multipath
+            controller_identities = set()
+            for disk in controller_disks:
+                identities = self._disk_identities(disk)
+                if identities & seen_identities:
+                    self.logger.debug(f"Skipping disk {disk.serial} from {controller.controller_type}, "
+                                      f"already reported by another backend")
+                    continue
+                controller_identities |= identities
+                disks.append(replace(disk, controller=self._namespace(controller, disk.controller)))
+            seen_identities |= controller_identities
+
+        return disks
+
+    def get_enclosures(self) -> List[Enclosure]:
+        """Get enclosures from all backends with namespaced controller IDs"""
+        enclosures = []
+        seen_logical_ids = set()
+
+        for controller, controller_enclosures in self._run_all(lambda c: c.get_enclosures(), []):
+            controller_logical_ids = set()
+            for enclosure in controller_enclosures:
+                logical_id = normalize_wwn(enclosure.logical_id)
+                if logical_id and logical_id in seen_logical_ids:
+                    self.logger.debug(f"Skipping enclosure {enclosure.enclosure_id} from "
+                                      f"{controller.controller_type}, already reported by another backend")
+                    continue
+                if logical_id:
+                    controller_logical_ids.add(logical_id)
+                enclosures.append(replace(
+                    enclosure,
+                    controller_id=self._namespace(controller, enclosure.controller_id)
+                ))
+            seen_logical_ids |= controller_logical_ids
+
+        return enclosures
+
+    def locate_disk(self, disk: Disk, turn_off: bool = False, wait_seconds: Optional[int] = None) -> bool:
+        """Turn on or off the identify LED using the backend owning the disk"""
+        controller, controller_id = self._resolve(disk.controller)
+        if not controller:
+            self.logger.error(f"No controller backend found for disk {disk.dev_name} "
+                              f"(controller {disk.controller})")
+            return False
+
+        return controller.locate_disk(replace(disk, controller=controller_id), turn_off, wait_seconds)
+
+    def locate_all_disks(self, turn_off: bool = False, wait_seconds: Optional[int] = None) -> tuple[int, int]:
+        """Turn on or off the identify LED for all disks on all backends"""
+        success_count = 0
+        failed_count = 0
+
+        for _, (success, failed) in self._run_all(lambda c: c.locate_all_disks(turn_off, wait_seconds), (0, 0)):
+            success_count += success
+            failed_count += failed
+
+        return success_count, failed_count
+
+    def get_disk_for_device(self, kernel_name: str) -> Optional[Disk]:
+        """Read the disk behind a block device from the backend that would report it
+
+        Backends are asked in priority order, skipping those that never
+        report the device. If one that may report it cannot resolve it on
+        its own, None is returned: a full scan would keep that backend's
+        disk and drop the duplicates of lower priority backends.
+        """
+        for controller in self.controllers:
+            if not controller.may_report_device(kernel_name):
+                continue
+            disk = controller.get_disk_for_device(kernel_name)
+            if disk is None:
+                return None
+            return replace(disk, controller=self._namespace(controller, disk.controller))
+        return None
+
+    def may_report_device(self, kernel_name: str) -> bool:
+        """Check if any backend may report a block device"""
+        return any(controller.may_report_device(kernel_name) for controller in self.controllers)
+
+    def refresh_slot(self, enclosure: str, slot: int, controller: Optional[str] = None) -> Optional[List[Disk]]:
+        """Read a single bay again from the backend owning the controller, or from all backends"""
+        if controller:
+            backend, controller_id = self._resolve(controller)
+            backends = [(backend, controller_id)] if backend else []
+        else:
+            backends = [(backend, None) for backend in self.controllers]
+
+        disks = None
+        for backend, controller_id in backends:
+            backend_disks = backend.refresh_slot(enclosure, slot, controller_id)
+            if backend_disks is None:
+                continue
+            disks = (disks or []) + [replace(disk, controller=self._namespace(backend, disk.controller))
+                                     for disk in backend_disks]
+        return disks
+
+    def invalidate_snapshot(self) -> None:
+        """Drop the cached output of all backends"""
+        super().invalidate_snapshot()
+        for controller in self.controllers:
+            controller.invalidate_snapshot()
+
+    def set_led_timer(self, led_timer) -> None:
+        """Attach the LED timer service to all backends"""
+        super().set_led_timer(led_timer)
+        for controller in self.controllers:
+            controller.set_led_timer(led_timer)
+
+    @property
+    def complete(self) -> bool:
+        """Whether all backends finished their commands in time"""
+        return all(controller.complete for controller in self.controllers)
+
+    def get_incomplete_sources(self) -> List[str]:
+        """Get the backends whose data is incomplete because of timeouts"""
+        sources = []
+        for controller in self.controllers:
+            sources.extend(controller.get_incomplete_sources())
+        return sources
+
+    @staticmethod
+    def _disk_identities(disk: Disk) -> set:
+        """Get the identifiers a disk can be recognized by across backends"""
+        identities = set()
+        wwn = normalize_wwn(disk.wwn)
+        if wwn:
+            identities.add(f"wwn:{wwn}")
+        serial = normalize_serial(disk.serial)
+        if serial:
+            identities.add(f"serial:{serial}")
+        return identities
+
+    def _namespace(self, controller: BaseController, controller_id: str) -> str:
+        """Prefix a backend controller ID with the backend type, except for the first backend"""
+        if controller is self.controllers[0]:
+            return controller_id
+        return f"{controller.controller_type}{self.NAMESPACE_SEPARATOR}{controller_id}"
+
+    def _resolve(self, controller_id: str) -> Tuple[Optional[BaseController], str]:
+        """Find the backend for a controller ID
+
+        Args:
+            controller_id: Controller ID of the first backend, or a namespaced
+                controller ID of another backend (e.g. 'nvme:pcie')
+
+        Returns:
+            Tuple of (backend or None, backend controller ID)
+        """
+        backend_type, separator, backend_id = controller_id.partition(self.NAMESPACE_SEPARATOR)
+
+        if separator:
+            for controller in self.controllers:
+                if controller.controller_type == backend_type:
+                    return controller, backend_id
+
+        if not self.controllers:
+            return None, controller_id
+        return self.controllers[0], controller_id
+
+    def _run_all(self, func: Callable[[BaseController], T], default: T) -> List[Tuple[BaseController, T]]:
+        """Run a function on all backends in parallel
+
+        Args:
+            func: Function to call with each backend
+            default: Result used for a backend that raised an exception
+
+        Returns:
+            List of (backend, result) in backend order
+        """
+        def call(controller: BaseController) -> T:
+            try:
+                return func(controller)
+            except Exception as e:
+                self.logger.error(f"Error querying {controller.controller_type} controller: {e}")
+                return default
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self.controllers))) as executor:
+            results = list(executor.map(call, self.controllers))
+
+        return list(zip(self.controllers, results))
@@ -0,0 +1,321 @@
+"""NVMe controller mapping drives to PCIe slots in sysfs"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import glob
+import os
+import re
+
+from .base import BaseController
+from ..block_devices import SysfsBlockDeviceSource
+from ..models import DEFAULT_NVME_ENCLOSURE, Disk, Enclosure, NvmeSlotConfig
+from ..sysfs import read_sysfs_attr
+
+# Controller ID of all NVMe enclosures
+PCIE_CONTROLLER_ID = "pcie"
+
+# PCI function address, e.g. 0000:3b:00.0
+PCI_ADDRESS_PATTERN = re.compile(r"^[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-7]$")
+
+# Namespace entries of a controller: nvme0n1, or nvme0c1n1 with native multipath
+NAMESPACE_PATTERN = re.compile(r"^nvme(\d+)(?:c\d+)?n(\d+)$")
+
+# Trailing number of a PCIe slot name, e.g. 'Slot12' or '3-1'
+SLOT_NUMBER_PATTERN = re.compile(r"(\d+)$")
+
+# Slot key: (controller ID, enclosure ID, slot number)
+SlotKey = Tuple[str, str, int]
+
+
+@dataclass
+class NvmeSnapshot:
+    """NVMe topology read from sysfs once per run"""
+
+    enclosures: List[Enclosure] = field(default_factory=list)
+    disks: List[Disk] = field(default_factory=list)
+    attention: Dict[SlotKey, str] = field(default_factory=dict)  # Slot -> attention indicator attribute
+
+
+class NvmeController(BaseController):
+    """Controller for NVMe drives in hot-plug PCIe slots
+
+    Each controller in /sys/class/nvme is walked up the PCI hierarchy
+    until a device matches the address of a slot in /sys/bus/pci/slots.
+    The slot name is the bay number unless the nvme_slots table of the
+    configuration maps it to an enclosure and bay. Identify LEDs are the
+    slots' attention indicators.
+    """
+
+    def __init__(self, logger=None, runner=None, sysfs_root: str = "/sys",
+                 udev_root: str = "/run/udev/data", slot_table: Optional[Dict[str, NvmeSlotConfig]] = None):
+        """Initialize NvmeController
+
+        Args:
+            logger: Logger instance
+            runner: Command runner used for delayed LED turn-offs
+            sysfs_root: Root of the sysfs tree
+            udev_root: Directory of the udev database
+            slot_table: Configured bays keyed by PCIe slot name
+        """
+        super().__init__(logger, runner)
+        self.cmd = ""
+        self.sysfs_root = sysfs_root
+        self.slot_table = slot_table or {}
+        self.block_devices = SysfsBlockDeviceSource(sysfs_root, udev_root, logger=self.logger)
+
+        # Topology cached for the current run
+        self._snapshot: Optional[NvmeSnapshot] = None
+
+    @property
+    def controller_type(self) -> str:
+        """Get controller type identifier"""
+        return "nvme"
+
+    def is_available(self) -> bool:
+        """Check if any NVMe controller sits in a PCIe slot"""
+        slots = self._get_slot_addresses()
+        return bool(slots) and any(self._find_slot(controller_dir, slots)
+                                   for controller_dir in self._get_controller_dirs())
+
+    def get_snapshot(self) -> NvmeSnapshot:
+        """Get the NVMe topology of the current run, reading sysfs on first use"""
+        if self._snapshot is None:
+            self._snapshot = self._read_topology()
+        return self._snapshot
+
+    def invalidate_snapshot(self) -> None:
+        """Drop the cached topology so the next query reads sysfs again"""
+        super().invalidate_snapshot()
+        self._snapshot = None
+
+    def get_disks(self) -> List[Disk]:
+        """Get all NVMe drives in PCIe slots"""
+        self.logger.info("Getting NVMe disk information")
+        return self._tag_disks(list(self.get_snapshot().disks))
+
+    def get_enclosures(self) -> List[Enclosure]:
+        """Get the enclosures of the PCIe slots"""
+        self.logger.info("Getting NVMe enclosure information")
+        return list(self.get_snapshot().enclosures)
+
+    def may_report_device(self, kernel_name: str) -> bool:
+        """Only NVMe namespaces are reported by this backend"""
+        return bool(NAMESPACE_PATTERN.match(kernel_name))
+
+    def get_disk_for_device(self, kernel_name: str) -> Optional[Disk]:
+        """Read the PCIe slot of a single NVMe namespace and update the topology of this run
+
+        Returns None if the drive is in an enclosure not seen before, which
+        changes the enclosure list as well.
+        """
+        match = NAMESPACE_PATTERN.match(kernel_name)
+        if not match:
+            return None
+
+        snapshot = self.get_snapshot()
+        controller_dir = os.path.join(self.sysfs_root, "class", "nvme", f"nvme{match.group(1)}")
+
+        update = NvmeSnapshot()
+        disk = self._read_controller(controller_dir, self._get_slot_addresses(), update)
+        if not disk or not any(enclosure.enclosure_id == disk.enclosure for enclosure in snapshot.enclosures):
+            return None
+
+        key = self._slot_key(disk)
+        snapshot.attention[key] = update.attention[key]
+        snapshot.disks = [d for d in snapshot.disks
+                          if self._slot_key(d) != key and d.dev_name != disk.dev_name] + [disk]
+        return self._tag_disks([disk])[0]
+
+    def refresh_slot(self, enclosure: str, slot: int, controller: Optional[str] = None) -> Optional[List[Disk]]:
+        """Read the PCIe slots again and return the drive in one bay"""
+        self.invalidate_snapshot()
+        return self._tag_disks([disk for disk in self.get_snapshot().disks
+                                if disk.enclosure == enclosure and disk.slot == slot
+                                and controller in (None, disk.controller)])
+
+    def locate_disk(self, disk: Disk, turn_off: bool = False, wait_seconds: Optional[int] = None) -> bool:
+        """Turn on or off the attention indicator of a drive's PCIe slot"""
+        attention = self.get_snapshot().attention.get(self._slot_key(disk))
+        attribute = self._write_led_attribute([attention] if attention else [], "0" if turn_off else "1")
+        if not attribute:
+            self.logger.error(f"Could not set attention indicator for {disk.dev_name} "
+                              f"({disk.enclosure}:{disk.slot})")
+            return False
+
+        if not turn_off and wait_seconds is not None:
+            self._turn_off_later([self._led_attribute_off_command(attribute)], wait_seconds)
+        elif not turn_off:
+            self._cancel_turn_off([self._led_attribute_off_command(attribute)])
+
+        return True
+
+    def locate_all_disks(self, turn_off: bool = False, wait_seconds: Optional[int] = None) -> tuple[int, int]:
+        """Turn on or off the attention indicator of all occupied PCIe slots"""
+        snapshot = self.get_snapshot()
+        if not snapshot.disks:
+            self.logger.error("No NVMe drives found in PCIe slots")
+            return 0, 0
+
+        success_count = 0
+        failed_count = 0
+        off_cmds = []
+
+        for disk in snapshot.disks:
+            attention = snapshot.attention.get(self._slot_key(disk))
+            attribute = self._write_led_attribute([attention] if attention else [], "0" if turn_off else "1")
+            if attribute:
+                success_count += 1
+                off_cmds.append(self._led_attribute_off_command(attribute))
+            else:
+                failed_count += 1
+
+        if not turn_off and wait_seconds is not None:
+            self._turn_off_later(off_cmds, wait_seconds)
+
+        return success_count, failed_count
+
+    @staticmethod
+    def _slot_key(disk: Disk) -> SlotKey:
+        """Get the slot key of a disk"""
+        return disk.controller, disk.enclosure, disk.slot
+
+    def _get_controller_dirs(self) -> List[str]:
+        """Get the NVMe controller directories in sysfs"""
+        return sorted(glob.glob(os.path.join(self.sysfs_root, "class", "nvme", "nvme*")))
+
+    def _get_slot_addresses(self) -> Dict[str, str]:
+        """Map the PCI addresses (domain:bus:device) of all PCIe slots to the slot names"""
+        slots = {}
+        for slot_dir in sorted(glob.glob(os.path.join(self.sysfs_root, "bus", "pci", "slots", "*"))):
+            address = read_sysfs_attr(slot_dir, "address")
+            if address:
+                slots.setdefault(address, os.path.basename(slot_dir))
+        return slots
+
+    def _find_slot(self, controller_dir: str, slots: Dict[str, str]) -> Optional[str]:
+        """Find the PCIe slot of an NVMe controller
+
+        Args:
+            controller_dir: Controller directory in /sys/class/nvme
+            slots: Slot names keyed by PCI address
+
+        Returns:
+            Slot name, or None if neither the controller nor an upstream bridge is in a slot
+        """
+        device_path = os.path.realpath(os.path.join(controller_dir, "device"))
+        while PCI_ADDRESS_PATTERN.match(os.path.basename(device_path)):
+            slot = slots.get(os.path.basename(device_path).rsplit(".", 1)[0])
+            if slot:
+                return slot
+            device_path = os.path.dirname(device_path)
+        return None
+
+    def _get_namespace(self, controller_dir: str) -> Optional[str]:
+        """Get the block device of the first namespace of a controller"""
+        namespaces = []
+        try:
+            entries = os.listdir(controller_dir)
+        except OSError:
+            return None
+
+        for entry in entries:
+            match = NAMESPACE_PATTERN.match(entry)
+            if match:
+                namespaces.append((int(match.group(2)), f"nvme{match.group(1)}n{match.group(2)}"))
+
+        for _, kernel_name in sorted(namespaces):
+            if os.path.isdir(os.path.join(self.sysfs_root, "block", kernel_name)):
+                return kernel_name
+        return None
+
+    def _get_bay(self, slot_name: str) -> Tuple[str, Optional[int]]:
+        """Get enclosure name and bay number of a PCIe slot
+
+        Args:
+            slot_name: PCIe slot name
+
+        Returns:
+            Tuple of (enclosure name, bay number or None if the slot name has no number)
+        """
+        slot_config = self.slot_table.get(slot_name)
+        if slot_config and slot_config.bay:
+            return slot_config.enclosure, slot_config.bay
+
+        enclosure_name = slot_config.enclosure if slot_config else DEFAULT_NVME_ENCLOSURE
+        match = SLOT_NUMBER_PATTERN.search(slot_name)
+        return enclosure_name, int(match.group(1)) if match else None
+
+    def _read_controller(self, controller_dir: str, slots: Dict[str, str],
+                         snapshot: NvmeSnapshot) -> Optional[Disk]:
+        """Read an NVMe controller and add its drive to the snapshot
+
+        Args:
+            controller_dir: Controller directory in /sys/class/nvme
+            slots: Slot names keyed by PCI address
+            snapshot: Snapshot to add the enclosure, drive and attention indicator to
+
+        Returns:
+            Disk, or None if the controller is not in a usable PCIe slot
+        """
+        name = os.path.basename(controller_dir)
+        slot_name = self._find_slot(controller_dir, slots)
+        if not slot_name:
+            self.logger.debug(f"{name} is not in a PCIe slot")
+            return None
+
+        enclosure_name, bay = self._get_bay(slot_name)
+        if bay is None:
+            self.logger.warning(f"PCIe slot '{slot_name}' of {name} has no bay number, "
+                                f"add it to nvme_slots in the configuration")
+            return None
+
+        key = (PCIE_CONTROLLER_ID, enclosure_name, bay)
+        if key in snapshot.attention:
+            self.logger.warning(f"{name} is in bay {enclosure_name}:{bay}, which is already taken")
+            return None
+
+        kernel_name = self._get_namespace(controller_dir)
+        if not kernel_name:
+            self.logger.debug(f"{name} has no namespace block device")
+            return None
+
+        if not any(enclosure.enclosure_id == enclosure_name for enclosure in snapshot.enclosures):
+            snapshot.enclosures.append(Enclosure(
+                controller_id=PCIE_CONTROLLER_ID,
+                enclosure_id=enclosure_name,
+                enclosure_type=enclosure_name
+            ))
+
+        snapshot.attention[key] = os.path.join(self.sysfs_root, "bus", "pci", "slots", slot_name, "attention")
+
+        info = self.block_devices.get_block_device(kernel_name) or {}
+        disk = Disk(
+            dev_name=f"/dev/{kernel_name}",
+            serial=info.get("serial", ""),
+            model=info.get("model", ""),
+            wwn=info.get("wwn", ""),
+            controller=PCIE_CONTROLLER_ID,
+            enclosure=enclosure_name,
+            slot=bay,
+            manufacturer=info.get("vendor", "")
+        )
+        snapshot.disks.append(disk)
+        self.logger.debug(f"Found NVMe disk in PCIe slot {slot_name}: {disk}")
+        return disk
+
+    def _read_topology(self) -> NvmeSnapshot:
+        """Read NVMe controllers, their PCIe slots and namespaces from sysfs"""
+        snapshot = NvmeSnapshot()
+        slots = self._get_slot_addresses()
+
+        for controller_dir in self._get_controller_dirs():
+            self._read_controller(controller_dir, slots, snapshot)
+
+        # Configured bays count even when empty
+        for enclosure in snapshot.enclosures:
+            bays = {key[2] for key in snapshot.attention if key[1] == enclosure.enclosure_id}
+            bays |= {slot_config.bay for slot_config in self.slot_table.values()
+                     if slot_config.enclosure == enclosure.enclosure_id and slot_config.bay}
+            enclosure.slots = len(bays)
+
+        return snapshot
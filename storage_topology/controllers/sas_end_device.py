@@ -0,0 +1,398 @@
+"""SAS end device controller using the SAS transport class in sysfs"""
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+import glob
+import os
+
+from .base import BaseController
+from ..block_devices import SysfsBlockDeviceSource
+from ..identifiers import format_logical_id, normalize_serial, normalize_wwn
+from ..models import Disk, Enclosure
+from ..sysfs import get_scsi_host_driver, read_sysfs_attr
+
+# Slot key: (controller ID, enclosure ID, slot number)
+SlotKey = Tuple[str, str, int]
+
+# Drivers of the HBAs whose end devices are read
+MPT_SAS_DRIVERS = ("mpt2sas", "mpt3sas")
+
+# Disk fields filled in from sas2ircu/sas3ircu when sysfs and udev lack them
+ENRICHED_FIELDS = ("serial", "model", "wwn", "manufacturer")
+
+
+@dataclass
+class SasEndDeviceSnapshot:
+    """SAS topology read from sysfs once per run"""
+
+    enclosures: List[Enclosure] = field(default_factory=list)
+    disks: List[Disk] = field(default_factory=list)
+    scsi_devices: Dict[SlotKey, List[str]] = field(default_factory=dict)  # Slot -> SCSI device directories
+
+
+class SasEndDeviceController(BaseController):
+    """Controller for disks behind mpt2sas/mpt3sas HBAs, read from sysfs
+
+    The mpt2sas/mpt3sas drivers export enclosure_identifier and
+    bay_identifier for every SAS end device in /sys/class/sas_device, so
+    enclosure and slot of each disk are known without running
+    sas2ircu/sas3ircu. Enclosure IDs are the enclosure logical IDs in the
+    sas2ircu format, and slots are the bay numbers.
+
+    Identify LEDs are switched through the SES enclosure slot linked to
+    the disk's SCSI device, if the kernel ses driver provides one.
+
+    Backends set with set_enrichment (sas2ircu/sas3ircu) are queried for
+    disk details missing from sysfs and udev; enclosure and slot always
+    come from sysfs.
+    """
+
+    def __init__(self, logger=None, runner=None, sysfs_root: str = "/sys",
+                 udev_root: str = "/run/udev/data"):
+        """Initialize SasEndDeviceController
+
+        Args:
+            logger: Logger instance
+            runner: Command runner used for delayed LED turn-offs
+            sysfs_root: Root of the sysfs tree
+            udev_root: Directory of the udev database
+        """
+        super().__init__(logger, runner)
+        self.cmd = ""
+        self.sysfs_root = sysfs_root
+        self.block_devices = SysfsBlockDeviceSource(sysfs_root, udev_root, logger=self.logger)
+
+        # Topology cached for the current run
+        self._snapshot: Optional[SasEndDeviceSnapshot] = None
+
+        # Backends filling in missing disk details
+        self._enrichment: List[BaseController] = []
+
+    @property
+    def controller_type(self) -> str:
+        """Get controller type identifier"""
+        return "sas_end_device"
+
+    def is_available(self) -> bool:
+        """Check if any SAS end device resolves to an enclosure bay"""
+        return any(self._read_bay(end_device) for end_device in self._get_end_device_dirs())
+
+    def resolves_all_disks(self) -> bool:
+        """Check if every SAS end device with a disk resolves to an enclosure bay
+
+        Only then sas2ircu/sas3ircu would not find any disk this backend misses,
+        e.g. behind an enclosure that reports a zero enclosure identifier.
+        """
+        resolved = False
+        for end_device in self._get_end_device_dirs():
+            if not self._get_scsi_devices(end_device):
+                continue
+            if not self._read_bay(end_device):
+                return False
+            resolved = True
+        return resolved
+
+    def set_enrichment(self, controllers: List[BaseController]) -> None:
+        """Set backends whose disks fill in details missing from sysfs
+
+        Args:
+            controllers: sas2ircu/sas3ircu controllers seeing the same disks
+        """
+        self._enrichment = controllers
+
+    @property
+    def complete(self) -> bool:
+        """Whether this backend and its enrichment finished their commands in time"""
+        return self._complete and all(controller.complete for controller in self._enrichment)
+
+    def get_snapshot(self) -> SasEndDeviceSnapshot:
+        """Get the SAS topology of the current run, reading sysfs on first use"""
+        if self._snapshot is None:
+            self._snapshot = self._read_topology()
+        return self._snapshot
+
+    def invalidate_snapshot(self) -> None:
+        """Drop the cached topology so the next query reads sysfs again"""
+        super().invalidate_snapshot()
+        self._snapshot = None
+        for controller in self._enrichment:
+            controller.invalidate_snapshot()
+
+    def get_disks(self) -> List[Disk]:
+        """Get all disks attached as SAS end devices"""
+        self.logger.info("Getting SAS end device information")
+        disks = list(self.get_snapshot().disks)
+        if self._enrichment:
+            disks = self._enrich(disks)
+        return self._tag_disks(disks)
+
+    def get_enclosures(self) -> List[Enclosure]:
+        """Get the enclosures of all SAS end devices"""
+        self.logger.info("Getting SAS enclosure information")
+        return list(self.get_snapshot().enclosures)
+
+    def may_report_device(self, kernel_name: str) -> bool:
+        """Only SCSI disks on mpt2sas/mpt3sas HBAs (or on an unknown host) are reported by this backend"""
+        if kernel_name.startswith("nvme"):
+            return False
+        return get_scsi_host_driver(kernel_name, self.sysfs_root) in ("",) + MPT_SAS_DRIVERS
+
+    def get_disk_for_device(self, kernel_name: str) -> Optional[Disk]:
+        """Read the end device of a single block device and update the topology of this run
+
+        Returns None if the disk is in an enclosure not seen before, which
+        changes the enclosure list as well.
+        """
+        device_path = os.path.realpath(os.path.join(self.sysfs_root, "block", kernel_name, "device"))
+        while not os.path.basename(device_path).startswith("end_device-"):
+            if os.path.dirname(device_path) == device_path:
+                return None
+            device_path = os.path.dirname(device_path)
+
+        end_device = os.path.join(self.sysfs_root, "class", "sas_device", os.path.basename(device_path))
+        bay_info = self._read_bay(end_device)
+        if not bay_info:
+            return None
+        logical_id, slot, scsi_devices = bay_info
+
+        snapshot = self.get_snapshot()
+        enclosure = next((e for e in snapshot.enclosures if e.enclosure_id == logical_id), None)
+        if enclosure is None:
+            return None
+
+        key = (enclosure.controller_id, enclosure.enclosure_id, slot)
+        disk = self._read_disk(scsi_devices[0], key, read_sysfs_attr(end_device, "sas_address"))
+        if not disk:
+            return None
+
+        # Paths over other HBA ports stay, paths of a removed disk are gone from sysfs
+        known = [d for d in snapshot.scsi_devices.get(key, []) if os.path.isdir(d) and d not in scsi_devices]
+        snapshot.scsi_devices[key] = known + scsi_devices
+        snapshot.disks = [d for d in snapshot.disks if self._slot_key(d) != key] + [disk]
+        return self._tag_disks([disk])[0]
+
+    def refresh_slot(self, enclosure: str, slot: int, controller: Optional[str] = None) -> Optional[List[Disk]]:
+        """Read the end devices of a single bay and update the topology of this run"""
+        snapshot = self.get_snapshot()
+        known = next((e for e in snapshot.enclosures if e.enclosure_id == enclosure), None)
+        if known is None or controller not in (None, known.controller_id):
+            return None
+
+        key = (known.controller_id, enclosure, slot)
+        scsi_devices = []
+        sas_address = ""
+        for end_device in self._get_end_device_dirs():
+            bay_info = self._read_bay(end_device)
+            if bay_info and bay_info[:2] == (enclosure, slot):
+                scsi_devices.extend(bay_info[2])
+                sas_address = sas_address or read_sysfs_attr(end_device, "sas_address")
+
+        snapshot.disks = [d for d in snapshot.disks if self._slot_key(d) != key]
+        snapshot.scsi_devices.pop(key, None)
+        disk = self._read_disk(scsi_devices[0], key, sas_address) if scsi_devices else None
+        if not disk:
+            return []
+
+        snapshot.scsi_devices[key] = scsi_devices
+        snapshot.disks.append(disk)
+        return self._tag_disks([disk])
+
+    def locate_disk(self, disk: Disk, turn_off: bool = False, wait_seconds: Optional[int] = None) -> bool:
+        """Turn on or off the identify LED for a disk through its SES slot"""
+        attribute = self._write_led(self._slot_key(disk), "0" if turn_off else "1")
+        if not attribute:
+            self.logger.error(f"No SES slot found for disk {disk.dev_name} "
+                              f"({disk.enclosure}:{disk.slot}), cannot switch its LED")
+            return False
+
+        if not turn_off and wait_seconds is not None:
+            self._turn_off_later([self._led_attribute_off_command(attribute)], wait_seconds)
+        elif not turn_off:
+            self._cancel_turn_off([self._led_attribute_off_command(attribute)])
+
+        return True
+
+    def locate_all_disks(self, turn_off: bool = False, wait_seconds: Optional[int] = None) -> tuple[int, int]:
+        """Turn on or off the identify LED for all disks with an SES slot"""
+        snapshot = self.get_snapshot()
+        if not snapshot.disks:
+            self.logger.error("No SAS end devices found")
+            return 0, 0
+
+        success_count = 0
+        failed_count = 0
+        off_cmds = []
+
+        for disk in snapshot.disks:
+            attribute = self._write_led(self._slot_key(disk), "0" if turn_off else "1")
+            if attribute:
+                success_count += 1
+                off_cmds.append(self._led_attribute_off_command(attribute))
+            else:
+                failed_count += 1
+
+        if not turn_off and wait_seconds is not None:
+            self._turn_off_later(off_cmds, wait_seconds)
+
+        return success_count, failed_count
+
+    def _enrich(self, disks: List[Disk]) -> List[Disk]:
+        """Fill in empty disk details from the enrichment backends
+
+        Disks are matched by SAS address, WWN or serial number.
+
+        Args:
+            disks: Disks read from sysfs
+
+        Returns:
+            List[Disk]: Disks with missing details filled in
+        """
+        details: Dict[str, Disk] = {}
+        for controller in self._enrichment:
+            try:
+                controller_disks = controller.get_disks()
+            except Exception as e:
+                self.logger.error(f"Error querying {controller.controller_type} for disk details: {e}")
+                continue
+            for disk in controller_disks:
+                for identity in self._disk_identities(disk):
+                    details.setdefault(identity, disk)
+
+        enriched = []
+        for disk in disks:
+            match = next((details[identity] for identity in self._disk_identities(disk) if identity in details),
+                         None)
+            if match:
+                disk = replace(disk, **{name: getattr(match, name) for name in ENRICHED_FIELDS
+                                        if not getattr(disk, name) and getattr(match, name)})
+            enriched.append(disk)
+
+        return enriched
+
+    @staticmethod
+    def _disk_identities(disk: Disk) -> List[str]:
+        """Get the identifiers a disk can be matched by across backends"""
+        identities = []
+        for prefix, value in (("sas", normalize_wwn(disk.sas_address)), ("wwn", normalize_wwn(disk.wwn)),
+                              ("serial", normalize_serial(disk.serial))):
+            if value:
+                identities.append(f"{prefix}:{value}")
+        return identities
+
+    def _write_led(self, key: SlotKey, value: str) -> Optional[str]:
+        """Write the locate attribute of the SES slots linked to a disk's SCSI devices"""
+        attributes = []
+        for scsi_device in self.get_snapshot().scsi_devices.get(key, []):
+            for component in sorted(glob.glob(os.path.join(scsi_device, "enclosure_device:*"))):
+                attributes.append(os.path.join(component, "locate"))
+        return self._write_led_attribute(attributes, value)
+
+    @staticmethod
+    def _slot_key(disk: Disk) -> SlotKey:
+        """Get the slot key of a disk"""
+        return disk.controller, disk.enclosure, disk.slot
+
+    def _get_end_device_dirs(self) -> List[str]:
+        """Get the SAS end device directories in sysfs"""
+        return sorted(glob.glob(os.path.join(self.sysfs_root, "class", "sas_device", "end_device-*")))
+
+    def _read_topology(self) -> SasEndDeviceSnapshot:
+        """Read enclosures and disks of all SAS end devices in one pass"""
+        snapshot = SasEndDeviceSnapshot()
+        enclosures: Dict[str, Enclosure] = {}
+        bays: Dict[str, List[int]] = {}
+
+        for end_device in self._get_end_device_dirs():
+            bay_info = self._read_bay(end_device)
+            if not bay_info:
+                continue
+            logical_id, slot, scsi_devices = bay_info
+
+            # end_device-<host>:<port>:<id>; a disk reached over a second HBA port reuses the first enclosure
+            enclosure = enclosures.get(logical_id)
+            if enclosure is None:
+                host = os.path.basename(end_device)[len("end_device-"):].split(":")[0]
+                enclosure = Enclosure(controller_id=host, enclosure_id=logical_id, logical_id=logical_id)
+                enclosures[logical_id] = enclosure
+                bays[logical_id] = []
+                snapshot.enclosures.append(enclosure)
+
+            key = (enclosure.controller_id, enclosure.enclosure_id, slot)
+            if key in snapshot.scsi_devices:
+                snapshot.scsi_devices[key].extend(scsi_devices)
+                continue
+
+            snapshot.scsi_devices[key] = scsi_devices
+            bays[logical_id].append(slot)
+
+            disk = self._read_disk(scsi_devices[0], key, read_sysfs_attr(end_device, "sas_address"))
+            if disk:
+                snapshot.disks.append(disk)
+                self.logger.debug(f"Found SAS end device disk: {disk}")
+
+        for logical_id, enclosure in enclosures.items():
+            enclosure.slots = len(bays[logical_id])
+            enclosure.start_slot = min(bays[logical_id]) if bays[logical_id] else 1
+
+        return snapshot
+
+    def _read_bay(self, end_device: str) -> Optional[Tuple[str, int, List[str]]]:
+        """Read enclosure, bay and SCSI devices of an end device
+
+        Args:
+            end_device: End device directory in /sys/class/sas_device
+
+        Returns:
+            Tuple of (enclosure logical ID, bay number, SCSI device directories),
+            or None if the end device has no enclosure/bay identifier or no disk
+        """
+        logical_id = format_logical_id(read_sysfs_attr(end_device, "enclosure_identifier"))
+        bay = read_sysfs_attr(end_device, "bay_identifier")
+        if not logical_id or not bay.isdigit():
+            self.logger.debug(f"{os.path.basename(end_device)} has no enclosure/bay identifier")
+            return None
+
+        scsi_devices = self._get_scsi_devices(end_device)
+        if not scsi_devices:
+            return None
+
+        return logical_id, int(bay), scsi_devices
+
+    @staticmethod
+    def _get_scsi_devices(end_device: str) -> List[str]:
+        """Get the SCSI device directories of an end device that have a block device"""
+        return [os.path.dirname(block_dir) for block_dir in
+                sorted(glob.glob(os.path.join(end_device, "device", "target*", "*", "block")))]
+
+    def _read_disk(self, scsi_device: str, key: SlotKey, sas_address: str) -> Optional[Disk]:
+        """Read the disk of an end device
+
+        Args:
+            scsi_device: SCSI device directory of the end device
+            key: Slot key
+            sas_address: SAS address of the end device
+
+        Returns:
+            Disk, or None if the SCSI device has no block device
+        """
+        try:
+            block_names = os.listdir(os.path.join(scsi_device, "block"))
+        except OSError:
+            return None
+        if not block_names:
+            return None
+
+        info = self.block_devices.get_block_device(block_names[0]) or {}
+        controller_id, enclosure_id, slot = key
+
+        return Disk(
+            dev_name=f"/dev/{block_names[0]}",
+            serial=info.get("serial", ""),
+            model=info.get("model", ""),
+            wwn=info.get("wwn", ""),
+            controller=controller_id,
+            enclosure=enclosure_id,
+            slot=slot,
+            manufacturer=info.get("vendor", ""),
+            sas_address=sas_address
+        )
@@ -1,26 +1,48 @@
 """SAS2IRCU/SAS3IRCU controller implementation"""
 
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
 import re
 import time
 
 from .base import BaseController
 from ..models import Disk, Enclosure
+from ..sysfs import get_scsi_host_driver
+
+
+@dataclass
+class SasIrcuSnapshot:
+    """Raw sas2ircu/sas3ircu output captured once per run"""
+
+    displays: Dict[str, str] = field(default_factory=dict)  # Controller ID -> DISPLAY output, in LIST order
 
 
 class SasIrcuController(BaseController):
     """Controller for LSI SAS controllers using sas2ircu/sas3ircu"""
 
-    def __init__(self, logger=None, controller_type: str = "sas2ircu"):
+    # Default number of DISPLAY calls allowed to run at the same time
+    DEFAULT_MAX_WORKERS = 4
+
+    def __init__(self, logger=None, controller_type: str = "sas2ircu",
+                 max_workers: int = DEFAULT_MAX_WORKERS, runner=None, sysfs_root: str = "/sys"):
         """Initialize SasIrcuController
 
         Args:
             logger: Logger instance
             controller_type: Either 'sas2ircu' or 'sas3ircu'
+            max_workers: Maximum number of concurrent DISPLAY calls
+            runner: Command runner used to execute sas2ircu/sas3ircu
+            sysfs_root: Root of the sysfs tree
         """
-        super().__init__(logger)
+        super().__init__(logger, runner)
         self.cmd = controller_type
         self._controller_type = controller_type
+        self.max_workers = max(1, max_workers)
+        self.sysfs_root = sysfs_root
+
+        # Raw output cached for the current run
+        self._list_output: Optional[str] = None
+        self._snapshot: Optional[SasIrcuSnapshot] = None
 
     @property
     def controller_type(self) -> str:
@@ -36,27 +58,51 @@ class SasIrcuController(BaseController):
         try:
             output = self._execute_command([self.cmd, "LIST"], handle_errors=False)
             self.logger.debug(f"{self.cmd} LIST output: {output[:200]}")
+            # Keep the output so the snapshot does not need to run LIST again
+            self._list_output = output
             # If command executed without error, controller is available
             return True
         except Exception as e:
             self.logger.debug(f"Error checking {self.cmd} availability: {e}")
             return False
 
+    def get_snapshot(self) -> SasIrcuSnapshot:
+        """Get the raw controller output for this run
+
+        LIST and every DISPLAY are executed once; later calls reuse the
+        captured output until invalidate_snapshot() is called.
+
+        Returns:
+            SasIrcuSnapshot with the DISPLAY output of every controller in LIST
+        """
+        if self._snapshot is None:
+            list_output = self._list_output
+            if list_output is None:
+                list_output = self._execute_command([self.cmd, "list"])
+
+            controller_ids = self._extract_controller_ids(list_output)
+            self.logger.debug(f"Found controller IDs: {controller_ids}")
+
+            self._snapshot = SasIrcuSnapshot(displays=dict(self._display_all(controller_ids)))
+
+        return self._snapshot
+
+    def invalidate_snapshot(self) -> None:
+        """Drop the cached LIST/DISPLAY output"""
+        super().invalidate_snapshot()
+        self._list_output = None
+        self._snapshot = None
+
     def get_disks(self) -> List[Disk]:
         """Get all disks from sas2ircu/sas3ircu controller"""
         self.logger.info(f"Getting {self.cmd} disk information")
         disks = []
 
         try:
-            # Get controller IDs
-            list_output = self._execute_command([self.cmd, "list"])
-            controller_ids = self._extract_controller_ids(list_output)
-
-            self.logger.debug(f"Found controller IDs: {controller_ids}")
+            snapshot = self.get_snapshot()
 
-            # Loop over each controller
-            for controller_id in controller_ids:
-                display_output = self._execute_command([self.cmd, controller_id, "display"])
+            # Merge in controller order, regardless of which DISPLAY finished first
+            for controller_id, display_output in snapshot.displays.items():
                 disks.extend(self._parse_display_output(display_output, controller_id))
 
             self.logger.debug(f"Found {len(disks)} disks using {self.cmd}")
@@ -64,7 +110,60 @@ class SasIrcuController(BaseController):
         except Exception as e:
             self.logger.error(f"Error getting {self.cmd} disk information: {e}")
 
-        return disks
+        return self._tag_disks(disks)
+
+    def may_report_device(self, kernel_name: str) -> bool:
+        """Only SCSI disks on HBAs of the matching driver (or on an unknown host) are reported"""
+        if kernel_name.startswith("nvme"):
+            return False
+        driver = "mpt2sas" if self.controller_type == "sas2ircu" else "mpt3sas"
+        return get_scsi_host_driver(kernel_name, self.sysfs_root) in ("", driver)
+
+    def refresh_slot(self, enclosure: str, slot: int, controller: Optional[str] = None) -> Optional[List[Disk]]:
+        """Read a single bay by running DISPLAY for its controller only
+
+        sas2ircu/sas3ircu cannot query a single slot; without a controller
+        ID this would be a full scan, so None is returned.
+        """
+        if not controller:
+            return None
+
+        self.logger.info(f"Refreshing {self.cmd} controller {controller} for slot {enclosure}:{slot}")
+        try:
+            output = self._execute_command([self.cmd, controller, "display"], handle_errors=False)
+        except Exception as e:
+            self.logger.debug(f"Error running {self.cmd} {controller} DISPLAY: {e}")
+            return None
+
+        if self._snapshot is not None:
+            self._snapshot.displays[controller] = output
+
+        return self._tag_disks([disk for disk in self._parse_display_output(output, controller)
+                                if disk.enclosure == enclosure and disk.slot == slot])
+
+    def _display_all(self, controller_ids: List[str]) -> List[Tuple[str, str]]:
+        """Run DISPLAY for all controllers concurrently
+
+        Some controller firmware stalls when too many DISPLAY calls run at
+        once, so concurrency is capped by max_workers.
+
+        Args:
+            controller_ids: Controller IDs from the LIST command
+
+        Returns:
+            List of (controller_id, display_output) in controller_ids order
+        """
+        if not controller_ids:
+            return []
+
+        self.logger.debug(f"Running {self.cmd} DISPLAY for {len(controller_ids)} controllers "
+                          f"with up to {self.max_workers} at a time")
+        outputs = self._execute_commands(
+            [[self.cmd, controller_id, "display"] for controller_id in controller_ids],
+            max_concurrency=self.max_workers
+        )
+
+        return list(zip(controller_ids, outputs))
 
     def _extract_controller_ids(self, output: str) -> List[str]:
         """Extract controller IDs from LIST command output"""
@@ -142,7 +241,8 @@ class SasIrcuController(BaseController):
                 controller=controller_id,
                 enclosure=enclosure,
                 slot=int(slot) if slot.isdigit() else 0,
-                manufacturer=manufacturer.strip()
+                manufacturer=manufacturer.strip(),
+                sas_address=sasaddr
             )
 
         return None
@@ -153,13 +253,9 @@ class SasIrcuController(BaseController):
         enclosures = []
 
         try:
-            list_output = self._execute_command([self.cmd, "list"])
-            controller_ids = self._extract_controller_ids(list_output)
-
-            self.logger.debug(f"Found controller IDs: {controller_ids}")
+            snapshot = self.get_snapshot()
 
-            for ctrl_id in controller_ids:
-                display_output = self._execute_command([self.cmd, ctrl_id, "display"])
+            for ctrl_id, display_output in snapshot.displays.items():
                 enclosures.extend(self._parse_enclosures(display_output, ctrl_id))
 
         except Exception as e:
@@ -227,18 +323,14 @@ class SasIrcuController(BaseController):
         return enclosures
 
     def locate_disk(self, disk: Disk, turn_off: bool = False, wait_seconds: Optional[int] = None) -> bool:
-        """Turn on or off the identify LED for a disk"""
+        """Turn on or off the identify LED for a disk on the controller owning it"""
         try:
-            encl_slot = f"{disk.enclosure}:{disk.slot}"
-            led_action = "OFF" if turn_off else "ON"
+            cmd = self._locate_command(disk, turn_off, wait_seconds)
+            self._execute_command(cmd, handle_errors=False)
 
-            # Build command based on wait parameter
-            if wait_seconds is not None and not turn_off:
-                cmd = [self.cmd, "0", "LOCATE", encl_slot, led_action, "wait", str(wait_seconds)]
-            else:
-                cmd = [self.cmd, "0", "LOCATE", encl_slot, led_action]
+            if not turn_off and wait_seconds is None:
+                self._cancel_turn_off([self._locate_command(disk, turn_off=True)])
 
-            self._execute_command(cmd, handle_errors=False)
             return True
 
         except Exception as e:
@@ -246,84 +338,100 @@ class SasIrcuController(BaseController):
             return False
 
     def locate_all_disks(self, turn_off: bool = False, wait_seconds: Optional[int] = None) -> tuple[int, int]:
-        """Turn on or off the identify LED for all disks"""
+        """Turn on or off the identify LED for all disks on all controllers
+
+        LOCATE commands are fanned out concurrently across all controllers,
+        bounded by max_workers.
+        """
         try:
-            display_output = self._execute_command([self.cmd, "0", "DISPLAY"])
-            encl_slots = self._extract_enclosure_slots(display_output)
+            disks = self.get_disks()
 
-            if not encl_slots:
+            if not disks:
                 self.logger.error("No disks found in controller output")
                 return 0, 0
 
-            success_count = 0
-            failed_count = 0
-            led_action = "OFF" if turn_off else "ON"
-
             # Check if controller supports wait parameter
             supports_wait = self._controller_type == "sas3ircu"
+            led_wait = wait_seconds if supports_wait else None
+
+            successful_disks, failed_disks = self._locate_many(disks, turn_off, led_wait)
+
+            # If turning on with wait and controller doesn't support it, turn off after the wait period
+            if not turn_off and wait_seconds is not None and not supports_wait and successful_disks:
+                self._turn_off_later([self._locate_command(disk, turn_off=True) for disk in successful_disks],
+                                     wait_seconds)
 
-            # Turn on/off LEDs
-            successful_slots = []
-            for encl_slot in encl_slots:
-                try:
-                    if wait_seconds is not None and not turn_off and supports_wait:
-                        cmd = [self.cmd, "0", "LOCATE", encl_slot, led_action, "wait", str(wait_seconds)]
-                    else:
-                        cmd = [self.cmd, "0", "LOCATE", encl_slot, led_action]
-
-                    self._execute_command(cmd)
-                    success_count += 1
-                    if not turn_off:
-                        successful_slots.append(encl_slot)
-
-                except Exception as e:
-                    self.logger.warning(f"Failed to {led_action} LED for {encl_slot}: {e}")
-                    failed_count += 1
-
-            # If turning on with wait and controller doesn't support it, wait and turn off manually
-            if not turn_off and wait_seconds is not None and not supports_wait and successful_slots:
-                time.sleep(wait_seconds)
-
-                off_success = 0
-                off_failed = 0
-                for encl_slot in successful_slots:
-                    try:
-                        cmd = [self.cmd, "0", "LOCATE", encl_slot, "OFF"]
-                        self._execute_command(cmd)
-                        off_success += 1
-                    except Exception:
-                        off_failed += 1
-
-                self.logger.info(f"Turned off {off_success} LEDs after wait period")
-                if off_failed > 0:
-                    self.logger.warning(f"Failed to turn off {off_failed} LEDs")
-
-            return success_count, failed_count
+            return len(successful_disks), len(failed_disks)
 
         except Exception as e:
             self.logger.error(f"Error executing {self.cmd} command: {e}")
             return 0, 0
 
-    def _extract_enclosure_slots(self, output: str) -> List[str]:
-        """Extract all enclosure:slot combinations from display output"""
-        encl_slots = []
-        enclosure_pattern = re.compile(r'Enclosure #\s+:\s+(\d+)')
-        slot_pattern = re.compile(r'Slot #\s+:\s+(\d+)')
+    def _locate_command(self, disk: Disk, turn_off: bool = False, wait_seconds: Optional[int] = None) -> List[str]:
+        """Build the LOCATE command for a disk
 
-        current_encl = None
-        current_slot = None
+        Args:
+            disk: Disk to locate; disk.controller selects the controller
+            turn_off: Whether to turn off the LED
+            wait_seconds: Optional number of seconds the LED should blink
 
-        for line in output.splitlines():
-            encl_match = enclosure_pattern.search(line)
-            if encl_match:
-                current_encl = encl_match.group(1)
-                current_slot = None
+        Returns:
+            List[str]: Command to execute
+        """
+        encl_slot = f"{disk.enclosure}:{disk.slot}"
+        led_action = "OFF" if turn_off else "ON"
+        controller_id = disk.controller or "0"
+
+        if wait_seconds is not None and not turn_off:
+            return [self.cmd, controller_id, "LOCATE", encl_slot, led_action, "wait", str(wait_seconds)]
+        return [self.cmd, controller_id, "LOCATE", encl_slot, led_action]
+
+    def _locate_many(self, disks: List[Disk], turn_off: bool = False,
+                     wait_seconds: Optional[int] = None) -> Tuple[List[Disk], List[Disk]]:
+        """Run LOCATE for many disks concurrently and report per-slot results
+
+        Args:
+            disks: Disks to locate
+            turn_off: Whether to turn off the LEDs
+            wait_seconds: Optional number of seconds the LEDs should blink
+
+        Returns:
+            Tuple of (disks that succeeded, disks that failed)
+        """
+        led_action = "OFF" if turn_off else "ON"
+        cmds = [self._locate_command(disk, turn_off, wait_seconds) for disk in disks]
+        for cmd in cmds:
+            self.logger.debug(f"Executing command: {' '.join(cmd)}")
+
+        started = time.monotonic()
+        results = self.runner.run_many(cmds, max_concurrency=self.max_workers)
+        elapsed = time.monotonic() - started
+
+        successful_disks = []
+        failed_disks = []
+        slowest = None
+
+        for disk, result in zip(disks, results):
+            slot = f"controller {disk.controller or '0'} {disk.enclosure}:{disk.slot}"
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                result.check()
+            except Exception as e:
+                self.logger.warning(f"Failed to turn {led_action} LED for {slot}: {e}")
+                failed_disks.append(disk)
                 continue
 
-            slot_match = slot_pattern.search(line)
-            if slot_match and current_encl is not None:
-                current_slot = slot_match.group(1)
-                if current_encl and current_slot:
-                    encl_slots.append(f"{current_encl}:{current_slot}")
+            self.logger.debug(f"Turned {led_action} LED for {slot} in {result.elapsed:.2f}s")
+            successful_disks.append(disk)
+            if slowest is None or result.elapsed > slowest[1]:
+                slowest = (slot, result.elapsed)
+
+        controllers = len({disk.controller for disk in disks})
+        summary = (f"LOCATE {led_action} for {len(disks)} slots on {controllers} controllers "
+                   f"took {elapsed:.2f}s: {len(successful_disks)} succeeded, {len(failed_disks)} failed")
+        if slowest:
+            summary += f", slowest {slowest[0]} ({slowest[1]:.2f}s)"
+        self.logger.info(summary)
 
-        return encl_slots
+        return successful_disks, failed_disks
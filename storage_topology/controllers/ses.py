@@ -0,0 +1,428 @@
+"""SES enclosure controller using the Linux enclosure class in sysfs"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import os
+import re
+
+from .base import BaseController
+from .. import sg_ses
+from ..block_devices import SysfsBlockDeviceSource
+from ..identifiers import format_logical_id, normalize_serial, normalize_wwn
+from ..models import Disk, Enclosure
+from ..sysfs import read_sysfs_attr
+
+# Component directories of an enclosure are named after the slot, e.g. 'Slot 01', 'ArrayDevice05', '7'
+SLOT_NUMBER_PATTERN = re.compile(r"(\d+)\s*$")
+
+# Entries of an enclosure directory that are not components
+NON_COMPONENT_ENTRIES = ("device", "power", "subsystem")
+
+# Slot key: (controller ID, enclosure ID, slot number)
+SlotKey = Tuple[str, str, int]
+
+
+@dataclass
+class SesSnapshot:
+    """Enclosure topology read from sysfs once per run"""
+
+    enclosures: List[Enclosure] = field(default_factory=list)
+    disks: List[Disk] = field(default_factory=list)
+    components: Dict[SlotKey, List[str]] = field(default_factory=dict)  # Slot -> component directories
+
+
+class SesController(BaseController):
+    """Controller for SES-capable enclosures on plain HBAs
+
+    Reads the topology from /sys/class/enclosure, where the kernel ses
+    driver exposes one directory per enclosure and one component
+    directory per slot with a 'device' link to the disk in it. Identify
+    and fault LEDs are switched by writing the component's 'locate' and
+    'fault' attributes, so no vendor tool is needed.
+
+    An enclosure reachable over two paths shows up twice in sysfs; both
+    entries are merged by their logical ID.
+
+    If the ses driver is not loaded, the slots are read from the SES
+    diagnostic pages over SG_IO instead and matched to block devices by
+    SAS address. LEDs cannot be switched in that mode. Every page read is
+    bounded by the runner's timeout and deadline like a command.
+    """
+
+    def __init__(self, logger=None, runner=None, sysfs_root: str = "/sys",
+                 udev_root: str = "/run/udev/data"):
+        """Initialize SesController
+
+        Args:
+            logger: Logger instance
+            runner: Command runner used for delayed LED turn-offs
+            sysfs_root: Root of the sysfs tree
+            udev_root: Directory of the udev database
+        """
+        super().__init__(logger, runner)
+        self.cmd = ""
+        self.sysfs_root = sysfs_root
+        self.block_devices = SysfsBlockDeviceSource(sysfs_root, udev_root, logger=self.logger)
+
+        # Topology cached for the current run
+        self._snapshot: Optional[SesSnapshot] = None
+
+    @property
+    def controller_type(self) -> str:
+        """Get controller type identifier"""
+        return "ses"
+
+    @property
+    def enclosure_class_dir(self) -> str:
+        """Directory of the enclosure class in sysfs"""
+        return os.path.join(self.sysfs_root, "class", "enclosure")
+
+    def is_available(self) -> bool:
+        """Check if the kernel exposes any SES enclosure, through the ses driver or SCSI generic"""
+        if self._get_enclosure_names():
+            return True
+        return bool(sg_ses.find_enclosure_devices(self.sysfs_root))
+
+    def get_snapshot(self) -> SesSnapshot:
+        """Get the enclosure topology of the current run, reading sysfs on first use"""
+        if self._snapshot is None:
+            self._snapshot = self._read_topology()
+        return self._snapshot
+
+    def invalidate_snapshot(self) -> None:
+        """Drop the cached topology so the next query reads sysfs again"""
+        super().invalidate_snapshot()
+        self._snapshot = None
+
+    def get_disks(self) -> List[Disk]:
+        """Get all disks in SES enclosure slots"""
+        self.logger.info("Getting SES disk information")
+        return self._tag_disks(list(self.get_snapshot().disks))
+
+    def get_enclosures(self) -> List[Enclosure]:
+        """Get all SES enclosures"""
+        self.logger.info("Getting SES enclosure information")
+        return list(self.get_snapshot().enclosures)
+
+    def may_report_device(self, kernel_name: str) -> bool:
+        """Only SCSI disks are reported by this backend"""
+        return not kernel_name.startswith("nvme")
+
+    def get_disk_for_device(self, kernel_name: str) -> Optional[Disk]:
+        """Read the enclosure slots again and find the disk of a block device
+
+        The slots are only sysfs attributes (or one set of diagnostic
+        pages), so reading all of them is as cheap as reading one.
+        """
+        self.invalidate_snapshot()
+        for disk in self.get_snapshot().disks:
+            if disk.dev_name == f"/dev/{kernel_name}":
+                return self._tag_disks([disk])[0]
+        return None
+
+    def refresh_slot(self, enclosure: str, slot: int, controller: Optional[str] = None) -> Optional[List[Disk]]:
+        """Read the enclosure slots again and return the disk in one of them"""
+        self.invalidate_snapshot()
+        return self._tag_disks([disk for disk in self.get_snapshot().disks
+                                if disk.enclosure == enclosure and disk.slot == slot
+                                and controller in (None, disk.controller)])
+
+    def locate_disk(self, disk: Disk, turn_off: bool = False, wait_seconds: Optional[int] = None) -> bool:
+        """Turn on or off the identify LED for a disk"""
+        return self._set_led(disk, "locate", turn_off, wait_seconds)
+
+    def fault_disk(self, disk: Disk, turn_off: bool = False, wait_seconds: Optional[int] = None) -> bool:
+        """Turn on or off the fault LED for a disk
+
+        Args:
+            disk: Disk object
+            turn_off: Whether to turn off the LED (default is to turn it on)
+            wait_seconds: Optional number of seconds the LED should stay on
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self._set_led(disk, "fault", turn_off, wait_seconds)
+
+    def locate_all_disks(self, turn_off: bool = False, wait_seconds: Optional[int] = None) -> tuple[int, int]:
+        """Turn on or off the identify LED for all occupied slots"""
+        snapshot = self.get_snapshot()
+        if not snapshot.disks:
+            self.logger.error("No disks found in SES enclosures")
+            return 0, 0
+
+        success_count = 0
+        failed_count = 0
+        off_cmds = []
+
+        for disk in snapshot.disks:
+            attribute = self._write_led(self._slot_key(disk), "locate", "0" if turn_off else "1")
+            if attribute:
+                success_count += 1
+                off_cmds.append(self._led_attribute_off_command(attribute))
+            else:
+                failed_count += 1
+
+        if not turn_off and wait_seconds is not None:
+            self._turn_off_later(off_cmds, wait_seconds)
+
+        return success_count, failed_count
+
+    def _set_led(self, disk: Disk, led: str, turn_off: bool, wait_seconds: Optional[int]) -> bool:
+        """Switch the locate or fault LED of a disk's slot
+
+        Args:
+            disk: Disk object
+            led: Attribute name ('locate' or 'fault')
+            turn_off: Whether to turn off the LED
+            wait_seconds: Optional number of seconds the LED should stay on
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        key = self._slot_key(disk)
+        attribute = self._write_led(key, led, "0" if turn_off else "1")
+        if not attribute:
+            if key not in self.get_snapshot().components:
+                self.logger.error(f"Slot {disk.enclosure}:{disk.slot} has no sysfs LED control, "
+                                  "is the ses kernel driver loaded?")
+            else:
+                self.logger.error(f"Could not set {led} LED for slot {disk.enclosure}:{disk.slot}")
+            return False
+
+        if not turn_off and wait_seconds is not None:
+            self._turn_off_later([self._led_attribute_off_command(attribute)], wait_seconds)
+        elif not turn_off:
+            self._cancel_turn_off([self._led_attribute_off_command(attribute)])
+
+        return True
+
+    def _write_led(self, key: SlotKey, led: str, value: str) -> Optional[str]:
+        """Write an LED attribute of a slot, trying each path to the enclosure
+
+        Args:
+            key: Slot key
+            led: Attribute name ('locate' or 'fault')
+            value: '1' to turn on, '0' to turn off
+
+        Returns:
+            Path of the written attribute, or None on failure
+        """
+        components = self.get_snapshot().components.get(key, [])
+        return self._write_led_attribute([os.path.join(component, led) for component in components], value)
+
+    @staticmethod
+    def _slot_key(disk: Disk) -> SlotKey:
+        """Get the slot key of a disk"""
+        return disk.controller, disk.enclosure, disk.slot
+
+    def _get_enclosure_names(self) -> List[str]:
+        """Get the enclosures registered by the ses driver"""
+        try:
+            return sorted(os.listdir(self.enclosure_class_dir))
+        except OSError:
+            self.logger.debug(f"{self.enclosure_class_dir} not found")
+            return []
+
+    def _read_topology(self) -> SesSnapshot:
+        """Read enclosures, slots and disks from sysfs"""
+        names = self._get_enclosure_names()
+        if not names:
+            return self._read_sg_topology()
+
+        snapshot = SesSnapshot()
+        enclosures_by_id: Dict[str, Enclosure] = {}
+        disk_identities = set()
+
+        for name in names:
+            enclosure_dir = os.path.join(self.enclosure_class_dir, name)
+            logical_id = format_logical_id(read_sysfs_attr(enclosure_dir, "id"))
+            components = self._get_components(enclosure_dir)
+
+            # A second path to an enclosure that was already seen only adds its components
+            enclosure = enclosures_by_id.get(logical_id) if logical_id else None
+            if enclosure is None:
+                slot_numbers = [slot for slot, _ in components]
+                product_id = read_sysfs_attr(enclosure_dir, "device/model")
+                enclosure = Enclosure(
+                    controller_id=name.split(":")[0],
+                    enclosure_id=name,
+                    logical_id=logical_id,
+                    product_id=product_id,
+                    enclosure_type=product_id or "Unknown",
+                    slots=len(components),
+                    start_slot=min(slot_numbers) if slot_numbers else 1
+                )
+                snapshot.enclosures.append(enclosure)
+                if logical_id:
+                    enclosures_by_id[logical_id] = enclosure
+            else:
+                self.logger.debug(f"Enclosure {name} is another path to {enclosure.enclosure_id}")
+
+            for slot, component_dir in components:
+                key = (enclosure.controller_id, enclosure.enclosure_id, slot)
+                snapshot.components.setdefault(key, []).append(component_dir)
+
+                disk = self._read_slot_disk(component_dir, key)
+                if disk:
+                    self._add_disk(snapshot, disk, disk_identities)
+
+        return snapshot
+
+    def _read_sg_topology(self) -> SesSnapshot:
+        """Read enclosures, slots and disks from the SES pages of the enclosures' SCSI generic devices"""
+        snapshot = SesSnapshot()
+        enclosures_by_id: Dict[str, Enclosure] = {}
+        disk_identities = set()
+        block_devices_by_sas_address = None
+
+        timeout_ms = int(self.runner.timeout * 1000) if self.runner.timeout else sg_ses.DEFAULT_TIMEOUT_MS
+
+        for device, address in sg_ses.find_enclosure_devices(self.sysfs_root):
+            try:
+                config, slots = sg_ses.decode_pages(sg_ses.read_pages(device, timeout_ms, self.runner.deadline))
+            except TimeoutError as e:
+                self._complete = False
+                self.logger.error(f"Timeout reading SES pages from {device}: {e}")
+                continue
+            except OSError as e:
+                self.logger.warning(f"Error reading SES pages from {device}: {e}")
+                continue
+
+            if block_devices_by_sas_address is None:
+                block_devices_by_sas_address = self._get_block_devices_by_sas_address()
+
+            for subenclosure_id, logical_id in config.logical_ids.items():
+                subenclosure_slots = [slot for slot in slots if slot.subenclosure_id == subenclosure_id]
+                if not subenclosure_slots:
+                    continue
+
+                enclosure = enclosures_by_id.get(logical_id) if logical_id else None
+                if enclosure is None:
+                    product_id = config.products.get(subenclosure_id, "")
+                    enclosure = Enclosure(
+                        controller_id=address.split(":")[0],
+                        enclosure_id=address if subenclosure_id == 0 else f"{address}.{subenclosure_id}",
+                        logical_id=logical_id,
+                        product_id=product_id,
+                        enclosure_type=product_id or "Unknown",
+                        slots=len(subenclosure_slots),
+                        start_slot=min(slot.slot for slot in subenclosure_slots)
+                    )
+                    snapshot.enclosures.append(enclosure)
+                    if logical_id:
+                        enclosures_by_id[logical_id] = enclosure
+                else:
+                    self.logger.debug(f"Enclosure {device} is another path to {enclosure.enclosure_id}")
+
+                for slot in subenclosure_slots:
+                    key = (enclosure.controller_id, enclosure.enclosure_id, slot.slot)
+                    for sas_address in slot.sas_addresses:
+                        kernel_name = block_devices_by_sas_address.get(normalize_wwn(sas_address))
+                        if kernel_name:
+                            self._add_disk(snapshot, self._make_disk(kernel_name, key, sas_address),
+                                           disk_identities)
+                            break
+
+        return snapshot
+
+    def _get_block_devices_by_sas_address(self) -> Dict[str, str]:
+        """Map the normalized SAS addresses of all SCSI disks to their kernel names"""
+        block_dir = os.path.join(self.sysfs_root, "block")
+        devices = {}
+
+        try:
+            names = sorted(os.listdir(block_dir))
+        except OSError:
+            return devices
+
+        for kernel_name in names:
+            sas_address = normalize_wwn(read_sysfs_attr(block_dir, f"{kernel_name}/device/sas_address"))
+            if sas_address:
+                devices.setdefault(sas_address, kernel_name)
+
+        return devices
+
+    def _add_disk(self, snapshot: SesSnapshot, disk: Disk, disk_identities: set) -> None:
+        """Add a disk to the snapshot unless it was already seen over another path"""
+        identity = normalize_wwn(disk.wwn) or normalize_serial(disk.serial) or disk.dev_name
+        if identity in disk_identities:
+            return
+        disk_identities.add(identity)
+        snapshot.disks.append(disk)
+        self.logger.debug(f"Found SES disk: {disk}")
+
+    def _get_components(self, enclosure_dir: str) -> List[Tuple[int, str]]:
+        """Get the slot components of an enclosure
+
+        Args:
+            enclosure_dir: Enclosure directory in /sys/class/enclosure
+
+        Returns:
+            List of (slot number, component directory) sorted by slot
+        """
+        components = []
+
+        try:
+            entries = os.listdir(enclosure_dir)
+        except OSError:
+            return components
+
+        for entry in sorted(entries):
+            component_dir = os.path.join(enclosure_dir, entry)
+            if entry in NON_COMPONENT_ENTRIES or not os.path.isfile(os.path.join(component_dir, "status")):
+                continue
+
+            # Prefer the 'slot' attribute, fall back to the number in the component name
+            slot = read_sysfs_attr(component_dir, "slot")
+            if not slot.isdigit():
+                match = SLOT_NUMBER_PATTERN.search(entry)
+                slot = match.group(1) if match else str(len(components))
+            components.append((int(slot), component_dir))
+
+        return sorted(components)
+
+    def _read_slot_disk(self, component_dir: str, key: SlotKey) -> Optional[Disk]:
+        """Read the disk in a slot
+
+        Args:
+            component_dir: Component directory of the slot
+            key: Slot key
+
+        Returns:
+            Disk, or None if the slot is empty
+        """
+        try:
+            block_names = os.listdir(os.path.join(component_dir, "device", "block"))
+        except OSError:
+            return None
+        if not block_names:
+            return None
+
+        return self._make_disk(block_names[0], key, read_sysfs_attr(component_dir, "device/sas_address"))
+
+    def _make_disk(self, kernel_name: str, key: SlotKey, sas_address: str) -> Disk:
+        """Create the disk in a slot from its block device
+
+        Args:
+            kernel_name: Kernel name of the block device (e.g. sda)
+            key: Slot key
+            sas_address: SAS address of the disk
+
+        Returns:
+            Disk
+        """
+        info = self.block_devices.get_block_device(kernel_name) or {}
+        controller_id, enclosure_id, slot = key
+
+        return Disk(
+            dev_name=f"/dev/{kernel_name}",
+            serial=info.get("serial", ""),
+            model=info.get("model", ""),
+            wwn=info.get("wwn", ""),
+            controller=controller_id,
+            enclosure=enclosure_id,
+            slot=slot,
+            manufacturer=info.get("vendor", ""),
+            sas_address=sas_address
+        )
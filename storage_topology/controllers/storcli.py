@@ -1,20 +1,51 @@
 """Storcli/Storcli2 controller implementation"""
 
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+import os
 import re
-import time
 
 from .base import BaseController
+from ..identifiers import normalize_wwn, wwn_neighbours
 from ..models import Disk, Enclosure
+from ..sysfs import get_scsi_host_driver, read_sysfs_attr
+
+# Drivers of the MegaRAID controllers and HBAs storcli/storcli2 manage
+STORCLI_DRIVERS = ("megaraid_sas", "mpt3sas")
+
+# Slot key: (controller ID, enclosure ID, slot number)
+SlotKey = Tuple[str, str, int]
+
+
+@dataclass
+class StorcliSnapshot:
+    """Raw storcli/storcli2 JSON output captured once per run"""
+
+    outputs: Dict[str, Dict] = field(default_factory=dict)      # Object path -> parsed 'show all J' output
+    pd_details: Optional[Dict[str, Dict[str, Dict]]] = None     # Controller -> EID:Slt -> drive details
+    slot_devices: Optional[Dict[SlotKey, str]] = None          # Slot -> device ID (DID) of its known drive
 
 
 class StorcliController(BaseController):
     """Controller for LSI MegaRAID controllers using storcli/storcli2"""
 
-    def __init__(self, logger=None):
-        """Initialize StorcliController"""
-        super().__init__(logger)
-        self.cmd = self._detect_storcli_command()
+    # A hotplug event changing more bays than this is resolved with a full scan
+    MAX_REFRESHED_SLOTS = 4
+
+    def __init__(self, logger=None, cmd: Optional[str] = None, runner=None, sysfs_root: str = "/sys"):
+        """Initialize StorcliController
+
+        Args:
+            logger: Logger instance
+            cmd: storcli command to use ('storcli2' or 'storcli'); detected if not given
+            runner: Command runner used to execute storcli
+            sysfs_root: Root of the sysfs tree
+        """
+        super().__init__(logger, runner)
+        self.sysfs_root = sysfs_root
+        self._snapshot = StorcliSnapshot()
+        self._controller_counts: Dict[str, int] = {}
+        self.cmd = cmd if cmd is not None else self._detect_storcli_command()
 
     def _detect_storcli_command(self) -> str:
         """Detect which storcli command is available and has controllers
@@ -53,16 +84,37 @@ class StorcliController(BaseController):
         Returns:
             bool: True if controllers found, False otherwise
         """
+        return self._get_controller_count(cmd) > 0
+
+    def _get_controller_count(self, cmd: str) -> int:
+        """Get the number of controllers reported by a storcli command
+
+        The result is remembered so 'show ctrlcount' runs at most once per command.
+
+        Args:
+            cmd: Command to check ('storcli' or 'storcli2')
+
+        Returns:
+            int: Controller count, 0 if it could not be determined
+        """
+        if cmd in self._controller_counts:
+            return self._controller_counts[cmd]
+
+        count = 0
         try:
             output = self._execute_command([cmd, "show", "ctrlcount"], handle_errors=False)
+            self.logger.debug(f"{cmd} output: {output[:200]}")
             controller_count_match = re.search(r"Controller Count = (\d+)", output)
             if controller_count_match:
                 count = int(controller_count_match.group(1))
                 self.logger.debug(f"{cmd} reports {count} controllers")
-                return count > 0
+            else:
+                self.logger.debug("Could not find 'Controller Count' pattern in output")
         except Exception as e:
             self.logger.debug(f"Error checking {cmd} controller count: {e}")
-        return False
+
+        self._controller_counts[cmd] = count
+        return count
 
     @property
     def controller_type(self) -> str:
@@ -75,31 +127,50 @@ class StorcliController(BaseController):
             self.logger.debug("No storcli command found")
             return False
 
-        try:
-            output = self._execute_command([self.cmd, "show", "ctrlcount"], handle_errors=False)
-            self.logger.debug(f"storcli output: {output[:200]}")
-            controller_count_match = re.search(r"Controller Count = (\d+)", output)
-            if controller_count_match:
-                count = int(controller_count_match.group(1))
-                self.logger.debug(f"Found {count} controllers")
-                if count > 0:
-                    return True
-                else:
-                    self.logger.debug("Controller count is 0")
-            else:
-                self.logger.debug("Could not find 'Controller Count' pattern in output")
-        except Exception as e:
-            self.logger.debug(f"Error checking storcli availability: {e}")
+        count = self._get_controller_count(self.cmd)
+        if count > 0:
+            self.logger.debug(f"Found {count} controllers")
+            return True
 
+        self.logger.debug("Controller count is 0")
         return False
 
+    def _query(self, path: str, error_msg: str = "", handle_errors: bool = True) -> Dict[str, Any]:
+        """Run '<cmd> <path> show all J' once per run and return the parsed JSON
+
+        Args:
+            path: storcli object path (e.g. '/call', '/call/eall/sall')
+            error_msg: Error message to log if the output cannot be parsed
+            handle_errors: Whether command failures should be logged as errors
+
+        Returns:
+            Dict[str, Any]: Parsed JSON data or empty dict on failure
+        """
+        if path not in self._snapshot.outputs:
+            try:
+                output = self._execute_command([self.cmd, path, "show", "all", "J"],
+                                               handle_errors=handle_errors)
+                json_data = self._parse_json_output(output, error_msg)
+            except Exception as e:
+                self.logger.debug(f"Could not query {path}: {e}")
+                json_data = {}
+
+            # Failed queries are remembered as well so they are not retried
+            self._snapshot.outputs[path] = json_data
+
+        return self._snapshot.outputs[path]
+
+    def invalidate_snapshot(self) -> None:
+        """Drop the cached storcli output"""
+        super().invalidate_snapshot()
+        self._snapshot = StorcliSnapshot()
+
     def get_disks(self) -> List[Disk]:
         """Get all disks from storcli/storcli2 controller"""
         self.logger.info(f"Getting {self.cmd} disk information")
 
         try:
-            output = self._execute_command([self.cmd, "/call", "show", "all", "J"])
-            json_data = self._parse_json_output(output, "Failed to parse storcli JSON output")
+            json_data = self._query("/call", "Failed to parse storcli JSON output")
 
             if not json_data:
                 return []
@@ -117,12 +188,153 @@ class StorcliController(BaseController):
                     disks.extend(self._parse_storcli_format(controller, response_data))
 
             self.logger.debug(f"Total {self.cmd} disks found: {len(disks)}")
-            return disks
+            return self._tag_disks(disks)
 
         except Exception as e:
             self.logger.error(f"Error getting {self.cmd} disk information: {e}")
             return []
 
+    def may_report_device(self, kernel_name: str) -> bool:
+        """Only SCSI disks on megaraid_sas/mpt3sas hosts (or on an unknown host) are reported by this backend"""
+        if kernel_name.startswith("nvme"):
+            return False
+        return get_scsi_host_driver(kernel_name, self.sysfs_root) in ("",) + STORCLI_DRIVERS
+
+    def get_disk_for_device(self, kernel_name: str) -> Optional[Disk]:
+        """Find the bay of a single block device with slot-scoped queries
+
+        The brief '<cmd> /call/eall/sall show J' listing tells which bays
+        hold another drive (device ID) than in the full scan of this run.
+        Only these bays are read with refresh_slot() and matched to the
+        block device by the WWN or SAS address from sysfs.
+
+        Returns None without a full scan of this run to compare with, if
+        too many bays changed or if none of them holds the block device.
+        """
+        device_dir = os.path.join(self.sysfs_root, "block", kernel_name, "device")
+        identities = set()
+        for name in ("wwid", "sas_address"):
+            wwn = normalize_wwn(read_sysfs_attr(device_dir, name))
+            if wwn:
+                identities.add(wwn)
+                identities.update(wwn_neighbours(wwn))
+        if not identities:
+            return None
+
+        if self._snapshot.slot_devices is None:
+            if "/call" not in self._snapshot.outputs:
+                return None
+            self._snapshot.slot_devices = self._list_slot_devices(self._snapshot.outputs["/call"])
+
+        output = self._execute_command([self.cmd, "/call/eall/sall", "show", "J"])
+        current = self._list_slot_devices(self._parse_json_output(output))
+        changed = [key for key, device_id in current.items() if self._snapshot.slot_devices.get(key) != device_id]
+        if not changed or len(changed) > self.MAX_REFRESHED_SLOTS:
+            self.logger.debug(f"{len(changed)} {self.cmd} bays changed, not resolving {kernel_name} on its own")
+            return None
+
+        for controller_num, enclosure, slot in changed:
+            for disk in self.refresh_slot(enclosure, slot, controller_num) or []:
+                if {normalize_wwn(disk.wwn), normalize_wwn(disk.sas_address)} & identities:
+                    self._snapshot.slot_devices[(controller_num, enclosure, slot)] = current[
+                        (controller_num, enclosure, slot)]
+                    return disk
+
+        return None
+
+    def refresh_slot(self, enclosure: str, slot: int, controller: Optional[str] = None) -> Optional[List[Disk]]:
+        """Read a single bay with '<cmd> /cX/eY/sZ show all J'
+
+        Without a controller ID, /call/eY/sZ asks all controllers.
+        """
+        path = f"/c{controller if controller else 'all'}/e{enclosure}/s{slot}"
+        self.logger.info(f"Refreshing {self.cmd} slot {path}")
+
+        # The bay changed, so an output of this run is outdated
+        self._snapshot.outputs.pop(path, None)
+        json_data = self._query(path, handle_errors=False)
+        if not json_data:
+            return None
+
+        disks = []
+        for controller_data in json_data.get("Controllers", []):
+            status = controller_data.get("Command Status", {})
+            response_data = controller_data.get("Response Data", {})
+            controller_num = str(status.get("Controller", controller or ""))
+
+            if str(status.get("Status", "")).lower() != "success":
+                # An empty bay is reported as a failed command
+                self.logger.debug(f"{self.cmd} {path} on controller {controller_num}: "
+                                  f"{status.get('Description', status.get('Status', ''))}")
+                continue
+
+            if "Drives List" in response_data:
+                disks.extend(self._parse_storcli2_drive(controller_data, controller_num))
+            else:
+                # Single drive output has the layout of 'Physical Device Information'
+                disks.extend(self._parse_storcli_format(
+                    controller_data, {"Physical Device Information": response_data}))
+
+        return self._tag_disks([disk for disk in disks if disk.enclosure == enclosure and disk.slot == slot])
+
+    def _list_slot_devices(self, json_data: Dict) -> Dict[SlotKey, str]:
+        """Get the device ID (DID) of the drive in every bay of a storcli drive listing
+
+        Works on brief listings and 'show all' output of both storcli and
+        storcli2, as every drive entry has its 'EID:Slt' next to its 'DID'.
+        """
+        slot_devices = {}
+
+        def walk(node: Any, controller_num: str) -> None:
+            if isinstance(node, dict):
+                eid_slt = node.get("EID:Slt")
+                if isinstance(eid_slt, str) and ":" in eid_slt:
+                    enclosure, slot = eid_slt.split(":", 1)
+                    if slot.isdigit():
+                        slot_devices[(controller_num, enclosure, int(slot))] = str(node.get("DID", ""))
+                for value in node.values():
+                    walk(value, controller_num)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value, controller_num)
+
+        for controller in json_data.get("Controllers", []):
+            controller_num = str(controller.get("Command Status", {}).get("Controller", ""))
+            walk(controller.get("Response Data", {}), controller_num)
+
+        return slot_devices
+
+    def _parse_storcli2_drive(self, controller: Dict, controller_num: str) -> List[Disk]:
+        """Parse storcli2 single drive output (Drives List with detailed information)"""
+        disks = []
+        pd_details: Dict[str, Dict[str, Dict]] = {}
+        self._extract_pd_details({"Controllers": [controller]}, pd_details, controller_num)
+        pd_details_map = pd_details.get(controller_num, {})
+
+        for drive_entry in controller.get("Response Data", {}).get("Drives List", []):
+            eid_slt = drive_entry.get("Drive Information", {}).get("EID:Slt", "")
+            if ":" not in eid_slt:
+                continue
+
+            enclosure, slot = eid_slt.split(":", 1)
+            pd_detail = pd_details_map.get(eid_slt, {})
+            model = drive_entry.get("Drive Information", {}).get("Model", "").strip()
+
+            disk = Disk(
+                dev_name="",  # Will be filled later when matching with lsblk
+                serial=pd_detail.get("SN", "").strip(),
+                model=model or pd_detail.get("Model Number", "").strip(),
+                wwn=pd_detail.get("WWN", "").strip(),
+                controller=controller_num,
+                enclosure=enclosure,
+                slot=int(slot) if slot.isdigit() else 0,
+                manufacturer=pd_detail.get("Manufacturer Id", "").strip()
+            )
+            disks.append(disk)
+            self.logger.debug(f"Found {self.cmd} disk: {disk}")
+
+        return disks
+
     def _parse_storcli2_format(self, controller: Dict, response_data: Dict) -> List[Disk]:
         """Parse storcli2 format (PD LIST array)"""
         disks = []
@@ -226,6 +438,14 @@ class StorcliController(BaseController):
             else:
                 serial = manufacturer = wwn = ""
 
+            # SAS address of the first drive port
+            sas_address = ""
+            policies = detailed_info.get(f"{drive_key} Policies/Settings", {})
+            for port in policies.get("Port Information", []):
+                sas_address = str(port.get("SAS address", "")).strip()
+                if sas_address:
+                    break
+
             # Only add disks with a serial number
             if serial:
                 disk = Disk(
@@ -236,7 +456,8 @@ class StorcliController(BaseController):
                     controller=controller_num,
                     enclosure=enclosure,
                     slot=int(slot) if slot.isdigit() else 0,
-                    manufacturer=manufacturer or ""
+                    manufacturer=manufacturer or "",
+                    sas_address=sas_address
                 )
                 disks.append(disk)
                 self.logger.debug(f"Found {self.cmd} disk: {disk}")
@@ -244,7 +465,12 @@ class StorcliController(BaseController):
         return disks
 
     def _get_pd_details_map(self, controller_num: str) -> Dict[str, Dict]:
-        """Get detailed PD information for all drives
+        """Get detailed PD information for all drives of a controller
+
+        The /call/eall/sall output covers every controller, so it is queried
+        once and split per controller. /c{controller}/eall/sall is only used
+        for controllers without drive details in that output, e.g. because
+        the wildcard query failed on them.
 
         Args:
             controller_num: Controller number
@@ -252,39 +478,29 @@ class StorcliController(BaseController):
         Returns:
             Dict mapping EID:Slt to detailed disk information
         """
-        pd_details_map = {}
-
-        # Try /call/eall/sall first
-        try:
-            output = self._execute_command(
-                [self.cmd, "/call/eall/sall", "show", "all", "J"],
-                handle_errors=False
-            )
-            json_data = self._parse_json_output(output)
+        if self._snapshot.pd_details is None:
+            self._snapshot.pd_details = {}
+            json_data = self._query("/call/eall/sall", handle_errors=False)
             if json_data:
-                self._extract_pd_details(json_data, pd_details_map)
-        except Exception as e:
-            self.logger.debug(f"Could not get PD details from /call/eall/sall: {e}")
+                self._extract_pd_details(json_data, self._snapshot.pd_details)
 
-        # If that didn't work, try /c{controller}/eall/sall
-        if not pd_details_map and controller_num:
-            try:
-                output = self._execute_command(
-                    [self.cmd, f"/c{controller_num}/eall/sall", "show", "all", "J"],
-                    handle_errors=False
-                )
-                json_data = self._parse_json_output(output)
-                if json_data:
-                    self._extract_pd_details(json_data, pd_details_map)
-            except Exception as e:
-                self.logger.debug(f"Could not get PD details from /c{controller_num}/eall/sall: {e}")
+        if controller_num and not self._snapshot.pd_details.get(controller_num):
+            json_data = self._query(f"/c{controller_num}/eall/sall", handle_errors=False)
+            if json_data:
+                self._extract_pd_details(json_data, self._snapshot.pd_details, controller_num)
 
-        return pd_details_map
+        return self._snapshot.pd_details.get(controller_num, {})
 
-    def _extract_pd_details(self, json_data: Dict, pd_details_map: Dict) -> None:
-        """Extract PD details from JSON response into the details map"""
+    def _extract_pd_details(self, json_data: Dict, pd_details: Dict[str, Dict[str, Dict]],
+                            default_controller: str = "") -> None:
+        """Extract PD details from JSON response into the per-controller details map"""
         for controller in json_data.get("Controllers", []):
             response = controller.get("Response Data", {})
+            command_status = controller.get("Command Status", {})
+            if str(command_status.get("Status", "success")).lower() != "success":
+                continue
+            controller_num = str(command_status.get("Controller", default_controller))
+            pd_details_map = pd_details.setdefault(controller_num, {})
 
             # Check for storcli2 "Drives List" format
             drives_list = response.get("Drives List", [])
@@ -327,8 +543,7 @@ class StorcliController(BaseController):
         enclosures = []
 
         try:
-            output = self._execute_command([self.cmd, "/call/eall", "show", "all", "J"])
-            json_data = self._parse_json_output(output, "Error parsing storcli enclosure information")
+            json_data = self._query("/call/eall", "Error parsing storcli enclosure information")
 
             if not json_data:
                 return enclosures
@@ -416,14 +631,15 @@ class StorcliController(BaseController):
         """Turn on or off the identify LED for a disk"""
         try:
             action = "stop" if turn_off else "start"
-            cmd = [self.cmd, f"/c{disk.controller}/e{disk.enclosure}/s{disk.slot}", action, "locate"]
-            self._execute_command(cmd, handle_errors=False)
+            path = f"/c{disk.controller}/e{disk.enclosure}/s{disk.slot}"
+            off_cmd = self._drive_locate_command(path, "stop")
+            self._execute_command(self._drive_locate_command(path, action), handle_errors=False)
 
             if not turn_off and wait_seconds is not None:
                 # Auto turn-off after wait period
-                time.sleep(wait_seconds)
-                off_cmd = [self.cmd, f"/c{disk.controller}/e{disk.enclosure}/s{disk.slot}", "stop", "locate"]
-                self._execute_command(off_cmd, handle_errors=False)
+                self._turn_off_later([off_cmd], wait_seconds)
+            elif not turn_off:
+                self._cancel_turn_off([off_cmd])
 
             return True
 
@@ -432,7 +648,160 @@ class StorcliController(BaseController):
             return False
 
     def locate_all_disks(self, turn_off: bool = False, wait_seconds: Optional[int] = None) -> tuple[int, int]:
-        """Turn on or off the identify LED for all disks"""
+        """Turn on or off the identify LED for all disks
+
+        Uses storcli wildcard addressing, so the whole operation needs a
+        handful of invocations instead of one per drive: /call/eall/sall
+        first, then /cX/eY/sall per enclosure of the controllers it failed
+        on, and a per-drive loop if no wildcard command reports results.
+        """
+        action = "stop" if turn_off else "start"
+
+        targets, success_count, failed_count, failed_controllers = self._run_bulk_locate(
+            ["/call/eall/sall"], action)
+
+        if not targets or failed_controllers:
+            if targets:
+                self.logger.debug(f"Bulk locate failed on controllers {', '.join(sorted(failed_controllers))}, "
+                                  f"retrying per enclosure")
+                # Their failures are counted again by the retry
+                failed_count -= sum(failed_controllers.values())
+            else:
+                self.logger.debug("Bulk locate on /call/eall/sall failed, trying per enclosure")
+
+            enclosure_targets = [f"/c{enc.controller_id}/e{enc.enclosure_id}/sall"
+                                 for enc in self.get_enclosures()
+                                 if not targets or enc.controller_id in failed_controllers]
+            retried, success, failed, _ = self._run_bulk_locate(enclosure_targets, action)
+            if not targets and not retried:
+                return self._locate_each_disk(turn_off, wait_seconds)
+
+            targets.update(retried)
+            success_count += success
+            failed_count += failed
+
+        # If turning on and wait is specified, turn off after the wait period
+        if not turn_off and wait_seconds is not None and targets:
+            self._turn_off_later([[self.cmd, target, "stop", "locate", "J"] for target in targets], wait_seconds,
+                                 [[self._drive_locate_command(drive, "stop") for drive in drives]
+                                  for drives in targets.values()])
+
+        return success_count, failed_count
+
+    def locate_enclosure(self, controller_id: str, enclosure_id: str, turn_off: bool = False) -> tuple[int, int]:
+        """Turn on or off the identify LED for all disks in one enclosure
+
+        Args:
+            controller_id: Controller number
+            enclosure_id: Enclosure ID (EID)
+            turn_off: Whether to turn off the LEDs (default is to turn them on)
+
+        Returns:
+            tuple[int, int]: Number of successful and failed operations
+        """
+        action = "stop" if turn_off else "start"
+        _, success_count, failed_count, _ = self._run_bulk_locate(
+            [f"/c{controller_id}/e{enclosure_id}/sall"], action)
+        return success_count, failed_count
+
+    def _run_bulk_locate(self, targets: List[str],
+                         action: str) -> Tuple[Dict[str, List[str]], int, int, Dict[str, int]]:
+        """Run '<target> start|stop locate' for wildcard targets concurrently
+
+        Args:
+            targets: storcli object paths (e.g. '/call/eall/sall', '/c0/e252/sall')
+            action: 'start' or 'stop'
+
+        Returns:
+            Tuple of (targets that worked with the drive paths they switched, successful
+            drive count, failed drive count, failed drive count of each controller on
+            which the command failed entirely)
+        """
+        cmds = [[self.cmd, target, action, "locate", "J"] for target in targets]
+        for cmd in cmds:
+            self.logger.debug(f"Executing command: {' '.join(cmd)}")
+
+        succeeded_targets: Dict[str, List[str]] = {}
+        success_count = 0
+        failed_count = 0
+        failed_controllers: Dict[str, int] = {}
+
+        for target, result in zip(targets, self.runner.run_many(cmds)):
+            # A failing wildcard target is expected on some firmware, callers fall back
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                output = self._decode_output(result.check())
+            except Exception as e:
+                self.logger.debug(f"{self.cmd} {target} {action} locate failed: {e}")
+                continue
+
+            results = self._count_locate_results(output)
+            if results is None:
+                # Without per-drive results the number of switched LEDs is unknown
+                self.logger.debug(f"{self.cmd} {target} {action} locate reported no results")
+                continue
+
+            target_success = 0
+            drives = []
+            for controller_num, (success, failed, controller_drives) in results.items():
+                if not success:
+                    failed_controllers[controller_num] = failed_controllers.get(controller_num, 0) + failed
+                target_success += success
+                failed_count += failed
+                drives.extend(controller_drives)
+
+            self.logger.debug(f"{self.cmd} {target} {action} locate: {target_success} succeeded")
+            if target_success:
+                succeeded_targets[target] = drives
+            success_count += target_success
+
+        return succeeded_targets, success_count, failed_count, failed_controllers
+
+    def _count_locate_results(self, output: str) -> Optional[Dict[str, Tuple[int, int, List[str]]]]:
+        """Count per-drive results of a locate command for each controller
+
+        storcli reports per-drive results for wildcard operations in a
+        'Detailed Status' list. Without it, a controller's command status
+        counts as one success or failure.
+
+        Args:
+            output: JSON output of the locate command
+
+        Returns:
+            Dict mapping controller number to (successful drives, failed drives,
+            paths of the successful drives), or None if the output has no JSON results
+        """
+        json_data = self._parse_json_output(output)
+        if not json_data or not json_data.get("Controllers"):
+            return None
+
+        results = {}
+        for controller in json_data.get("Controllers", []):
+            command_status = controller.get("Command Status", {})
+            controller_num = str(command_status.get("Controller", ""))
+            details = (command_status.get("Detailed Status") or
+                       controller.get("Response Data", {}).get("Detailed Status") or [])
+
+            success_count, failed_count, drives = results.get(controller_num, (0, 0, []))
+            if details:
+                for entry in details:
+                    if str(entry.get("Status", "")).lower() == "success":
+                        success_count += 1
+                        if entry.get("Drive"):
+                            drives.append(str(entry["Drive"]))
+                    else:
+                        failed_count += 1
+            elif str(command_status.get("Status", "")).lower() == "success":
+                success_count += 1
+            else:
+                failed_count += 1
+            results[controller_num] = (success_count, failed_count, drives)
+
+        return results
+
+    def _locate_each_disk(self, turn_off: bool = False, wait_seconds: Optional[int] = None) -> tuple[int, int]:
+        """Turn on or off the identify LED for all disks, one drive at a time"""
         disks = self.get_disks()
         success_count = 0
         failed_count = 0
@@ -443,8 +812,8 @@ class StorcliController(BaseController):
         successful_disks = []
         for disk in disks:
             try:
-                cmd = [self.cmd, f"/c{disk.controller}/e{disk.enclosure}/s{disk.slot}", action, "locate"]
-                self._execute_command(cmd)
+                cmd = self._drive_locate_command(f"/c{disk.controller}/e{disk.enclosure}/s{disk.slot}", action)
+                self._execute_command(cmd, handle_errors=False)
                 success_count += 1
                 if not turn_off:
                     successful_disks.append(disk)
@@ -452,22 +821,24 @@ class StorcliController(BaseController):
                 self.logger.warning(f"Failed to {action} LED for disk {disk.dev_name}: {e}")
                 failed_count += 1
 
-        # If turning on and wait is specified, wait and then turn off
+        # If turning on and wait is specified, turn off after the wait period
         if not turn_off and wait_seconds is not None and successful_disks:
-            time.sleep(wait_seconds)
+            self._turn_off_later([self._drive_locate_command(f"/c{disk.controller}/e{disk.enclosure}/s{disk.slot}",
+                                                             "stop") for disk in successful_disks], wait_seconds)
 
-            off_success = 0
-            off_failed = 0
-            for disk in successful_disks:
-                try:
-                    cmd = [self.cmd, f"/c{disk.controller}/e{disk.enclosure}/s{disk.slot}", "stop", "locate"]
-                    self._execute_command(cmd)
-                    off_success += 1
-                except Exception:
-                    off_failed += 1
+        return success_count, failed_count
 
-            self.logger.info(f"Turned off {off_success} LEDs after wait period")
-            if off_failed > 0:
-                self.logger.warning(f"Failed to turn off {off_failed} LEDs")
+    def _drive_locate_command(self, path: str, action: str) -> List[str]:
+        """Build the locate command of a single drive
 
-        return success_count, failed_count
+        Pending turn-offs are keyed by the command, so every turn-off of a
+        drive must be built here.
+
+        Args:
+            path: storcli drive path (e.g. '/c0/e252/s3')
+            action: 'start' or 'stop'
+
+        Returns:
+            List[str]: Command
+        """
+        return [self.cmd, path, action, "locate"]
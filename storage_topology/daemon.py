@@ -0,0 +1,535 @@
+"""Long-running daemon serving the storage topology over a Unix socket
+
+Every CLI run used to pay the full controller scan. `--daemon` scans once,
+keeps the mapped disks, enclosures and ZFS pool mapping in memory and
+answers requests from the CLI and scripts over a Unix socket in the state
+directory. Requests and responses are single-line JSON objects:
+
+    {"command": "list"}
+    {"command": "lookup", "serial": "WD-WMAYP6774338"}
+    {"command": "locate", "disk": "sda", "off": false, "wait": 10}
+    {"command": "update", "all": true}
+    {"command": "refresh_slot", "location": "BayFront:4"}
+
+Lookups accept "dev", "serial", "wwn" or "location" ("ENCLOSURE:SLOT" or
+the location string). Responses carry "ok" and either the result or an
+"error" message.
+
+Disk hotplug events patch the topology in memory: only the affected
+block device is read again from its controller backend, and everything is
+rescanned only when a backend cannot resolve a single device. Without
+uevents, the topology is rescanned when the fingerprint of the topology
+cache (block devices and configuration) changes.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .config import ConfigManager
+from .disk_mapper import DiskMapper
+from .hotplug import OVERFLOW_ACTION, Uevent, UeventListener, is_multipath_device, is_physical_disk
+from .identifiers import normalize_wwn
+from .models import Disk, Enclosure
+from .state import get_state_file
+
+if TYPE_CHECKING:
+    from .storage_topology import StorageTopology
+
+# Socket file in the state directory
+SOCKET_FILE = "daemon.sock"
+
+
+def get_socket_path() -> Optional[str]:
+    """Get the path of the daemon socket, or None if no state directory is usable"""
+    return get_state_file(SOCKET_FILE)
+
+
+class DaemonError(Exception):
+    """Request the daemon cannot answer"""
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers the JSON requests of one client connection, one per line"""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "Invalid JSON request"}
+            else:
+                response = self.server.daemon.handle_request(request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    """Threaded Unix socket server with a reference to the daemon"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, daemon: "TopologyDaemon"):
+        self.daemon = daemon
+        super().__init__(socket_path, _RequestHandler)
+
+
+class TopologyDaemon:
+    """Keeps the mapped topology in memory and serves it over a Unix socket
+
+    All requests share one lock, since the controllers are not thread
+    safe; answering from memory takes well under a millisecond, so the
+    lock is only contended while a rescan or LED operation runs. The
+    watch mode uses the same in-memory topology without the socket.
+    """
+
+    # Seconds the ZFS pool mapping is reused before `zpool status` runs again
+    POOL_MAX_AGE = 10.0
+
+    def __init__(self, app: "StorageTopology", socket_path: Optional[str] = None,
+                 logger: Optional[logging.Logger] = None):
+        """Initialize the daemon
+
+        Args:
+            app: StorageTopology with controller, disk mapper and topology cache set up
+            socket_path: Path of the Unix socket (default: state directory)
+            logger: Logger instance
+        """
+        self.app = app
+        self.socket_path = socket_path or get_socket_path()
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.disks: List[Disk] = []
+        self.enclosures: List[Enclosure] = []
+        self.pools: Dict[str, Dict[str, str]] = {}
+
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self._created: Optional[float] = None
+        self._config_signature: Optional[tuple] = None
+        self._pools_time = 0.0
+        self._hotplug = UeventListener(logger=self.logger)
+
+        # Set whenever hotplug events changed the topology
+        self.changed = threading.Event()
+
+    def start_hotplug(self) -> bool:
+        """Start applying disk hotplug events in a background thread
+
+        Returns:
+            bool: True if uevents are received, False if only rescans keep the topology current
+        """
+        if not self._hotplug.open():
+            return False
+
+        threading.Thread(target=self._watch_uevents, name="hotplug", daemon=True).start()
+        self.logger.info("Listening for disk hotplug events")
+        return True
+
+    def stop_hotplug(self) -> None:
+        """Stop listening for disk hotplug events"""
+        self._hotplug.close()
+
+    def get_topology(self, rescan: bool = False) -> Tuple[List[Disk], Dict[str, Dict[str, str]]]:
+        """Get the current disks and pool mapping
+
+        Args:
+            rescan: Collect the full topology again first
+
+        Returns:
+            Tuple of (disks, pool mapping by disk name)
+        """
+        with self._lock:
+            if rescan:
+                self.rescan()
+            self._ensure_current()
+            return list(self.disks), dict(self.pools)
+
+    def serve_forever(self) -> None:
+        """Scan the topology and answer requests until interrupted"""
+        if not self.socket_path:
+            raise DaemonError("No writable state directory for the daemon socket")
+
+        if DaemonClient(self.socket_path).is_running():
+            raise DaemonError(f"Another daemon is already listening on {self.socket_path}")
+
+        # Listen before scanning, so no disk change between scan and listener is missed
+        self.start_hotplug()
+
+        with self._lock:
+            self.rescan()
+
+        # A socket left behind by a daemon that died
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = _UnixServer(self.socket_path, self)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            os.chmod(self.socket_path, 0o600)
+            self.logger.info(f"Serving storage topology on {self.socket_path}")
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self.stop_hotplug()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def handle_request(self, request: Any) -> Dict[str, Any]:
+        """Answer a single request
+
+        Args:
+            request: Decoded JSON request
+
+        Returns:
+            Response with "ok" set, and the result or an "error" message
+        """
+        handlers = {
+            "list": self._handle_list,
+            "lookup": self._handle_lookup,
+            "locate": self._handle_locate,
+            "update": self._handle_update,
+            "refresh_slot": self._handle_refresh_slot,
+            "rescan": self._handle_rescan
+        }
+
+        if not isinstance(request, dict) or request.get("command") not in handlers:
+            return {"ok": False, "error": f"Unknown request, expected one of: {', '.join(handlers)}"}
+
+        try:
+            with self._lock:
+                self._ensure_current()
+                result = handlers[request["command"]](request)
+        except DaemonError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            self.logger.exception(f"Error handling {request['command']} request")
+            return {"ok": False, "error": f"Internal error: {e}"}
+
+        result["ok"] = True
+        return result
+
+    def rescan(self) -> None:
+        """Collect the full topology again; the caller holds the lock"""
+        app = self.app
+
+        # A changed configuration file is loaded again before mapping
+        if self._fingerprint is not None:
+            app.config_manager = ConfigManager(logger=self.logger)
+            app.disk_mapper = DiskMapper(app.config_manager, logger=self.logger)
+
+        fingerprint = app._get_topology_fingerprint()
+        created = time.time()
+        app.controller.invalidate_snapshot()
+        disks, enclosures, complete = app._collect_topology()
+
+        self.disks = disks
+        self.enclosures = enclosures
+        self._fingerprint = fingerprint
+        self._created = created
+        self._config_signature = self._get_config_signature()
+        self._pools_time = 0.0
+
+        if complete:
+            app.topology_cache.save(fingerprint, disks, enclosures, created)
+        self.logger.info(f"Topology has {len(disks)} disks in {len(enclosures)} enclosures")
+
+    def apply_uevents(self, events: List[Uevent]) -> None:
+        """Patch the topology with a batch of disk hotplug events
+
+        Args:
+            events: Events from the uevent listener
+        """
+        with self._lock:
+            # 'change' events are frequent (partition rescans, media checks) and rarely change a disk
+            if all(event.action == "change" for event in events) and \
+                    self.app._get_topology_fingerprint() == self._fingerprint:
+                return
+
+            self.changed.set()
+            if not self._patch_topology(events):
+                self.logger.info("Hotplug event cannot be resolved for a single device, rescanning")
+                self.rescan()
+                return
+
+            self._fingerprint = self.app._get_topology_fingerprint()
+            self._pools_time = 0.0
+            if all(disk.complete for disk in self.disks):
+                self.app.topology_cache.save(self._fingerprint, self.disks, self.enclosures)
+
+    def _watch_uevents(self) -> None:
+        """Apply hotplug events until the listener is closed"""
+        while self._hotplug.available:
+            try:
+                events = self._hotplug.receive()
+            except OSError:
+                return
+            try:
+                self.apply_uevents(events)
+            except Exception:
+                self.logger.exception("Error applying hotplug events")
+
+    def _patch_topology(self, events: List[Uevent]) -> bool:
+        """Apply hotplug events to the disks in memory
+
+        Returns:
+            bool: True if all events were applied, False if a full rescan is needed
+        """
+        for event in events:
+            if event.action == OVERFLOW_ACTION:
+                return False
+
+            name = os.path.basename(event.devname)
+            if event.action == "remove":
+                if not self._remove_device(name):
+                    return False
+                continue
+
+            if not is_physical_disk(name):
+                # zvols, loop devices and such are not in the topology, multipath maps are
+                if is_multipath_device(name):
+                    return False
+                continue
+
+            controller_disk = self.app.controller.get_disk_for_device(name)
+            if controller_disk is None:
+                return False
+
+            disks = self.app.disk_mapper.match_with_system_devices([controller_disk], [f"/dev/{name}"])
+            for disk in self.app.disk_mapper.map_locations(disks, self.enclosures):
+                slot_key = (disk.controller, disk.enclosure, disk.slot)
+                self.disks = [d for d in self.disks if (d.controller, d.enclosure, d.slot) != slot_key
+                              and d.dev_name != disk.dev_name] + [disk]
+                self.logger.info(f"{event.action}: {disk.dev_name} in {disk.location or disk.enclosure_name}")
+
+        return True
+
+    def _remove_device(self, name: str) -> bool:
+        """Remove a block device from the disks in memory
+
+        Returns:
+            bool: True if removed, False if it was a multipath map whose paths need a rescan
+        """
+        kept = []
+        for disk in self.disks:
+            if f"/dev/{name}" in disk.paths:
+                disk.paths = [path for path in disk.paths if path != f"/dev/{name}"]
+
+            if disk.short_name == name:
+                if name.startswith("dm-"):
+                    return False
+                if not disk.paths:
+                    self.logger.info(f"remove: {disk.dev_name} from {disk.location or disk.enclosure_name}")
+                    continue
+                # The disk is still reachable over another path
+                disk.dev_name = disk.paths[0]
+            kept.append(disk)
+
+        self.disks = kept
+        return True
+
+    def _ensure_current(self) -> None:
+        """Rescan if block devices or configuration changed, refresh the pool mapping if old
+
+        While hotplug events arrive, they keep the disks current, so only
+        the configuration file is checked.
+        """
+        if self._hotplug.available:
+            if self._get_config_signature() != self._config_signature:
+                self.logger.info("Configuration changed, rescanning")
+                self.rescan()
+        elif self.app._get_topology_fingerprint() != self._fingerprint:
+            self.logger.info("Block devices or configuration changed, rescanning")
+            self.rescan()
+
+        if time.monotonic() - self._pools_time > self.POOL_MAX_AGE:
+            self.pools = self.app.truenas_api.get_pool_disk_mapping()
+            self._pools_time = time.monotonic()
+
+    def _get_config_signature(self) -> Optional[tuple]:
+        """Get modification time and size of the configuration file"""
+        try:
+            stat = os.stat(self.app.config_manager.config_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _disk_to_dict(self, disk: Disk) -> Dict[str, Any]:
+        """Convert a disk to a dictionary including its pool"""
+        data = disk.to_dict()
+        pool = self.pools.get(disk.short_name)
+        if pool:
+            data["pool"] = pool.get("pool", "")
+            data["pool_state"] = pool.get("state", "")
+        return data
+
+    def _find_disk(self, name: str) -> Optional[Disk]:
+        """Find a disk by device name or one of its paths"""
+        name_short = name.replace("/dev/", "")
+        for disk in self.disks:
+            if disk.short_name == name_short or f"/dev/{name_short}" in disk.paths:
+                return disk
+        return None
+
+    def _handle_list(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Return all disks, enclosures and the pool mapping"""
+        return {
+            "disks": [self._disk_to_dict(disk) for disk in self.disks],
+            "enclosures": [enclosure.to_dict() for enclosure in self.enclosures],
+            "pools": self.pools
+        }
+
+    def _handle_lookup(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the disks matching a device name, serial number, WWN or location"""
+        if request.get("dev"):
+            disk = self._find_disk(str(request["dev"]))
+            disks = [disk] if disk else []
+        elif request.get("serial"):
+            disks = [disk for disk in self.disks if disk.serial == request["serial"]]
+        elif request.get("wwn"):
+            wwn = normalize_wwn(str(request["wwn"]))
+            disks = [disk for disk in self.disks if wwn and normalize_wwn(disk.wwn) == wwn]
+        elif request.get("location"):
+            location = str(request["location"])
+            disks = [disk for disk in self.disks
+                     if location in (disk.location, f"{disk.enclosure_name}:{disk.physical_slot}")]
+        else:
+            raise DaemonError("Lookup needs one of dev, serial, wwn or location")
+
+        return {"disks": [self._disk_to_dict(disk) for disk in disks]}
+
+    def _handle_locate(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn the identify LED of one or all disks on or off"""
+        turn_off = bool(request.get("off"))
+        wait_seconds = request.get("wait")
+
+        if request.get("all"):
+            success_count, failed_count = self.app.controller.locate_all_disks(
+                turn_off, wait_seconds if not turn_off else None)
+            return {"success": success_count, "failed": failed_count}
+
+        disk = self._find_disk(str(request.get("disk", "")))
+        if not disk:
+            raise DaemonError(f"Disk not found: {request.get('disk')}")
+
+        if not self.app.controller.locate_disk(disk, turn_off, wait_seconds):
+            raise DaemonError(f"Could not set LED for disk {request.get('disk')}")
+        return {"disk": disk.short_name}
+
+    def _handle_update(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Write the location of one or all disks to the TrueNAS disk descriptions"""
+        if request.get("all"):
+            updated_count, skipped_count = self.app.truenas_api.update_all_disks(self.disks)
+            return {"updated": updated_count, "skipped": skipped_count}
+
+        name = str(request.get("disk", ""))
+        for disk in self.disks:
+            if disk.short_name == name or disk.dev_name == name:
+                if disk.enclosure_name and disk.physical_slot:
+                    success = self.app.truenas_api.update_disk_description(
+                        disk.short_name,
+                        disk.enclosure_name,
+                        str(disk.physical_slot),
+                        str(disk.logical_disk)
+                    )
+                    return {"disk": disk.short_name, "updated": bool(success)}
+
+        raise DaemonError(f"Disk not found or no location info: {name}")
+
+    def _handle_refresh_slot(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Read a single bay again and return the disks in it
+
+        If block devices outside the bay changed since the topology was
+        collected, the full topology is collected instead.
+        """
+        location = str(request.get("location", ""))
+        bay = self.app._find_bay(self.disks, self.enclosures, location)
+        if bay is None:
+            raise DaemonError(f"Unknown bay: {location}")
+
+        fingerprint = self.app._get_topology_fingerprint()
+        changed = None
+        if self._fingerprint is not None:
+            changed = self.app.topology_cache.changed_block_devices(self._fingerprint, fingerprint)
+
+        disks = self.app._refresh_bay(self.disks, self.enclosures, bay)
+        if disks is None:
+            self.logger.info(f"Slot {location} cannot be read on its own, rescanning")
+            self.rescan()
+        elif self.app._changed_outside_bay(changed, self.disks, disks, bay):
+            self.logger.info(f"Block devices outside slot {location} changed, rescanning")
+            self.rescan()
+        else:
+            self.disks = disks
+            self._fingerprint = fingerprint
+            if self.app.controller.complete:
+                self.app.topology_cache.save(fingerprint, self.disks, self.enclosures, self._created)
+
+        return {"disks": [self._disk_to_dict(disk) for disk in self.disks
+                          if (disk.controller, disk.enclosure, disk.slot) == bay]}
+
+    def _handle_rescan(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect the full topology again"""
+        self.rescan()
+        return {"disks": len(self.disks), "enclosures": len(self.enclosures)}
+
+
+class DaemonClient:
+    """Sends requests to a running daemon"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        """Initialize the client
+
+        Args:
+            socket_path: Path of the Unix socket (default: state directory)
+            timeout: Seconds to wait for a response, None to wait indefinitely
+        """
+        self.socket_path = socket_path if socket_path is not None else get_socket_path()
+        self.timeout = timeout
+
+    def is_running(self) -> bool:
+        """Check if a daemon accepts connections on the socket"""
+        if not self.socket_path or not os.path.exists(self.socket_path):
+            return False
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(self.socket_path)
+            return True
+        except OSError:
+            return False
+
+    def request(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send a request and wait for the response
+
+        Args:
+            request: Request to send
+
+        Returns:
+            Decoded response, or None if no daemon is running or it did not answer
+        """
+        if not self.socket_path or not os.path.exists(self.socket_path):
+            return None
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(json.dumps(request).encode() + b"\n")
+                with sock.makefile("rb") as f:
+                    line = f.readline()
+            response = json.loads(line)
+        except (OSError, ValueError):
+            return None
+
+        return response if isinstance(response, dict) else None
@@ -0,0 +1,147 @@
+"""Persistent cache for controller detection results"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional
+
+from .sg_ses import find_enclosure_devices
+from .state import get_state_file, read_json, write_json
+from .sysfs import read_sysfs_attr
+
+# Controller CLI binaries probed during detection
+PROBED_COMMANDS = ("storcli2", "storcli", "sas2ircu", "sas3ircu")
+
+# PCI base class of mass storage controllers (SCSI, RAID, SAS, NVMe, ...)
+PCI_STORAGE_CLASS = "0x01"
+
+
+class DetectionCache:
+    """Caches the detected controller backends keyed by a hardware fingerprint
+
+    The fingerprint is built from the PCI vendor/device IDs of all storage
+    controllers in sysfs, the SES enclosures and SAS end devices known to
+    the kernel and the modification times of the controller CLI binaries,
+    so the cache is invalidated when an HBA or JBOD is added, removed or
+    replaced, or when a tool is installed or upgraded. Options that change
+    the backend selection are part of the fingerprint as well.
+    """
+
+    CACHE_VERSION = 4
+    CACHE_FILE = "controller-cache.json"
+
+    def __init__(self, cache_file: Optional[str] = None, sysfs_root: str = "/sys",
+                 logger: Optional[logging.Logger] = None):
+        """Initialize detection cache
+
+        Args:
+            cache_file: Path to cache file (default: state directory)
+            sysfs_root: Root of the sysfs tree
+            logger: Logger instance
+        """
+        self.cache_file = cache_file or get_state_file(self.CACHE_FILE)
+        self.sysfs_root = sysfs_root
+        self.logger = logger or logging.getLogger(__name__)
+
+    def fingerprint(self, options: Optional[Dict] = None) -> str:
+        """Compute the hardware fingerprint
+
+        Args:
+            options: Command line options that change the selected backends
+
+        Returns:
+            str: Hex digest identifying the current controller setup
+        """
+        data = {
+            "pci": self._get_storage_pci_devices(),
+            "enclosures": self._get_enclosures(),
+            "sas_end_devices": self._has_sas_end_devices(),
+            "commands": self._get_command_mtimes(),
+            "options": options or {}
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def load(self, fingerprint: str) -> Optional[List[Dict]]:
+        """Load the cached detection result
+
+        Args:
+            fingerprint: Current hardware fingerprint
+
+        Returns:
+            Cached backend entries, or None if missing or stale
+        """
+        if not self.cache_file:
+            return None
+
+        data = read_json(self.cache_file)
+        if not isinstance(data, dict):
+            return None
+
+        if data.get("version") != self.CACHE_VERSION or data.get("fingerprint") != fingerprint:
+            self.logger.debug("Controller detection cache is stale")
+            return None
+
+        return data.get("backends")
+
+    def save(self, fingerprint: str, backends: List[Dict]) -> None:
+        """Save a detection result
+
+        Args:
+            fingerprint: Current hardware fingerprint
+            backends: Detected backends, each with 'type' and 'cmd'
+        """
+        if not self.cache_file:
+            return
+
+        data = {
+            "version": self.CACHE_VERSION,
+            "fingerprint": fingerprint,
+            "backends": backends
+        }
+        if write_json(self.cache_file, data):
+            self.logger.debug(f"Saved controller detection cache to {self.cache_file}")
+        else:
+            self.logger.debug(f"Could not write controller detection cache {self.cache_file}")
+
+    def _get_storage_pci_devices(self) -> List[str]:
+        """Get address and vendor/device IDs of all PCI storage controllers"""
+        devices = []
+
+        for device_dir in sorted(glob.glob(os.path.join(self.sysfs_root, "bus/pci/devices/*"))):
+            pci_class = read_sysfs_attr(device_dir, "class")
+            if not pci_class.startswith(PCI_STORAGE_CLASS):
+                continue
+
+            vendor = read_sysfs_attr(device_dir, "vendor")
+            device = read_sysfs_attr(device_dir, "device")
+            devices.append(f"{os.path.basename(device_dir)} {vendor}:{device} {pci_class}")
+
+        return devices
+
+    def _get_enclosures(self) -> List[str]:
+        """Get the SES enclosures registered in the enclosure class or as SCSI generic devices"""
+        try:
+            enclosures = sorted(os.listdir(os.path.join(self.sysfs_root, "class/enclosure")))
+        except OSError:
+            enclosures = []
+        return enclosures + [device for device, _ in find_enclosure_devices(self.sysfs_root)]
+
+    def _has_sas_end_devices(self) -> bool:
+        """Check if any SAS end device exports a bay identifier"""
+        return bool(glob.glob(os.path.join(self.sysfs_root, "class/sas_device/end_device-*/bay_identifier")))
+
+    def _get_command_mtimes(self) -> Dict[str, Optional[int]]:
+        """Get modification times of the controller CLI binaries"""
+        mtimes = {}
+
+        for cmd in PROBED_COMMANDS:
+            path = shutil.which(cmd)
+            try:
+                mtimes[cmd] = os.stat(path).st_mtime_ns if path else None
+            except OSError:
+                mtimes[cmd] = None
+
+        return mtimes
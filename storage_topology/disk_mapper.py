@@ -1,102 +1,232 @@
 """Disk location mapping functionality"""
 
+import glob
 import logging
+import os
 import subprocess
 import json
-from typing import List, Dict, Set, Optional, Tuple
+from dataclasses import replace
+from typing import List, Dict, Optional, Tuple
 
+from .block_devices import SysfsBlockDeviceSource
+from .command_runner import CommandRunner
+from .identifiers import normalize_serial, normalize_wwn, swap_serial_bytes, wwn_neighbours
 from .models import Disk, Enclosure, EnclosureConfig
 from .config import ConfigManager
+from .sysfs import read_sysfs_attr
+
+
+class DiskIndex:
+    """Hash indexes over controller disks for matching system block devices
+
+    The indexes are built once, so each block device is resolved with a
+    few dictionary lookups. Lookups are tried in a fixed order: WWN, SAS
+    address, WWN +/- 1 (NAA-5 LU name vs. port SAS address), serial number
+    and byte-swapped serial number. For duplicate keys the first disk wins.
+    """
+
+    def __init__(self, disks: List[Disk]):
+        """Build the indexes
+
+        Args:
+            disks: Disks reported by the controller
+        """
+        self.by_wwn: Dict[str, Disk] = {}
+        self.by_sas_address: Dict[str, Disk] = {}
+        self.by_serial: Dict[str, Disk] = {}
+
+        for disk in disks:
+            wwn = normalize_wwn(disk.wwn)
+            if wwn:
+                self.by_wwn.setdefault(wwn, disk)
+
+            sas_address = normalize_wwn(disk.sas_address)
+            if sas_address:
+                self.by_sas_address.setdefault(sas_address, disk)
+
+            serial = normalize_serial(disk.serial)
+            if serial:
+                self.by_serial.setdefault(serial, disk)
+
+    def lookup(self, wwn: str = "", serial: str = "", sas_address: str = "") -> Tuple[Optional[Disk], str]:
+        """Find the controller disk for a block device
+
+        Args:
+            wwn: WWN reported by the OS
+            serial: Serial number reported by the OS
+            sas_address: SAS address of the block device, if known
+
+        Returns:
+            Tuple of (matching disk or None, name of the identifier that matched)
+        """
+        wwn = normalize_wwn(wwn)
+        sas_address = normalize_wwn(sas_address)
+
+        if wwn in self.by_wwn:
+            return self.by_wwn[wwn], "wwn"
+
+        for address in (sas_address, wwn):
+            if address and address in self.by_sas_address:
+                return self.by_sas_address[address], "sas_address"
+
+        for address in (wwn, sas_address):
+            for neighbour in wwn_neighbours(address):
+                disk = self.by_wwn.get(neighbour) or self.by_sas_address.get(neighbour)
+                if disk:
+                    return disk, "wwn+-1"
+
+        normalized_serial = normalize_serial(serial)
+        if normalized_serial:
+            if normalized_serial in self.by_serial:
+                return self.by_serial[normalized_serial], "serial"
+
+            swapped_serial = swap_serial_bytes(serial)
+            if swapped_serial in self.by_serial:
+                return self.by_serial[swapped_serial], "byte-swapped serial"
+
+        return None, ""
 
 
 class DiskMapper:
     """Maps disks to their physical locations in enclosures"""
 
-    def __init__(self, config_manager: ConfigManager, logger: Optional[logging.Logger] = None):
+    def __init__(self, config_manager: ConfigManager, logger: Optional[logging.Logger] = None,
+                 sysfs_root: str = "/sys", udev_root: str = "/run/udev/data"):
         """Initialize disk mapper
 
         Args:
             config_manager: Configuration manager instance
             logger: Logger instance
+            sysfs_root: Root of the sysfs tree
+            udev_root: Directory of the udev database
         """
         self.config_manager = config_manager
         self.logger = logger or logging.getLogger(__name__)
+        self.sysfs_root = sysfs_root
+        self.runner = CommandRunner(logger=self.logger)
+        self.block_device_source = SysfsBlockDeviceSource(sysfs_root, udev_root, logger=self.logger)
 
-    def match_with_system_devices(self, controller_disks: List[Disk]) -> List[Disk]:
+    def match_with_system_devices(self, controller_disks: List[Disk],
+                                  devices: Optional[List[str]] = None) -> List[Disk]:
         """Match controller disks with system block devices
 
         Args:
             controller_disks: List of disks from controller
+            devices: Only match these block devices (e.g. ['/dev/sda']) and the
+                other paths of their multipath devices; default is all
 
         Returns:
             List of disks with updated device names from lsblk
         """
         self.logger.info("Matching controller devices with system devices")
 
-        # Get lsblk information
-        lsblk_data = self._get_lsblk_data()
-        if not lsblk_data:
+        # Get block device information
+        block_device_data = self._get_block_device_data()
+        if not block_device_data:
             return controller_disks
 
-        # Match disks
-        matched_disks = []
-        seen_wwns: Set[str] = set()
+        # Index controller disks once instead of scanning them per block device
+        index = DiskIndex(controller_disks)
 
-        for block_device in lsblk_data.get("blockdevices", []):
-            dev_name = block_device.get("name", "")
-            wwn = block_device.get("wwn", "")
-            serial = block_device.get("serial", "")
+        # Multipath topology: member path -> dm device, and names of the dm devices
+        members, multipath_names = self._get_multipath_topology()
 
-            # Normalize WWN
-            my_wwn = wwn.replace("0x", "").lower() if wwn else ""
+        wanted = None
+        holders = set()
+        if devices is not None:
+            holders = {members.get(device, device) for device in devices}
+            wanted = set(devices) | {member for member, holder in members.items() if holder in holders}
 
-            # Find matching disk from controller
-            matched_disk = None
-            for disk in controller_disks:
-                disk_wwn = disk.wwn.replace("0x", "").lower() if disk.wwn else ""
-                disk_serial = disk.serial
-
-                # Try to match by WWN or serial
-                if (disk_wwn and disk_wwn == my_wwn) or (disk_serial and disk_serial == serial):
-                    matched_disk = disk
-                    break
-
-            if matched_disk:
-                # Check for duplicates using slot identifier
-                slot_id = f"{matched_disk.controller}_{matched_disk.enclosure}_{matched_disk.slot}"
-
-                # Skip duplicates unless this is a multipath device
-                if slot_id in seen_wwns:
-                    if dev_name.startswith("/dev/dm-"):
-                        # Prefer multipath device names
-                        matched_disks = [d for d in matched_disks
-                                       if not (d.controller == matched_disk.controller and
-                                             d.enclosure == matched_disk.enclosure and
-                                             d.slot == matched_disk.slot)]
-                        seen_wwns.discard(slot_id)
-                        self.logger.debug(f"Replacing with multipath device {dev_name} for slot {slot_id}")
-                    else:
-                        self.logger.debug(f"Skipping duplicate path {dev_name} for slot {slot_id}")
-                        continue
+        # Matched disks keyed by slot, so every path of a slot is attached in constant time
+        matched: Dict[str, Disk] = {}
 
+        for block_device in block_device_data.get("blockdevices", []):
+            dev_name = block_device.get("name", "")
+            if wanted is not None and dev_name not in wanted and multipath_names.get(dev_name) not in holders:
+                continue
+            wwn = block_device.get("wwn", "") or ""
+            serial = block_device.get("serial", "") or ""
+            sas_address = self._read_sas_address(dev_name) if index.by_sas_address else ""
+
+            # Find matching disk from controller
+            matched_disk, matched_by = index.lookup(wwn=wwn, serial=serial, sas_address=sas_address)
+            if not matched_disk:
+                continue
+            if matched_by != "wwn":
+                self.logger.debug(f"Matched {dev_name} by {matched_by}")
+
+            # A member path is reported under its multipath device
+            multipath_dev = multipath_names.get(dev_name)
+            member_of = members.get(dev_name)
+            device = multipath_dev or member_of or dev_name
+            path = None if multipath_dev else dev_name
+
+            slot_id = f"{matched_disk.controller}_{matched_disk.enclosure}_{matched_disk.slot}"
+            current = matched.get(slot_id)
+
+            if current is None:
                 # Create new disk with updated device name
-                updated_disk = Disk(
-                    dev_name=dev_name,
-                    serial=matched_disk.serial,
-                    model=matched_disk.model,
-                    wwn=matched_disk.wwn,
-                    controller=matched_disk.controller,
-                    enclosure=matched_disk.enclosure,
-                    slot=matched_disk.slot,
-                    manufacturer=matched_disk.manufacturer,
+                matched[slot_id] = replace(
+                    matched_disk,
+                    dev_name=device,
                     size=block_device.get("size", ""),
-                    vendor=block_device.get("vendor", "")
+                    vendor=block_device.get("vendor", ""),
+                    paths=[path] if path else []
                 )
+                continue
+
+            if path and path not in current.paths:
+                current.paths.append(path)
+
+            if device != current.dev_name:
+                if multipath_dev or member_of:
+                    self.logger.debug(f"Using multipath device {device} for slot {slot_id}")
+                    current.dev_name = device
+                else:
+                    self.logger.debug(f"Adding path {dev_name} to {current.dev_name} for slot {slot_id}")
+
+            current.size = current.size or block_device.get("size", "")
+            current.vendor = current.vendor or block_device.get("vendor", "")
+
+        return list(matched.values())
+
+    def _get_multipath_topology(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Read the multipath topology from sysfs
+
+        A device-mapper device is a multipath device if its dm/uuid starts
+        with 'mpath-'; its member paths are listed in its slaves directory.
+
+        Returns:
+            Tuple of (member path -> multipath device,
+            multipath device names as reported by lsblk -> multipath device),
+            with multipath devices named /dev/dm-N
+        """
+        members: Dict[str, str] = {}
+        names: Dict[str, str] = {}
+
+        for dm_dir in glob.glob(os.path.join(self.sysfs_root, "block", "dm-*")):
+            if not read_sysfs_attr(dm_dir, "dm/uuid").startswith("mpath-"):
+                continue
+
+            kernel_name = os.path.basename(dm_dir)
+            multipath_dev = f"/dev/{kernel_name}"
+            names[multipath_dev] = multipath_dev
 
-                matched_disks.append(updated_disk)
-                seen_wwns.add(slot_id)
+            dm_name = read_sysfs_attr(dm_dir, "dm/name")
+            if dm_name:
+                names[f"/dev/mapper/{dm_name}"] = multipath_dev
 
-        return matched_disks
+            try:
+                slaves = os.listdir(os.path.join(dm_dir, "slaves"))
+            except OSError:
+                slaves = []
+            for slave in slaves:
+                members[f"/dev/{slave}"] = multipath_dev
+
+        if names:
+            self.logger.debug(f"Found {len(names)} multipath device names with {len(members)} member paths")
+
+        return members, names
 
     def map_locations(self, disks: List[Disk], enclosures: List[Enclosure]) -> List[Disk]:
         """Map physical locations for all disks
@@ -113,72 +243,85 @@ class DiskMapper:
         # Create enclosure lookup dictionary
         enclosure_map = {enc.key: enc for enc in enclosures}
 
+        # Resolve each enclosure's config once and share it across its disks
+        enclosure_configs = {
+            key: self.config_manager.get_enclosure_config(
+                logical_id=enc.logical_id,
+                enclosure_id=enc.enclosure_id,
+                product_id=enc.product_id
+            )
+            for key, enc in enclosure_map.items()
+        }
+
         # Map each disk
         mapped_disks = []
         for disk in disks:
-            mapped_disk = self._map_disk_location(disk, enclosure_map)
+            mapped_disk = self._map_disk_location(disk, enclosure_map, enclosure_configs)
             mapped_disks.append(mapped_disk)
 
         return mapped_disks
 
-    def _map_disk_location(self, disk: Disk, enclosure_map: Dict[str, Enclosure]) -> Disk:
+    def _map_disk_location(self, disk: Disk, enclosure_map: Dict[str, Enclosure],
+                           enclosure_configs: Dict[str, Optional[EnclosureConfig]]) -> Disk:
         """Map location for a single disk
 
         Args:
             disk: Disk to map
             enclosure_map: Dictionary of enclosures keyed by controller_id_enclosure_id
+            enclosure_configs: Resolved configuration of each enclosure, same keys
 
         Returns:
             Disk with updated location information
         """
+        # Get enclosure information
+        enclosure_key = f"{disk.controller}_{disk.enclosure}"
+        enclosure = enclosure_map.get(enclosure_key)
+
         # Check for custom mapping first
-        custom_mapping = self.config_manager.get_disk_mapping(disk.serial)
-        if custom_mapping:
+        custom_mapping = self.config_manager.match_disk(disk, enclosure)
+        if custom_mapping and custom_mapping.slot:
             self.logger.debug(f"Using custom mapping for disk with serial {disk.serial}: {custom_mapping}")
             disk.enclosure_name = custom_mapping.enclosure
             disk.physical_slot = custom_mapping.slot
             disk.logical_disk = custom_mapping.disk
             return disk
 
-        # Get enclosure information
-        enclosure_key = f"{disk.controller}_{disk.enclosure}"
-        enclosure = enclosure_map.get(enclosure_key)
-
         if not enclosure:
             # No enclosure found, use defaults
             disk.enclosure_name = f"Enclosure-{disk.enclosure}"
             disk.physical_slot = disk.slot + 1
             disk.logical_disk = disk.slot
-            return disk
-
-        # Get configuration for this enclosure
-        config = self.config_manager.get_enclosure_config(
-            logical_id=enclosure.logical_id,
-            enclosure_id=enclosure.enclosure_id,
-            product_id=enclosure.product_id
-        )
-
-        if config:
-            # Use configured mapping
-            disk.enclosure_name = config.name
-            physical_slot, logical_disk = self._calculate_disk_position(
-                disk.slot,
-                enclosure.start_slot,
-                config
-            )
-            disk.physical_slot = physical_slot
-            disk.logical_disk = logical_disk
-
-            self.logger.debug(
-                f"Calculated position for {disk.dev_name}: "
-                f"slot={disk.slot}, hw_start={enclosure.start_slot}, "
-                f"physical_slot={physical_slot}, logical_disk={logical_disk}"
-            )
         else:
-            # Use default mapping
-            disk.enclosure_name = enclosure.enclosure_type or f"Enclosure-{enclosure.enclosure_id}"
-            disk.physical_slot = disk.slot + 1
-            disk.logical_disk = disk.slot
+            # Get configuration for this enclosure
+            config = enclosure_configs.get(enclosure_key)
+
+            if config:
+                # Use configured mapping
+                disk.enclosure_name = config.name
+                physical_slot, logical_disk = self._calculate_disk_position(
+                    disk.slot,
+                    enclosure.start_slot,
+                    config
+                )
+                disk.physical_slot = physical_slot
+                disk.logical_disk = logical_disk
+
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        f"Calculated position for {disk.dev_name}: "
+                        f"slot={disk.slot}, hw_start={enclosure.start_slot}, "
+                        f"physical_slot={physical_slot}, logical_disk={logical_disk}"
+                    )
+            else:
+                # Use default mapping
+                disk.enclosure_name = enclosure.enclosure_type or f"Enclosure-{enclosure.enclosure_id}"
+                disk.physical_slot = disk.slot + 1
+                disk.logical_disk = disk.slot
+
+        # A mapping without slot only renames the enclosure
+        if custom_mapping:
+            self.logger.debug(f"Using custom enclosure name for disk with serial {disk.serial}: {custom_mapping}")
+            disk.enclosure_name = custom_mapping.enclosure
 
         return disk
 
@@ -214,18 +357,50 @@ class DiskMapper:
 
         return physical_slot, logical_disk
 
+    def _read_sas_address(self, dev_name: str) -> str:
+        """Read the SAS address of a block device from sysfs
+
+        Args:
+            dev_name: Device name (e.g. /dev/sda)
+
+        Returns:
+            SAS address, or "" if the device is not a SAS end device
+        """
+        return read_sysfs_attr(os.path.join(self.sysfs_root, "block", os.path.basename(dev_name), "device"),
+                               "sas_address")
+
+    def _get_block_device_data(self) -> Dict:
+        """Get block device information from sysfs, falling back to lsblk
+
+        Returns:
+            Dictionary with block device information in lsblk JSON format
+        """
+        self.logger.info("Getting system block device information")
+
+        if self.block_device_source.is_available():
+            try:
+                devices = self.block_device_source.get_block_devices()
+            except OSError as e:
+                self.logger.debug(f"Failed to read block devices from sysfs: {e}")
+                devices = []
+
+            if devices:
+                self.logger.debug(f"Found {len(devices)} block devices")
+                return {"blockdevices": devices}
+
+        self.logger.debug("No block devices in sysfs, falling back to lsblk")
+        return self._get_lsblk_data()
+
     def _get_lsblk_data(self) -> Dict:
         """Get block device information from lsblk
 
         Returns:
             Dictionary with block device information
         """
-        self.logger.info("Getting system block device information")
-
         try:
             cmd = ["lsblk", "-p", "-d", "-o",
                   "NAME,WWN,VENDOR,MODEL,REV,SERIAL,SIZE,PTUUID,HCTL,TRAN,TYPE", "-J"]
-            output = subprocess.check_output(cmd, universal_newlines=True)
+            output = self.runner.run(cmd, merge_stderr=False).check().decode('utf-8', errors='replace')
             data = json.loads(output)
 
             self.logger.debug(f"Found {len(data.get('blockdevices', []))} block devices")
@@ -0,0 +1,179 @@
+"""Lookup of custom disk mappings by serial number, pattern and range"""
+
+import fnmatch
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .identifiers import normalize_wwn
+from .models import Disk, DiskMapping, DiskRule, Enclosure
+
+
+@dataclass
+class _RangeRule:
+    """Range rule with its bounds parsed"""
+
+    first: int
+    last: int
+    rule: DiskRule
+
+
+class DiskMatcher:
+    """Finds the custom mapping of a disk
+
+    Mappings are compiled once and tried in a fixed order: exact serial
+    number (hash lookup), serial globs and regexes (one combined regex,
+    except for regexes with capture groups, which are matched on their
+    own), WWN ranges and enclosure slot ranges (hash lookup by
+    enclosure). For rules of the same kind, the first one in the
+    configuration wins.
+    """
+
+    def __init__(self, mappings: Dict[str, DiskMapping], rules: List[DiskRule],
+                 logger: Optional[logging.Logger] = None):
+        """Compile the mappings
+
+        Args:
+            mappings: Exact mappings keyed by serial number
+            rules: Pattern and range rules in configuration order
+            logger: Logger instance
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.mappings = mappings
+
+        self._serial_rules: List[DiskRule] = []
+        self._serial_regex: Optional[re.Pattern] = None
+        self._serial_patterns: List[re.Pattern] = []
+        # Indexes of serial rules not covered by the combined regex
+        self._separate_serial_rules: List[int] = []
+        self._wwn_rules: List[_RangeRule] = []
+        self._slot_rules: Dict[str, List[_RangeRule]] = {}
+
+        for rule in rules:
+            try:
+                if rule.serial_pattern or rule.serial_regex:
+                    pattern = fnmatch.translate(rule.serial_pattern) if rule.serial_pattern else rule.serial_regex
+                    self._serial_patterns.append(re.compile(pattern))
+                    self._serial_rules.append(rule)
+                elif rule.wwn_range:
+                    first, last = (self._parse_wwn(wwn) for wwn in rule.wwn_range)
+                    self._wwn_rules.append(_RangeRule(first, last, rule))
+                elif rule.match_enclosure and rule.slot_range:
+                    first, last = rule.slot_range
+                    self._slot_rules.setdefault(rule.match_enclosure.strip(), []).append(
+                        _RangeRule(first, last, rule))
+                else:
+                    self.logger.warning(f"Skipping disk rule without serial pattern, WWN range "
+                                        f"or enclosure slot range: {rule}")
+            except (re.error, ValueError) as e:
+                self.logger.warning(f"Skipping invalid disk rule {rule}: {e}")
+
+        self._combine_serial_patterns()
+
+    def _parse_wwn(self, wwn: str) -> int:
+        """Parse a WWN range bound
+
+        Raises:
+            ValueError: If the bound is not a WWN
+        """
+        normalized = normalize_wwn(wwn)
+        if not normalized:
+            raise ValueError(f"'{wwn}' is not a WWN")
+        if len(normalized) not in (16, 32):
+            self.logger.warning(f"WWN range bound '{wwn}' has {len(normalized)} hex digits instead of 16 or 32")
+        return int(normalized, 16)
+
+    def _combine_serial_patterns(self) -> None:
+        """Combine the serial patterns without capture groups into one regex
+
+        Combining renumbers capture groups, which would break backreferences
+        and clash on group names, so patterns with groups stay separate.
+        """
+        combined = []
+        for index, pattern in enumerate(self._serial_patterns):
+            if pattern.groups == 0:
+                combined.append(f"(?P<r{index}>{pattern.pattern})")
+            else:
+                self._separate_serial_rules.append(index)
+
+        if not combined:
+            return
+
+        try:
+            self._serial_regex = re.compile("|".join(combined))
+        except re.error:
+            # Global inline flags such as (?i) are only valid at the start of a regex
+            self.logger.debug("Serial patterns cannot be combined, matching them one by one")
+            self._separate_serial_rules = list(range(len(self._serial_patterns)))
+
+    def match(self, disk: Disk, enclosure: Optional[Enclosure] = None) -> Optional[DiskMapping]:
+        """Find the mapping of a disk
+
+        Args:
+            disk: Disk to look up
+            enclosure: Enclosure of the disk, if known
+
+        Returns:
+            DiskMapping with the custom location; slot 0 keeps the computed
+            slot. None if no mapping matches.
+        """
+        mapping = self.mappings.get(disk.serial)
+        if mapping:
+            return mapping
+
+        rule, offset = self._match_rule(disk, enclosure)
+        if not rule:
+            return None
+
+        slot = rule.slot + offset if rule.slot else 0
+        return DiskMapping(
+            serial=disk.serial,
+            enclosure=rule.enclosure,
+            slot=slot,
+            disk=rule.disk + offset if rule.disk else slot
+        )
+
+    def _match_rule(self, disk: Disk, enclosure: Optional[Enclosure]) -> Tuple[Optional[DiskRule], int]:
+        """Find the first matching rule
+
+        Returns:
+            Tuple of (rule, offset of the disk's slot in a slot range) or (None, 0)
+        """
+        if disk.serial and self._serial_rules:
+            rule = self._match_serial(disk.serial)
+            if rule:
+                return rule, 0
+
+        if self._wwn_rules:
+            wwn = normalize_wwn(disk.wwn)
+            value = int(wwn, 16) if wwn else None
+            if value is not None:
+                for range_rule in self._wwn_rules:
+                    if range_rule.first <= value <= range_rule.last:
+                        return range_rule.rule, 0
+
+        if self._slot_rules and enclosure:
+            for enclosure_id in (enclosure.logical_id, enclosure.enclosure_id, enclosure.product_id.strip()):
+                for range_rule in self._slot_rules.get(enclosure_id, []) if enclosure_id else []:
+                    if range_rule.first <= disk.slot <= range_rule.last:
+                        return range_rule.rule, disk.slot - range_rule.first
+
+        return None, 0
+
+    def _match_serial(self, serial: str) -> Optional[DiskRule]:
+        """Find the first serial glob or regex rule matching a serial number"""
+        first = None
+        if self._serial_regex is not None:
+            match = self._serial_regex.fullmatch(serial)
+            if match:
+                first = int(match.lastgroup[1:])
+
+        # A separate rule only wins if it comes before the combined match
+        for index in self._separate_serial_rules:
+            if first is not None and index > first:
+                break
+            if self._serial_patterns[index].fullmatch(serial):
+                return self._serial_rules[index]
+
+        return self._serial_rules[first] if first is not None else None
@@ -0,0 +1,197 @@
+"""Kernel uevent listener for block device hotplug
+
+Instead of rescanning all controllers when a disk is swapped, long-running
+modes listen for the kernel's uevents on a NETLINK_KOBJECT_UEVENT socket
+and re-read only the affected block device. No udev library is needed:
+kernel uevents are NUL-separated "KEY=value" strings after an
+"action@devpath" header.
+"""
+
+import errno
+import logging
+import os
+import select
+import socket
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Netlink protocol and multicast group of kernel uevents
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_UEVENT_GROUP = 1
+
+# Actions that change the disk topology
+UEVENT_ACTIONS = ("add", "remove", "change")
+
+# Pseudo action reported when the kernel dropped events because the socket buffer was full
+OVERFLOW_ACTION = "overflow"
+
+
+@dataclass
+class Uevent:
+    """Kernel uevent of a block device"""
+
+    action: str
+    devname: str = ""
+    devpath: str = ""
+    properties: Dict[str, str] = field(default_factory=dict)
+
+
+def parse_uevent(data: bytes) -> Optional[Uevent]:
+    """Parse a kernel uevent message
+
+    Args:
+        data: Raw netlink message
+
+    Returns:
+        Uevent, or None if the message is not a kernel uevent
+    """
+    fields = data.decode("utf-8", errors="replace").split("\0")
+    if not fields or "@" not in fields[0]:
+        # udev re-broadcasts start with 'libudev' and are not sent to the kernel group
+        return None
+
+    properties = {}
+    for entry in fields[1:]:
+        key, sep, value = entry.partition("=")
+        if sep:
+            properties[key] = value
+
+    return Uevent(
+        action=properties.get("ACTION", fields[0].split("@", 1)[0]),
+        devname=properties.get("DEVNAME", ""),
+        devpath=properties.get("DEVPATH", fields[0].split("@", 1)[1]),
+        properties=properties
+    )
+
+
+class UeventListener:
+    """Receives add, remove and change uevents of whole-disk block devices
+
+    Events are collected until none arrived for SETTLE_DELAY seconds, so
+    attributes and udev data of a new disk are in place when it is read,
+    and the several events of one disk swap are handled together.
+    """
+
+    # Seconds without events before a batch is returned
+    SETTLE_DELAY = 1.0
+
+    # Socket receive buffer, large enough for the events of a full shelf appearing at once
+    RECEIVE_BUFFER = 4 * 1024 * 1024
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        """Initialize the listener
+
+        Args:
+            logger: Logger instance
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self._sock: Optional[socket.socket] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether the netlink socket is open"""
+        return self._sock is not None
+
+    def open(self) -> bool:
+        """Open the netlink socket
+
+        Returns:
+            bool: True if uevents can be received, False otherwise
+        """
+        if self._sock is not None:
+            return True
+
+        if not hasattr(socket, "AF_NETLINK"):
+            self.logger.debug("Netlink sockets are not supported on this platform")
+            return False
+
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_KOBJECT_UEVENT)
+        except OSError as e:
+            self.logger.debug(f"Cannot open uevent socket: {e}")
+            return False
+
+        try:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RECEIVE_BUFFER)
+            except OSError:
+                pass
+            sock.bind((0, KERNEL_UEVENT_GROUP))
+        except OSError as e:
+            sock.close()
+            self.logger.debug(f"Cannot listen for uevents: {e}")
+            return False
+
+        self._sock = sock
+        return True
+
+    def close(self) -> None:
+        """Close the netlink socket"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def receive(self, timeout: Optional[float] = None) -> List[Uevent]:
+        """Wait for a batch of block device events
+
+        Args:
+            timeout: Seconds to wait for the first event, None to wait indefinitely
+
+        Returns:
+            List of events, empty if the timeout expired. A single event with
+            OVERFLOW_ACTION means events were lost and everything must be rescanned.
+        """
+        if self._sock is None:
+            raise OSError(errno.EBADF, "Uevent socket is not open")
+
+        events: List[Uevent] = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            if events:
+                wait = self.SETTLE_DELAY
+            elif deadline is None:
+                wait = None
+            else:
+                wait = max(0.0, deadline - time.monotonic())
+
+            readable, _, _ = select.select([self._sock], [], [], wait)
+            if not readable:
+                return events
+
+            try:
+                data = self._sock.recv(65536)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    self.logger.warning("Uevent buffer overflowed, events were lost")
+                    return [Uevent(action=OVERFLOW_ACTION)]
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+
+            event = parse_uevent(data)
+            if self._is_disk_event(event):
+                self.logger.debug(f"Uevent: {event.action} {event.devname}")
+                events.append(event)
+
+    @staticmethod
+    def _is_disk_event(event: Optional[Uevent]) -> bool:
+        """Check if an event is about a whole-disk block device"""
+        return (event is not None and event.action in UEVENT_ACTIONS and bool(event.devname)
+                and event.properties.get("SUBSYSTEM") == "block"
+                and event.properties.get("DEVTYPE") == "disk")
+
+
+def is_physical_disk(kernel_name: str, sysfs_root: str = "/sys") -> bool:
+    """Check if a block device is backed by hardware (not a zvol, loop or RAM disk)"""
+    return os.path.exists(os.path.join(sysfs_root, "block", kernel_name, "device"))
+
+
+def is_multipath_device(kernel_name: str, sysfs_root: str = "/sys") -> bool:
+    """Check if a block device is a device-mapper multipath map"""
+    try:
+        with open(os.path.join(sysfs_root, "block", kernel_name, "dm", "uuid"), 'r') as f:
+            return f.read().strip().startswith("mpath-")
+    except OSError:
+        return False
@@ -0,0 +1,117 @@
+"""Normalization of disk identifiers reported in different formats
+
+Controller tools, lsblk and sysfs report the same WWN, SAS address or
+serial number in slightly different forms. These helpers reduce them to
+one canonical form so they can be used as dictionary keys.
+"""
+
+import string
+from typing import List
+
+# Prefixes used for WWNs by lsblk, udev and the controller tools
+WWN_PREFIXES = ("0x", "naa.", "eui.", "wwn-")
+
+# Length of a NAA-5/6 WWN in hex digits
+NAA_WWN_LENGTH = 16
+
+HEX_DIGITS = set(string.hexdigits)
+
+
+def normalize_wwn(value: str) -> str:
+    """Normalize a WWN or SAS address
+
+    '0x5000C500A1B2C3D4', 'naa.5000c500a1b2c3d4' and '5000c50-0-a1b2-c3d4'
+    all become '5000c500a1b2c3d4'.
+
+    Args:
+        value: WWN as reported by any tool
+
+    Returns:
+        str: Lower-case hex digits, or "" if the value is not a WWN
+    """
+    if not value:
+        return ""
+
+    wwn = value.strip().lower()
+    for prefix in WWN_PREFIXES:
+        if wwn.startswith(prefix):
+            wwn = wwn[len(prefix):]
+            break
+
+    wwn = wwn.replace(":", "").replace("-", "")
+    if not wwn or not set(wwn) <= HEX_DIGITS or not wwn.strip("0"):
+        return ""
+    return wwn
+
+
+def wwn_neighbours(wwn: str) -> List[str]:
+    """Get the WWNs next to a NAA-5 WWN
+
+    The SAS address of a drive port is usually the NAA-5 WWN of the
+    logical unit plus or minus one, so a controller reporting the SAS
+    address can be matched against the WWN seen by the OS.
+
+    Args:
+        wwn: Normalized WWN
+
+    Returns:
+        List[str]: WWN - 1 and WWN + 1, or an empty list for non NAA-5 WWNs
+    """
+    if len(wwn) != NAA_WWN_LENGTH or not wwn.startswith("5"):
+        return []
+
+    value = int(wwn, 16)
+    return [f"{value - 1:0{NAA_WWN_LENGTH}x}", f"{value + 1:0{NAA_WWN_LENGTH}x}"]
+
+
+def normalize_serial(value: str) -> str:
+    """Normalize a serial number
+
+    SATA serial numbers are padded with spaces to 20 characters, and some
+    tools strip the padding while others keep it.
+
+    Args:
+        value: Serial number as reported by any tool
+
+    Returns:
+        str: Upper-case serial without whitespace
+    """
+    if not value or value.strip().lower() in ("null", "n/a"):
+        return ""
+    return "".join(value.split()).upper()
+
+
+def swap_serial_bytes(value: str) -> str:
+    """Swap the characters of each byte pair of a serial number
+
+    ATA IDENTIFY strings store two characters per word, and some
+    controllers report them without fixing the byte order
+    ('WD-WMAYP6774338' appears as 'DWW-AMPY764733 8').
+
+    Args:
+        value: Serial number as reported by any tool
+
+    Returns:
+        str: Normalized byte-swapped serial
+    """
+    serial = value.strip() if value else ""
+    if len(serial) % 2:
+        serial += " "
+    swapped = "".join(serial[i + 1] + serial[i] for i in range(0, len(serial), 2))
+    return normalize_serial(swapped)
+
+
+def format_logical_id(value: str) -> str:
+    """Format an enclosure logical ID like sas2ircu/sas3ircu
+
+    Args:
+        value: Enclosure identifier from sysfs (e.g. '0x5003048000a0dabf')
+
+    Returns:
+        str: Logical ID as 'xxxxxxxx:xxxxxxxx' (e.g. '50030480:00a0dabf'), or "" if invalid
+    """
+    wwn = normalize_wwn(value)
+    if not wwn:
+        return ""
+    wwn = wwn.zfill(NAA_WWN_LENGTH)
+    return f"{wwn[:8]}:{wwn[8:]}"
@@ -0,0 +1,302 @@
+"""Background service turning identify LEDs off after a delay
+
+`--locate --wait` used to block the CLI in time.sleep() before turning the
+LED off again. Instead, the turn-off commands are written to a state file
+and a detached helper process (`python -m storage_topology.led_timer`)
+executes them when they are due. Because pending turn-offs live in the
+state file, a crashed helper is simply restarted and picks them up again.
+"""
+
+import fcntl
+import heapq
+import logging
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .command_runner import CommandRunner
+from .state import get_state_file, is_private_dir, read_json, write_json
+
+
+class TimerWheel:
+    """Hashed timer wheel with fixed-resolution slots
+
+    Items with deadlines in the same slot share one bucket, so adding an
+    item and collecting all due items is cheap even with many pending
+    timers of different expiries.
+    """
+
+    RESOLUTION = 1.0                 # Slot width in seconds
+
+    def __init__(self):
+        """Initialize an empty timer wheel"""
+        self._slots: Dict[int, List[Any]] = {}
+        self._ticks: List[int] = []
+        self._count = 0
+
+    def add(self, deadline: float, item: Any) -> None:
+        """Add an item that becomes due at deadline (epoch seconds)"""
+        tick = math.ceil(deadline / self.RESOLUTION)
+        if tick not in self._slots:
+            self._slots[tick] = []
+            heapq.heappush(self._ticks, tick)
+        self._slots[tick].append(item)
+        self._count += 1
+
+    def pop_due(self, now: float) -> List[Any]:
+        """Remove and return all items whose slot has expired"""
+        due = []
+        while self._ticks and self._ticks[0] * self.RESOLUTION <= now:
+            tick = heapq.heappop(self._ticks)
+            due.extend(self._slots.pop(tick))
+        self._count -= len(due)
+        return due
+
+    def next_deadline(self) -> Optional[float]:
+        """Get the expiry time of the next slot, or None if the wheel is empty"""
+        return self._ticks[0] * self.RESOLUTION if self._ticks else None
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class LedTimerService:
+    """Schedules and executes delayed LED turn-off commands
+
+    Each pending turn-off is stored as {'id', 'key', 'deadline', 'cmd'} in
+    the state file. The key identifies the LED, so scheduling the same LED
+    again replaces its previous deadline.
+
+    A bulk command switching many LEDs at once (e.g. storcli
+    /call/eall/sall) lists the per-LED commands it covers in 'parts'. When
+    one of them is scheduled again or cancelled, the bulk entry is split
+    into per-LED entries for the others, so it no longer turns that LED off.
+    """
+
+    STATE_FILE = "led-timers.json"
+    HELPER_LOCK_FILE = "led-timers.helper.lock"
+
+    # Longest sleep of the helper, so newly scheduled timers are noticed
+    POLL_INTERVAL = 1.0
+
+    # Timeout for a single turn-off command
+    COMMAND_TIMEOUT = 60
+
+    def __init__(self, state_file: Optional[str] = None, logger: Optional[logging.Logger] = None):
+        """Initialize the LED timer service
+
+        Args:
+            state_file: Path to the state file (default: state directory)
+            logger: Logger instance
+        """
+        self.state_file = state_file or get_state_file(self.STATE_FILE)
+        self.logger = logger or logging.getLogger(__name__)
+
+    @property
+    def available(self) -> bool:
+        """Whether a state file can be used"""
+        return self.state_file is not None
+
+    def schedule(self, cmds: List[List[str]], wait_seconds: float,
+                 parts: Optional[List[List[List[str]]]] = None) -> bool:
+        """Schedule commands to run after wait_seconds without blocking
+
+        Args:
+            cmds: LED turn-off commands
+            wait_seconds: Delay in seconds
+            parts: For each command, the per-LED turn-off commands it covers
+
+        Returns:
+            bool: True if scheduled, False if the service is unavailable
+        """
+        if not self.available:
+            return False
+
+        deadline = time.time() + wait_seconds
+        parts = parts or [[] for _ in cmds]
+        keys = {self._key(cmd) for cmd in cmds} | {self._key(part) for cmd_parts in parts for part in cmd_parts}
+
+        try:
+            with self._locked_state() as entries:
+                self._drop(entries, keys)
+                for cmd, cmd_parts in zip(cmds, parts):
+                    entries.append(self._entry(cmd, deadline, cmd_parts))
+        except OSError as e:
+            self.logger.debug(f"Could not update LED timer state: {e}")
+            return False
+
+        return self._spawn_helper()
+
+    def cancel(self, cmds: List[List[str]]) -> None:
+        """Drop pending timers for the LEDs addressed by these turn-off commands"""
+        if not self.available:
+            return
+
+        keys = {self._key(cmd) for cmd in cmds}
+        try:
+            with self._locked_state() as entries:
+                self._drop(entries, keys)
+        except OSError as e:
+            self.logger.debug(f"Could not update LED timer state: {e}")
+
+    def resume_pending(self) -> None:
+        """Restart the helper if turn-offs are pending, e.g. after a crash"""
+        if self.available and read_json(self.state_file):
+            self._spawn_helper()
+
+    def run(self) -> None:
+        """Helper main loop: execute turn-offs when due, exit when none are left"""
+        if not self.available:
+            return
+
+        if not is_private_dir(os.path.dirname(self.state_file)):
+            self.logger.warning(f"Not running LED turn-offs from {self.state_file}: "
+                                f"its directory is not private to this user")
+            return
+
+        with open(self._lock_path(self.HELPER_LOCK_FILE), 'w') as helper_lock:
+            try:
+                fcntl.flock(helper_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another helper is already running
+                return
+
+            runner = CommandRunner(timeout=self.COMMAND_TIMEOUT, logger=self.logger)
+            wheel = TimerWheel()
+            known_ids = set()
+
+            while True:
+                with self._locked_state() as entries:
+                    pending_ids = {entry.get("id") for entry in entries}
+
+                    # Pick up timers scheduled since the last pass
+                    for entry in entries:
+                        if entry.get("id") not in known_ids:
+                            wheel.add(float(entry.get("deadline", 0)), entry)
+                            known_ids.add(entry.get("id"))
+
+                    if not entries:
+                        # Release the helper lock while holding the state lock, so a
+                        # concurrent schedule() either sees us running or can start a new helper
+                        helper_lock.close()
+                        return
+
+                # Cancelled or replaced timers are no longer in the state file
+                due = [entry for entry in wheel.pop_due(time.time()) if entry.get("id") in pending_ids]
+                if due:
+                    self._execute(runner, due)
+                    done_ids = {entry.get("id") for entry in due}
+                    with self._locked_state() as entries:
+                        entries[:] = [entry for entry in entries if entry.get("id") not in done_ids]
+
+                next_deadline = wheel.next_deadline()
+                delay = self.POLL_INTERVAL if next_deadline is None else next_deadline - time.time()
+                time.sleep(min(self.POLL_INTERVAL, max(0.0, delay)))
+
+    def _execute(self, runner: CommandRunner, entries: List[Dict]) -> None:
+        """Run the turn-off commands of due timers concurrently"""
+        cmds = [entry.get("cmd", []) for entry in entries]
+        for cmd, result in zip(cmds, runner.run_many(cmds)):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                result.check()
+                self.logger.debug(f"Turned off LED: {' '.join(cmd)}")
+            except Exception as e:
+                self.logger.warning(f"Failed to turn off LED with {' '.join(cmd)}: {e}")
+
+    def _spawn_helper(self) -> bool:
+        """Start the detached helper process"""
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (package_root, env.get("PYTHONPATH")) if p)
+
+        try:
+            subprocess.Popen(
+                [sys.executable, "-m", __name__, self.state_file],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                env=env
+            )
+            return True
+        except OSError as e:
+            self.logger.debug(f"Could not start LED timer helper: {e}")
+            return False
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[List[Dict]]:
+        """Read-modify-write the state file under an exclusive lock"""
+        with open(self._lock_path(os.path.basename(self.state_file) + ".lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = read_json(self.state_file)
+            entries = data if isinstance(data, list) else []
+            original = list(entries)
+
+            yield entries
+
+            if entries != original:
+                if not write_json(self.state_file, entries):
+                    raise OSError(f"Could not write {self.state_file}")
+
+    def _lock_path(self, name: str) -> str:
+        """Get the path of a lock file next to the state file"""
+        return os.path.join(os.path.dirname(self.state_file), name)
+
+    def _drop(self, entries: List[Dict], keys: set) -> None:
+        """Remove the pending turn-offs of some LEDs
+
+        A bulk entry covering one of the LEDs is replaced by entries for
+        the other LEDs it covers, keeping its deadline.
+
+        Args:
+            entries: Pending entries, modified in place
+            keys: Keys of the LEDs
+        """
+        kept = []
+        for entry in entries:
+            if entry.get("key") in keys:
+                continue
+
+            parts = entry.get("parts") or []
+            if any(self._key(part) in keys for part in parts):
+                kept.extend(self._entry(part, float(entry.get("deadline", 0)))
+                            for part in parts if self._key(part) not in keys)
+                continue
+
+            kept.append(entry)
+
+        entries[:] = kept
+
+    def _entry(self, cmd: List[str], deadline: float, parts: Optional[List[List[str]]] = None) -> Dict:
+        """Build a pending turn-off entry"""
+        entry = {
+            "id": uuid.uuid4().hex,
+            "key": self._key(cmd),
+            "deadline": deadline,
+            "cmd": cmd
+        }
+        if parts:
+            entry["parts"] = parts
+        return entry
+
+    @staticmethod
+    def _key(cmd: List[str]) -> str:
+        """Identify the LED addressed by a turn-off command"""
+        return " ".join(cmd)
+
+
+def main() -> None:
+    """Entry point of the detached helper process"""
+    state_file = sys.argv[1] if len(sys.argv) > 1 else None
+    LedTimerService(state_file=state_file).run()
+
+
+if __name__ == "__main__":
+    main()
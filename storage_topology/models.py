@@ -1,7 +1,10 @@
 """Data models for storage topology"""
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import List, Optional
+
+# Enclosure of NVMe drives in PCIe slots without a configured enclosure
+DEFAULT_NVME_ENCLOSURE = "PCIe"
 
 
 @dataclass
@@ -18,12 +21,18 @@ class Disk:
     manufacturer: str = ""           # Manufacturer name
     size: str = ""                   # Disk size
     vendor: str = ""                 # Vendor information
+    sas_address: str = ""            # SAS address of the drive port
+    paths: List[str] = field(default_factory=list)  # Member path devices (e.g. /dev/sda, /dev/sdx)
 
     # Mapped location information
     enclosure_name: str = ""         # Human-readable enclosure name
     physical_slot: int = 0           # Physical slot number
     logical_disk: int = 0            # Logical disk number
 
+    # Collection status
+    source: str = ""                 # Controller backend that reported the disk
+    complete: bool = True            # False if the source hit a timeout while collecting
+
     def __post_init__(self):
         """Validate and normalize disk data after initialization"""
         # Normalize empty strings to defaults
@@ -57,12 +66,39 @@ class Disk:
             "manufacturer": self.manufacturer,
             "size": self.size,
             "vendor": self.vendor,
+            "sas_address": self.sas_address,
+            "paths": self.paths,
             "enclosure_name": self.enclosure_name,
             "physical_slot": self.physical_slot,
             "logical_disk": self.logical_disk,
-            "location": self.location
+            "location": self.location,
+            "source": self.source,
+            "complete": self.complete
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "Disk":
+        """Create Disk from its dictionary representation"""
+        return cls(
+            dev_name=data.get("dev_name", ""),
+            serial=data.get("serial", ""),
+            model=data.get("model", ""),
+            wwn=data.get("wwn", ""),
+            controller=str(data.get("controller", "")),
+            enclosure=str(data.get("enclosure", "")),
+            slot=int(data.get("slot", 0)),
+            manufacturer=data.get("manufacturer", ""),
+            size=data.get("size", ""),
+            vendor=data.get("vendor", ""),
+            sas_address=data.get("sas_address", ""),
+            paths=list(data.get("paths", [])),
+            enclosure_name=data.get("enclosure_name", ""),
+            physical_slot=int(data.get("physical_slot", 0)),
+            logical_disk=int(data.get("logical_disk", 0)),
+            source=data.get("source", ""),
+            complete=bool(data.get("complete", True))
+        )
+
 
 @dataclass
 class Enclosure:
@@ -87,11 +123,25 @@ class Enclosure:
             "controller": self.controller_id,
             "enclosure": self.enclosure_id,
             "logical_id": self.logical_id,
+            "product_id": self.product_id,
             "type": self.enclosure_type,
             "slots": self.slots,
             "start_slot": self.start_slot
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "Enclosure":
+        """Create Enclosure from its dictionary representation"""
+        return cls(
+            controller_id=str(data.get("controller", "")),
+            enclosure_id=str(data.get("enclosure", "")),
+            logical_id=data.get("logical_id", ""),
+            product_id=data.get("product_id", ""),
+            enclosure_type=data.get("type", "Unknown"),
+            slots=int(data.get("slots", 0)),
+            start_slot=int(data.get("start_slot", 1))
+        )
+
 
 @dataclass
 class EnclosureConfig:
@@ -152,3 +202,106 @@ class DiskMapping:
             slot=int(data.get("slot", 0)),
             disk=int(data.get("disk", 0))
         )
+
+
+@dataclass
+class DiskRule:
+    """Represents a disk mapping for a group of disks
+
+    A rule matches disks by serial glob or regex, by WWN range, or by a
+    slot range in an enclosure. Without a slot, matched disks keep their
+    computed slot and only get the enclosure name.
+    """
+
+    enclosure: str = "Custom"        # Custom enclosure name
+    slot: int = 0                    # Physical slot of the first matched slot (0: computed slot)
+    disk: int = 0                    # Logical disk number of the first matched slot (0: same as slot)
+    serial_pattern: str = ""         # Serial number glob (e.g. 'WD-WMAYP*')
+    serial_regex: str = ""           # Regular expression matching the whole serial number
+    wwn_range: List[str] = field(default_factory=list)   # First and last WWN
+    match_enclosure: str = ""        # Enclosure ID, logical ID or product ID
+    slot_range: List[int] = field(default_factory=list)  # First and last controller slot number
+
+    def to_dict(self) -> dict:
+        """Convert rule to dictionary representation"""
+        return {
+            "enclosure": self.enclosure,
+            "slot": self.slot,
+            "disk": self.disk,
+            "serial_pattern": self.serial_pattern,
+            "serial_regex": self.serial_regex,
+            "wwn_range": self.wwn_range,
+            "match_enclosure": self.match_enclosure,
+            "slot_range": self.slot_range
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DiskRule":
+        """Create DiskRule from dictionary
+
+        Ranges are given as a list of two values or as a 'first-last' string.
+        """
+        return cls(
+            enclosure=data.get("enclosure", "Custom"),
+            slot=int(data.get("slot", 0)),
+            disk=int(data.get("disk", 0)),
+            serial_pattern=str(data.get("serial_pattern", "")),
+            serial_regex=str(data.get("serial_regex", "")),
+            wwn_range=[_format_wwn(value) for value in _parse_range(data.get("wwn_range"))],
+            match_enclosure=str(data.get("match_enclosure", "")),
+            slot_range=[int(value) for value in _parse_range(data.get("slot_range"))]
+        )
+
+
+def _format_wwn(value) -> str:
+    """Format a WWN range bound as a string
+
+    Unquoted hex values such as 0x5000c500a0000000 are integers in YAML,
+    so they are formatted back to hex instead of decimal.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return f"{value:x}"
+    return str(value).strip()
+
+
+def _parse_range(value) -> list:
+    """Parse a range given as [first, last], 'first-last' or a single value"""
+    if value is None or value == "" or value == []:
+        return []
+    if isinstance(value, (list, tuple)):
+        values = list(value)
+    elif isinstance(value, str) and "-" in value:
+        values = [part.strip() for part in value.split("-", 1)]
+    else:
+        values = [value]
+    if len(values) == 1:
+        values = values * 2
+    if len(values) != 2:
+        raise ValueError(f"Invalid range: {value}")
+    return values
+
+
+@dataclass
+class NvmeSlotConfig:
+    """Represents the bay of a PCIe slot holding an NVMe drive"""
+
+    slot: str                        # PCIe slot name (from /sys/bus/pci/slots)
+    enclosure: str = DEFAULT_NVME_ENCLOSURE  # Enclosure name
+    bay: int = 0                     # Physical bay number (0: use the slot name)
+
+    def to_dict(self) -> dict:
+        """Convert slot config to dictionary representation"""
+        return {
+            "slot": self.slot,
+            "enclosure": self.enclosure,
+            "bay": self.bay
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NvmeSlotConfig":
+        """Create NvmeSlotConfig from dictionary"""
+        return cls(
+            slot=str(data.get("slot", "")),
+            enclosure=data.get("enclosure", DEFAULT_NVME_ENCLOSURE),
+            bay=int(data.get("bay", 0))
+        )
@@ -0,0 +1,448 @@
+"""SES diagnostic pages read over SG_IO, for enclosures without the ses driver
+
+The decoders take the raw page bytes, so pages captured from a JBOD can
+be decoded again later:
+
+    python -m storage_topology.sg_ses /dev/sg5 --save pages/
+    python -m storage_topology.sg_ses --load pages/
+"""
+
+import argparse
+import ctypes
+import fcntl
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .identifiers import format_logical_id
+
+# ioctl request of the Linux SCSI generic driver
+SG_IO = 0x2285
+SG_DXFER_FROM_DEV = -3
+SG_INFO_OK_MASK = 0x1
+
+# Host and driver status of a command that timed out
+DID_TIME_OUT = 0x03
+DRIVER_TIMEOUT = 0x06
+DRIVER_STATUS_MASK = 0x0F
+
+RECEIVE_DIAGNOSTIC_RESULTS = 0x1C
+MAX_PAGE_LENGTH = 0xFFFC
+SENSE_BUFFER_LENGTH = 32
+DEFAULT_TIMEOUT_MS = 20000
+
+# SES diagnostic pages
+CONFIGURATION_PAGE = 0x01
+ENCLOSURE_STATUS_PAGE = 0x02
+ADDITIONAL_ELEMENT_STATUS_PAGE = 0x0A
+
+# Element types holding disks
+DEVICE_SLOT = 0x01
+ARRAY_DEVICE_SLOT = 0x17
+SLOT_ELEMENT_TYPES = (DEVICE_SLOT, ARRAY_DEVICE_SLOT)
+
+# Element types that have additional element status descriptors (device slot,
+# ESCE, SCSI target/initiator port, array device slot, SAS expander)
+ADDITIONAL_STATUS_ELEMENT_TYPES = (DEVICE_SLOT, 0x07, 0x14, 0x15, ARRAY_DEVICE_SLOT, 0x18)
+
+# Element status code of an empty slot
+STATUS_NOT_INSTALLED = 5
+
+SAS_PROTOCOL = 0x6
+SAS_PHY_DESCRIPTOR_LENGTH = 28
+
+# Peripheral device type of enclosure services devices in sysfs
+SES_DEVICE_TYPE = "13"
+
+# Captured pages are saved as page01.bin, page02.bin and page0a.bin
+PAGE_FILE_FORMAT = "page{:02x}.bin"
+
+
+class SgIoHeader(ctypes.Structure):
+    """struct sg_io_hdr from <scsi/sg.h>"""
+
+    _fields_ = [
+        ("interface_id", ctypes.c_int),
+        ("dxfer_direction", ctypes.c_int),
+        ("cmd_len", ctypes.c_ubyte),
+        ("mx_sb_len", ctypes.c_ubyte),
+        ("iovec_count", ctypes.c_ushort),
+        ("dxfer_len", ctypes.c_uint),
+        ("dxferp", ctypes.c_void_p),
+        ("cmdp", ctypes.c_void_p),
+        ("sbp", ctypes.c_void_p),
+        ("timeout", ctypes.c_uint),
+        ("flags", ctypes.c_uint),
+        ("pack_id", ctypes.c_int),
+        ("usr_ptr", ctypes.c_void_p),
+        ("status", ctypes.c_ubyte),
+        ("masked_status", ctypes.c_ubyte),
+        ("msg_status", ctypes.c_ubyte),
+        ("sb_len_wr", ctypes.c_ubyte),
+        ("host_status", ctypes.c_ushort),
+        ("driver_status", ctypes.c_ushort),
+        ("resid", ctypes.c_int),
+        ("duration", ctypes.c_uint),
+        ("info", ctypes.c_uint),
+    ]
+
+
+@dataclass
+class TypeDescriptor:
+    """Type descriptor header of the configuration page"""
+
+    element_type: int                # SES element type code
+    count: int                       # Number of possible elements
+    subenclosure_id: int             # Subenclosure the elements belong to
+    text: str = ""                   # Type descriptor text
+
+
+@dataclass
+class EnclosureConfiguration:
+    """Decoded configuration page"""
+
+    logical_ids: Dict[int, str] = field(default_factory=dict)  # Subenclosure ID -> logical ID
+    vendors: Dict[int, str] = field(default_factory=dict)      # Subenclosure ID -> vendor
+    products: Dict[int, str] = field(default_factory=dict)     # Subenclosure ID -> product ID
+    type_descriptors: List[TypeDescriptor] = field(default_factory=list)
+
+
+@dataclass
+class SesSlot:
+    """Device slot element with its status and attached SAS addresses"""
+
+    subenclosure_id: int             # Subenclosure the slot belongs to
+    element_index: int               # Index among all individual elements
+    slot: int                        # Device slot number
+    status: int = 0                  # Element status code
+    ident: bool = False              # Identify LED on
+    fault: bool = False              # Fault sensed or requested
+    sas_addresses: List[str] = field(default_factory=list)  # SAS addresses of the attached device ports
+
+    @property
+    def occupied(self) -> bool:
+        """Whether a device is installed in the slot"""
+        return self.status != STATUS_NOT_INSTALLED
+
+
+def read_diagnostic_page(device: str, page: int, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> bytes:
+    """Read an SES diagnostic page with RECEIVE DIAGNOSTIC RESULTS
+
+    Args:
+        device: SCSI generic device of the enclosure (e.g. /dev/sg5)
+        page: Diagnostic page code
+        timeout_ms: Command timeout in milliseconds
+
+    Returns:
+        Page bytes, truncated to the page length
+
+    Raises:
+        TimeoutError: If the command did not finish within timeout_ms
+        OSError: If the device cannot be opened or the command fails
+    """
+    cdb = (ctypes.c_ubyte * 6)(RECEIVE_DIAGNOSTIC_RESULTS, 0x01, page,
+                               MAX_PAGE_LENGTH >> 8, MAX_PAGE_LENGTH & 0xFF, 0)
+    buffer = ctypes.create_string_buffer(MAX_PAGE_LENGTH)
+    sense = ctypes.create_string_buffer(SENSE_BUFFER_LENGTH)
+
+    header = SgIoHeader(
+        interface_id=ord('S'),
+        dxfer_direction=SG_DXFER_FROM_DEV,
+        cmd_len=len(cdb),
+        mx_sb_len=SENSE_BUFFER_LENGTH,
+        dxfer_len=MAX_PAGE_LENGTH,
+        dxferp=ctypes.cast(buffer, ctypes.c_void_p),
+        cmdp=ctypes.cast(cdb, ctypes.c_void_p),
+        sbp=ctypes.cast(sense, ctypes.c_void_p),
+        timeout=timeout_ms
+    )
+
+    fd = os.open(device, os.O_RDWR | os.O_NONBLOCK)
+    try:
+        fcntl.ioctl(fd, SG_IO, header)
+    finally:
+        os.close(fd)
+
+    if header.host_status == DID_TIME_OUT or header.driver_status & DRIVER_STATUS_MASK == DRIVER_TIMEOUT:
+        raise TimeoutError(f"RECEIVE DIAGNOSTIC RESULTS page 0x{page:02x} timed out on {device} "
+                           f"after {timeout_ms} ms")
+
+    if header.info & SG_INFO_OK_MASK:
+        raise OSError(f"RECEIVE DIAGNOSTIC RESULTS page 0x{page:02x} failed on {device} "
+                      f"(status 0x{header.status:02x}, host 0x{header.host_status:x}, "
+                      f"driver 0x{header.driver_status:x})")
+
+    received = MAX_PAGE_LENGTH - header.resid
+    data = buffer.raw[:received]
+    if len(data) < 4 or data[0] != page:
+        raise OSError(f"Invalid SES page 0x{page:02x} returned by {device}")
+
+    return data[:4 + int.from_bytes(data[2:4], "big")]
+
+
+def read_pages(device: str, timeout_ms: int = DEFAULT_TIMEOUT_MS,
+               deadline: Optional[float] = None) -> Dict[int, bytes]:
+    """Read the configuration, enclosure status and additional element status pages
+
+    Args:
+        device: SCSI generic device of the enclosure
+        timeout_ms: Command timeout in milliseconds
+        deadline: Absolute time.monotonic() value capping the timeout of every page
+
+    Returns:
+        Dict of page code -> page bytes; the additional element status
+        page is left out if the enclosure does not support it
+
+    Raises:
+        TimeoutError: If a page did not arrive in time or the deadline has passed
+        OSError: If a mandatory page cannot be read
+    """
+    def read(page: int) -> bytes:
+        page_timeout_ms = timeout_ms
+        if deadline is not None:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                raise TimeoutError(f"Deadline exceeded, not reading SES page 0x{page:02x} from {device}")
+            page_timeout_ms = min(page_timeout_ms, remaining_ms)
+        return read_diagnostic_page(device, page, page_timeout_ms)
+
+    pages = {
+        CONFIGURATION_PAGE: read(CONFIGURATION_PAGE),
+        ENCLOSURE_STATUS_PAGE: read(ENCLOSURE_STATUS_PAGE)
+    }
+    try:
+        pages[ADDITIONAL_ELEMENT_STATUS_PAGE] = read(ADDITIONAL_ELEMENT_STATUS_PAGE)
+    except TimeoutError:
+        raise
+    except OSError:
+        pass
+    return pages
+
+
+def decode_configuration_page(data: bytes) -> EnclosureConfiguration:
+    """Decode the configuration page (0x01)
+
+    Args:
+        data: Page bytes
+
+    Returns:
+        Logical IDs of the subenclosures and the type descriptor headers
+    """
+    config = EnclosureConfiguration()
+    if len(data) < 8 or data[0] != CONFIGURATION_PAGE:
+        return config
+
+    offset = 8
+    header_count = 0
+    for _ in range(data[1] + 1):
+        if offset + 12 > len(data):
+            break
+        subenclosure_id = data[offset + 1]
+        header_count += data[offset + 2]
+        config.logical_ids[subenclosure_id] = format_logical_id(data[offset + 4:offset + 12].hex())
+        config.vendors[subenclosure_id] = data[offset + 12:offset + 20].decode('ascii', errors='replace').strip()
+        config.products[subenclosure_id] = data[offset + 20:offset + 36].decode('ascii', errors='replace').strip()
+        offset += data[offset + 3] + 4
+
+    text_lengths = []
+    for _ in range(header_count):
+        if offset + 4 > len(data):
+            break
+        config.type_descriptors.append(TypeDescriptor(data[offset], data[offset + 1], data[offset + 2]))
+        text_lengths.append(data[offset + 3])
+        offset += 4
+
+    for descriptor, length in zip(config.type_descriptors, text_lengths):
+        descriptor.text = data[offset:offset + length].decode('ascii', errors='replace').strip()
+        offset += length
+
+    return config
+
+
+def decode_slots(config: EnclosureConfiguration, status_page: bytes,
+                 additional_page: Optional[bytes] = None) -> List[SesSlot]:
+    """Decode the device slots from the enclosure status and additional element status pages
+
+    Args:
+        config: Decoded configuration page
+        status_page: Enclosure status page (0x02) bytes
+        additional_page: Additional element status page (0x0A) bytes, if supported
+
+    Returns:
+        Device slots in element order
+    """
+    slots: Dict[int, SesSlot] = {}
+    # Element index with and without the overall elements, keyed by the latter
+    element_types: Dict[int, int] = {}
+    overall_indexes: Dict[int, int] = {}
+
+    offset = 8
+    element_index = 0
+    overall_index = 0
+    for descriptor in config.type_descriptors:
+        offset += 4  # Overall status element
+        overall_index += 1
+        for position in range(descriptor.count):
+            element_types[element_index] = descriptor.element_type
+            overall_indexes[overall_index] = element_index
+            if descriptor.element_type in SLOT_ELEMENT_TYPES:
+                element = status_page[offset:offset + 4] if len(status_page) >= offset + 4 else bytes(4)
+                slots[element_index] = SesSlot(
+                    subenclosure_id=descriptor.subenclosure_id,
+                    element_index=element_index,
+                    slot=position,
+                    status=element[0] & 0x0F,
+                    ident=bool(element[2] & 0x02),
+                    fault=bool(element[3] & 0x60)
+                )
+            offset += 4
+            element_index += 1
+            overall_index += 1
+
+    if additional_page:
+        _decode_additional_status(additional_page, slots, element_types, overall_indexes)
+
+    return list(slots.values())
+
+
+def _decode_additional_status(data: bytes, slots: Dict[int, SesSlot], element_types: Dict[int, int],
+                              overall_indexes: Dict[int, int]) -> None:
+    """Add slot numbers and SAS addresses from the additional element status page (0x0A)
+
+    Args:
+        data: Page bytes
+        slots: Device slots keyed by element index, updated in place
+        element_types: Element type of each element index
+        overall_indexes: Element index for each index that counts overall elements
+    """
+    if len(data) < 8 or data[0] != ADDITIONAL_ELEMENT_STATUS_PAGE:
+        return
+
+    # Without element indexes, descriptors follow the order of the elements that have them
+    implicit_indexes = iter([index for index, element_type in sorted(element_types.items())
+                             if element_type in ADDITIONAL_STATUS_ELEMENT_TYPES])
+
+    offset = 8
+    while offset + 2 <= len(data):
+        descriptor = data[offset:offset + data[offset + 1] + 2]
+        offset += len(descriptor)
+
+        invalid = bool(descriptor[0] & 0x80)
+        eip = bool(descriptor[0] & 0x10)
+        protocol = descriptor[0] & 0x0F
+
+        if eip and len(descriptor) >= 4:
+            element_index = descriptor[3]
+            if descriptor[2] & 0x01:  # EIIOE: index counts the overall elements
+                element_index = overall_indexes.get(element_index, -1)
+            specific = descriptor[4:]
+        else:
+            element_index = next(implicit_indexes, -1)
+            specific = descriptor[2:]
+
+        slot = slots.get(element_index)
+        if invalid or slot is None or protocol != SAS_PROTOCOL or len(specific) < 4:
+            continue
+        if specific[1] >> 6 != 0:  # Only descriptor type 0 describes device slots
+            continue
+
+        if eip:
+            slot.slot = specific[3]
+
+        for phy in range(specific[0]):
+            start = 4 + phy * SAS_PHY_DESCRIPTOR_LENGTH
+            phy_descriptor = specific[start:start + SAS_PHY_DESCRIPTOR_LENGTH]
+            if len(phy_descriptor) < SAS_PHY_DESCRIPTOR_LENGTH:
+                break
+            sas_address = int.from_bytes(phy_descriptor[12:20], "big")
+            if sas_address:
+                slot.sas_addresses.append(f"0x{sas_address:016x}")
+
+
+def decode_pages(pages: Dict[int, bytes]) -> Tuple[EnclosureConfiguration, List[SesSlot]]:
+    """Decode captured or freshly read SES pages
+
+    Args:
+        pages: Dict of page code -> page bytes
+
+    Returns:
+        Tuple of (configuration, device slots)
+    """
+    config = decode_configuration_page(pages.get(CONFIGURATION_PAGE, b""))
+    slots = decode_slots(config, pages.get(ENCLOSURE_STATUS_PAGE, b""),
+                         pages.get(ADDITIONAL_ELEMENT_STATUS_PAGE))
+    return config, slots
+
+
+def find_enclosure_devices(sysfs_root: str = "/sys") -> List[Tuple[str, str]]:
+    """Find the SCSI generic devices of enclosure services devices
+
+    Args:
+        sysfs_root: Root of the sysfs tree
+
+    Returns:
+        List of (device node, SCSI address H:C:T:L)
+    """
+    devices = []
+    class_dir = os.path.join(sysfs_root, "class", "scsi_generic")
+
+    try:
+        names = sorted(os.listdir(class_dir))
+    except OSError:
+        return devices
+
+    for name in names:
+        device_dir = os.path.join(class_dir, name, "device")
+        try:
+            with open(os.path.join(device_dir, "type"), 'r') as f:
+                device_type = f.read().strip()
+        except OSError:
+            continue
+        if device_type == SES_DEVICE_TYPE:
+            devices.append((f"/dev/{name}", os.path.basename(os.path.realpath(device_dir))))
+
+    return devices
+
+
+def main() -> None:
+    """Print the slot mapping of an enclosure, reading or saving raw pages"""
+    parser = argparse.ArgumentParser(description="Decode SES diagnostic pages of an enclosure")
+    parser.add_argument("device", nargs='?', help="SCSI generic device of the enclosure (e.g. /dev/sg5)")
+    parser.add_argument("--save", metavar="DIR", help="Save the raw pages read from the device")
+    parser.add_argument("--load", metavar="DIR", help="Decode raw pages saved with --save")
+    args = parser.parse_args()
+
+    if args.load:
+        pages = {}
+        for page in (CONFIGURATION_PAGE, ENCLOSURE_STATUS_PAGE, ADDITIONAL_ELEMENT_STATUS_PAGE):
+            try:
+                with open(os.path.join(args.load, PAGE_FILE_FORMAT.format(page)), 'rb') as f:
+                    pages[page] = f.read()
+            except OSError:
+                pass
+    elif args.device:
+        pages = read_pages(args.device)
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            for page, data in pages.items():
+                with open(os.path.join(args.save, PAGE_FILE_FORMAT.format(page)), 'wb') as f:
+                    f.write(data)
+    else:
+        parser.error("a device or --load is required")
+
+    config, slots = decode_pages(pages)
+    json.dump({
+        "enclosures": [{"subenclosure": subenclosure_id, "logical_id": logical_id,
+                        "vendor": config.vendors.get(subenclosure_id, ""),
+                        "product": config.products.get(subenclosure_id, "")}
+                       for subenclosure_id, logical_id in config.logical_ids.items()],
+        "slots": [asdict(slot) for slot in slots]
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
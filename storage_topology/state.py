@@ -0,0 +1,111 @@
+"""Helpers for small persistent state files"""
+
+import json
+import os
+import stat
+import tempfile
+from typing import Any, Optional
+
+# Candidate directories for state files, in order of preference
+STATE_DIRS = ("/run/storage-topology", "~/.cache/storage-topology")
+
+# Environment variable to override the state directory
+STATE_DIR_ENV = "STORAGE_TOPOLOGY_STATE_DIR"
+
+
+def get_state_dir() -> Optional[str]:
+    """Get a writable directory for state files
+
+    Returns:
+        Path of the first usable state directory, or None if none is writable
+    """
+    candidates = [os.environ[STATE_DIR_ENV]] if os.environ.get(STATE_DIR_ENV) else list(STATE_DIRS)
+
+    for candidate in candidates:
+        path = os.path.expanduser(candidate)
+        try:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+        except OSError:
+            continue
+        if is_private_dir(path) and os.access(path, os.W_OK):
+            return path
+
+    return None
+
+
+def is_private_dir(path: str) -> bool:
+    """Check if a directory belongs to the current user and is closed to everyone else
+
+    State files hold commands the LED timer helper executes, so a directory
+    another user can write to (or replace through a symlink) is not trusted.
+    A directory of the current user with a looser mode is tightened.
+
+    Args:
+        path: Directory to check
+
+    Returns:
+        bool: True if the directory is owned by the current user with mode 0700
+    """
+    try:
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.geteuid():
+            return False
+        if stat.S_IMODE(st.st_mode) != 0o700:
+            os.chmod(path, 0o700)
+    except OSError:
+        return False
+    return True
+
+
+def get_state_file(name: str) -> Optional[str]:
+    """Get the full path of a state file
+
+    Args:
+        name: File name inside the state directory
+
+    Returns:
+        Path to the state file, or None if no state directory is usable
+    """
+    state_dir = get_state_dir()
+    return os.path.join(state_dir, name) if state_dir else None
+
+
+def read_json(path: str) -> Optional[Any]:
+    """Read a JSON state file
+
+    Args:
+        path: Path to the state file
+
+    Returns:
+        Parsed data, or None if the file is missing or unreadable
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path: str, data: Any) -> bool:
+    """Atomically write a JSON state file readable only by the owner
+
+    Args:
+        path: Path to the state file
+        data: JSON-serializable data
+
+    Returns:
+        bool: True if the file was written, False otherwise
+    """
+    directory = os.path.dirname(path) or "."
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
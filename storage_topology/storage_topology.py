@@ -3,13 +3,24 @@
 import argparse
 import json
 import logging
+import os
+import subprocess
 import sys
-from typing import List, Optional, Dict, Any
-
-from .controllers import BaseController, StorcliController, SasIrcuController
-from .models import Disk
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Dict, Any, Set, Tuple
+
+from .command_runner import CommandRunner
+from .controllers import (BaseController, StorcliController, SasIrcuController, SasEndDeviceController,
+                          SesController, NvmeController, CompositeController)
+from .models import Disk, Enclosure, NvmeSlotConfig
 from .config import ConfigManager
+from .daemon import DaemonClient, DaemonError, TopologyDaemon
+from .detection_cache import DetectionCache
 from .disk_mapper import DiskMapper
+from .led_timer import LedTimerService
+from .topology_cache import TopologyCache
+from .watch import Topology, TopologyWatcher
 from .truenas_api import TrueNASAPI
 
 
@@ -24,6 +35,21 @@ class StorageTopology:
     - TrueNAS API integration
     """
 
+    # Default timeout in seconds for a single controller command
+    DEFAULT_COMMAND_TIMEOUT = 300
+
+    # Controller backends in priority order
+    CONTROLLER_TYPES = ("storcli", "sas2ircu", "sas3ircu", "sas_end_device", "ses", "nvme")
+
+    # Default seconds between refreshes of --watch
+    DEFAULT_WATCH_INTERVAL = 5.0
+
+    # Backends whose topology the sas_end_device backend replaces with --sas-sysfs
+    SAS_IRCU_TYPES = ("sas2ircu", "sas3ircu")
+
+    # Backends reporting disks behind SAS HBAs and RAID controllers, including those in SES enclosures
+    SAS_TYPES = ("storcli",) + SAS_IRCU_TYPES + ("sas_end_device",)
+
     def __init__(self):
         """Initialize the StorageTopology instance"""
         # Options
@@ -43,14 +69,32 @@ class StorageTopology:
         self.locate_all = False
         self.locate_all_off = False
         self.wait_seconds = None
+        self.wait_foreground = False
         self.enclosure_id = None
+        self.max_concurrency = SasIrcuController.DEFAULT_MAX_WORKERS
+        self.redetect = False
+        self.sas_sysfs = False
+        self.enrich = False
+        self.ses = False
+        self.controller_type = None
+        self.command_timeout = self.DEFAULT_COMMAND_TIMEOUT
+        self.deadline = None
+        self.max_age = None
+        self.stale_ok = False
+        self.refresh_cache = False
+        self.daemon = False
+        self.no_daemon = False
+        self.refresh_slot_location = None
+        self.watch_interval = None
 
         # Components (initialized later)
         self.logger = self._setup_logger()
+        self.runner: Optional[CommandRunner] = None
         self.controller: Optional[BaseController] = None
         self.config_manager: Optional[ConfigManager] = None
         self.disk_mapper: Optional[DiskMapper] = None
         self.truenas_api: Optional[TrueNASAPI] = None
+        self.topology_cache: Optional[TopologyCache] = None
 
         # Data
         self.disks: List[Disk] = []
@@ -81,6 +125,8 @@ class StorageTopology:
         parser.add_argument("-l", "--long", action="store_true", help="Display all available disk information")
         parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
         parser.add_argument("-q", "--quiet", action="store_true", help="Suppress INFO messages")
+        parser.add_argument("-c", "--controller", choices=self.CONTROLLER_TYPES,
+                          help="Use only the specified controller backend")
         parser.add_argument("--query", nargs='?', const='all', metavar="DISK_NAME",
                           help="Query disk information from TrueNAS")
         parser.add_argument("--sort-by", choices=["disk", "serial", "model", "size", "description", "pool"],
@@ -103,8 +149,51 @@ class StorageTopology:
                           help="Turn off the identify LED for all disks")
         parser.add_argument("--wait", type=int, metavar="SECONDS",
                           help="LED blink duration in seconds (1-60)")
+        parser.add_argument("--wait-foreground", action="store_true",
+                          help="Block until the LEDs are turned off again instead of "
+                               "returning immediately and turning them off in the background")
         parser.add_argument("-e", "--enclosure", nargs='?', const='all', metavar="ENCLOSURE_ID",
                           help="Show enclosure information and generate config snippet")
+        parser.add_argument("--max-concurrency", type=int, metavar="N",
+                          default=SasIrcuController.DEFAULT_MAX_WORKERS,
+                          help="Maximum number of controller commands to run in parallel "
+                               f"(default: {SasIrcuController.DEFAULT_MAX_WORKERS})")
+        parser.add_argument("--redetect", action="store_true",
+                          help="Ignore the cached controller detection and probe all controllers again")
+        parser.add_argument("--sas-sysfs", action="store_true",
+                          help="Read the topology of mpt2sas/mpt3sas HBAs from /sys/class/sas_device even "
+                               "if sas2ircu/sas3ircu is installed; controller IDs become SCSI host numbers "
+                               "and enclosure IDs enclosure logical IDs")
+        parser.add_argument("--enrich", action="store_true",
+                          help="With --sas-sysfs, fill in disk details missing from sysfs from "
+                               "sas2ircu/sas3ircu")
+        parser.add_argument("--ses", action="store_true",
+                          help="Also read SES enclosures next to storcli, sas2ircu/sas3ircu or the "
+                               "sas_end_device backend (by default SES is only used without them)")
+        parser.add_argument("--timeout", type=float, metavar="SECONDS", default=self.DEFAULT_COMMAND_TIMEOUT,
+                          help="Kill a controller command that runs longer than this "
+                               f"(default: {self.DEFAULT_COMMAND_TIMEOUT})")
+        parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                          help="Return whatever topology was collected after this many seconds; "
+                               "disks from sources that ran out of time are marked incomplete")
+        parser.add_argument("--max-age", type=float, metavar="SECONDS",
+                          help="Use the topology cached by an earlier run if it is at most this old "
+                               "and no block device or configuration has changed")
+        parser.add_argument("--stale-ok", action="store_true",
+                          help="Use an older cached topology and refresh the cache in the background")
+        parser.add_argument("--refresh-cache", action="store_true", help=argparse.SUPPRESS)
+        parser.add_argument("--refresh-slot", metavar="ENCL:SLOT",
+                          help="Read a single bay again and update the cached topology, e.g. after a "
+                               "drive replacement (enclosure name and slot as shown, or the controller's "
+                               "enclosure ID and slot from --long)")
+        parser.add_argument("--watch", nargs='?', type=float, const=self.DEFAULT_WATCH_INTERVAL,
+                          metavar="SECONDS",
+                          help="Keep running and print only topology changes, refreshing every SECONDS "
+                               f"(default: {self.DEFAULT_WATCH_INTERVAL:g}) or on disk hotplug events")
+        parser.add_argument("--daemon", action="store_true",
+                          help="Keep the topology in memory and serve it over a Unix socket")
+        parser.add_argument("--no-daemon", action="store_true",
+                          help="Scan the controllers even if a daemon is running")
 
         args = parser.parse_args()
 
@@ -123,9 +212,25 @@ class StorageTopology:
         self.locate_all = args.locate_all
         self.locate_all_off = args.locate_all_off
         self.wait_seconds = args.wait
+        self.wait_foreground = args.wait_foreground
         self.pool_disks_only = args.pool_disks_only
         self.pool_name = args.pool
         self.enclosure_id = args.enclosure
+        self.max_concurrency = args.max_concurrency
+        self.redetect = args.redetect
+        self.sas_sysfs = args.sas_sysfs
+        self.enrich = args.enrich
+        self.ses = args.ses
+        self.controller_type = args.controller
+        self.command_timeout = args.timeout
+        self.deadline = args.deadline
+        self.max_age = args.max_age
+        self.stale_ok = args.stale_ok
+        self.refresh_cache = args.refresh_cache
+        self.daemon = args.daemon
+        self.no_daemon = args.no_daemon
+        self.refresh_slot_location = args.refresh_slot
+        self.watch_interval = args.watch
 
         # Configure logger
         if self.verbose:
@@ -143,43 +248,256 @@ class StorageTopology:
                 self.logger.error("Wait time must be between 1 and 60 seconds")
                 sys.exit(1)
 
+        if self.enrich and not self.sas_sysfs:
+            self.logger.error("--enrich requires --sas-sysfs")
+            sys.exit(1)
+
+        # Validate concurrency
+        if self.max_concurrency < 1:
+            self.logger.error("Maximum concurrency must be at least 1")
+            sys.exit(1)
+
+        # Validate timeouts
+        if self.command_timeout <= 0 or (self.deadline is not None and self.deadline <= 0):
+            self.logger.error("Timeout and deadline must be positive")
+            sys.exit(1)
+
+        if self.refresh_slot_location is not None and \
+                not self.refresh_slot_location.rpartition(":")[2].isdigit():
+            self.logger.error("Slot must be given as ENCLOSURE:SLOT")
+            sys.exit(1)
+
+        if self.watch_interval is not None and self.watch_interval <= 0:
+            self.logger.error("Watch interval must be positive")
+            sys.exit(1)
+
+        if self.max_age is not None and self.max_age < 0:
+            self.logger.error("Maximum cache age must not be negative")
+            sys.exit(1)
+
     def detect_controller(self) -> BaseController:
         """Detect and return available controller
 
+        All backends are probed concurrently. If more than one is available,
+        a CompositeController merging all of them is returned.
+
+        The detected backends are cached together with a hardware fingerprint,
+        so later runs skip probing until the HBAs or controller tools change.
+
+        sas2ircu/sas3ircu report the topology of mpt2sas/mpt3sas HBAs where
+        they are installed. With --sas-sysfs, the sas_end_device backend
+        reads it from sysfs instead, and sas2ircu/sas3ircu are only queried
+        with --enrich. SES enclosures are read only if none of these backends
+        is available, or with --ses.
+
         Returns:
             BaseController instance
 
         Raises:
             SystemExit: If no controller is found
         """
+        if self.controller_type:
+            controllers, _ = self._probe_controllers([self.controller_type])
+            self.logger.info(f"Selected controller: {self._describe_controllers(controllers)}")
+            return controllers[0]
+
         self.logger.info("Detecting available controllers...")
 
-        # Try storcli2/storcli
-        storcli_controller = StorcliController(logger=self.logger)
-        if storcli_controller.is_available():
-            self.logger.info(f"Selected controller: storcli ({storcli_controller.cmd})")
-            return storcli_controller
-
-        # Try sas2ircu
-        sas2_controller = SasIrcuController(logger=self.logger, controller_type="sas2ircu")
-        if sas2_controller.is_available():
-            self.logger.info("Selected controller: sas2ircu")
-            return sas2_controller
-
-        # Try sas3ircu
-        sas3_controller = SasIrcuController(logger=self.logger, controller_type="sas3ircu")
-        if sas3_controller.is_available():
-            self.logger.info("Selected controller: sas3ircu")
-            return sas3_controller
-
-        self.logger.error("No controller found. Please install storcli, storcli2, sas2ircu, or sas3ircu.")
-        sys.exit(1)
+        detection_cache = DetectionCache(logger=self.logger)
+        fingerprint = detection_cache.fingerprint({"sas_sysfs": self.sas_sysfs, "ses": self.ses})
+
+        controllers = None
+        if not self.redetect and not self.enrich:
+            cached = detection_cache.load(fingerprint)
+            if cached:
+                controllers = [self._create_controller(entry.get("type", ""), entry.get("cmd", ""))
+                               for entry in cached]
+                if all(controllers):
+                    self.logger.info(f"Selected controller: {self._describe_controllers(controllers)} (cached)")
+                else:
+                    controllers = None
+
+        if not controllers:
+            controllers, probes_complete = self._probe_controllers()
+            # A probe that timed out may have missed a backend, so do not cache that result
+            if probes_complete and not self.enrich:
+                detection_cache.save(fingerprint, [{"type": c.controller_type, "cmd": c.cmd} for c in controllers])
+            self.logger.info(f"Selected controller: {self._describe_controllers(controllers)}")
+
+        if len(controllers) == 1:
+            return controllers[0]
+
+        return CompositeController(controllers, logger=self.logger)
+
+    def _create_controller(self, controller_type: str, cmd: str) -> Optional[BaseController]:
+        """Create a controller for a known backend without probing it
+
+        Args:
+            controller_type: Controller type ('storcli', 'sas2ircu', 'sas3ircu', 'sas_end_device', 'ses'
+                or 'nvme')
+            cmd: Command used by the controller
+
+        Returns:
+            BaseController instance, or None for an unknown controller type
+        """
+        if controller_type == "storcli" and cmd:
+            return StorcliController(logger=self.logger, cmd=cmd, runner=self.runner)
+
+        if controller_type in ("sas2ircu", "sas3ircu"):
+            return SasIrcuController(logger=self.logger, controller_type=controller_type,
+                                     max_workers=self.max_concurrency, runner=self.runner)
+
+        if controller_type == "sas_end_device":
+            return SasEndDeviceController(logger=self.logger, runner=self.runner)
+
+        if controller_type == "ses":
+            return SesController(logger=self.logger, runner=self.runner)
+
+        if controller_type == "nvme":
+            return NvmeController(logger=self.logger, runner=self.runner, slot_table=self._get_nvme_slot_table())
+
+        return None
+
+    def _probe_controllers(self, controller_types: Optional[List[str]] = None) -> Tuple[List[BaseController], bool]:
+        """Probe controller backends concurrently
+
+        Args:
+            controller_types: Backends to probe (default: all)
+
+        Returns:
+            Tuple of (available controllers in priority order (storcli, sas2ircu, sas3ircu,
+            sas_end_device, ses, nvme),
+            whether all probes finished without a timeout)
+
+        Raises:
+            SystemExit: If no controller is found
+        """
+        all_factories: Dict[str, Callable[[], BaseController]] = {
+            "storcli": lambda: StorcliController(logger=self.logger, runner=self.runner),
+            "sas2ircu": lambda: SasIrcuController(logger=self.logger, controller_type="sas2ircu",
+                                                  max_workers=self.max_concurrency, runner=self.runner),
+            "sas3ircu": lambda: SasIrcuController(logger=self.logger, controller_type="sas3ircu",
+                                                  max_workers=self.max_concurrency, runner=self.runner),
+            "sas_end_device": lambda: SasEndDeviceController(logger=self.logger, runner=self.runner),
+            "ses": lambda: SesController(logger=self.logger, runner=self.runner),
+            "nvme": lambda: NvmeController(logger=self.logger, runner=self.runner,
+                                           slot_table=self._get_nvme_slot_table()),
+        }
+        selecting = not controller_types
+        if selecting:
+            controller_types = list(all_factories)
+            # Reading sysfs is cheap, so check it first and skip the slow sas2ircu/sas3ircu scans
+            if self.sas_sysfs and not self.enrich and \
+                    SasEndDeviceController(logger=self.logger).resolves_all_disks():
+                self.logger.debug("SAS topology available in sysfs, skipping sas2ircu/sas3ircu")
+                controller_types = [t for t in controller_types if t not in self.SAS_IRCU_TYPES]
+        factories = [factory for controller_type, factory in all_factories.items()
+                     if controller_type in controller_types]
+
+        def probe(factory: Callable[[], BaseController]) -> Tuple[Optional[BaseController], bool]:
+            try:
+                controller = factory()
+                available = controller.is_available()
+                return (controller if available else None), controller.complete
+            except Exception as e:
+                self.logger.debug(f"Error probing controller: {e}")
+                return None, True
+
+        with ThreadPoolExecutor(max_workers=len(factories)) as executor:
+            results = list(executor.map(probe, factories))
+
+        controllers = [controller for controller, _ in results if controller]
+        if selecting:
+            controllers = self._select_ses_backend(self._select_sas_backend(controllers))
+        if not controllers:
+            self.logger.error("No controller found. Please install storcli, storcli2, sas2ircu, or sas3ircu, "
+                              "or attach an SES-capable enclosure or NVMe drives in hot-plug PCIe slots.")
+            sys.exit(1)
+
+        return controllers, all(complete for _, complete in results)
+
+    def _select_sas_backend(self, controllers: List[BaseController]) -> List[BaseController]:
+        """Keep either sas2ircu/sas3ircu or the sas_end_device backend for mpt2sas/mpt3sas HBAs
+
+        Both report the same disks with different controller and enclosure
+        IDs. sas2ircu/sas3ircu stay in use where they are installed, unless
+        --sas-sysfs selects sysfs and every end device resolves to a bay;
+        with --enrich they then only fill in disk details.
+
+        Args:
+            controllers: Available controllers in priority order
+
+        Returns:
+            List of controllers to use
+        """
+        sas_ircu = [c for c in controllers if c.controller_type in self.SAS_IRCU_TYPES]
+        end_device = next((c for c in controllers if c.controller_type == "sas_end_device"), None)
+        if not sas_ircu or end_device is None:
+            return controllers
+
+        if self.sas_sysfs and end_device.resolves_all_disks():
+            if self.enrich:
+                end_device.set_enrichment(sas_ircu)
+            return [c for c in controllers if c not in sas_ircu]
+
+        if self.sas_sysfs:
+            self.logger.info("Not all SAS end devices resolve to an enclosure bay, using "
+                             f"{self._describe_controllers(sas_ircu)}")
+        return [c for c in controllers if c is not end_device]
+
+    def _select_ses_backend(self, controllers: List[BaseController]) -> List[BaseController]:
+        """Drop the SES backend if another backend reports the SAS topology, unless --ses is given
+
+        storcli, sas2ircu/sas3ircu and sas_end_device see the disks in SES
+        enclosures as well, so the SES backend would only add the same
+        enclosures a second time.
+
+        Args:
+            controllers: Available controllers in priority order
+
+        Returns:
+            List of controllers to use
+        """
+        if self.ses:
+            return controllers
+
+        sas_backends = [c for c in controllers if c.controller_type in self.SAS_TYPES]
+        if not sas_backends:
+            return controllers
+
+        self.logger.debug(f"SAS topology read by {self._describe_controllers(sas_backends)}, "
+                          f"skipping SES enclosures (use --ses to read them as well)")
+        return [c for c in controllers if c.controller_type != "ses"]
+
+    def _get_nvme_slot_table(self) -> Dict[str, NvmeSlotConfig]:
+        """Get the configured NVMe bays, if the configuration is loaded"""
+        return self.config_manager.get_nvme_slots() if self.config_manager else {}
+
+    def _describe_controllers(self, controllers: List[BaseController]) -> str:
+        """Describe controllers for log output (e.g. 'storcli (storcli2), sas3ircu')"""
+        descriptions = []
+        for controller in controllers:
+            if controller.cmd and controller.cmd != controller.controller_type:
+                descriptions.append(f"{controller.controller_type} ({controller.cmd})")
+            else:
+                descriptions.append(controller.controller_type)
+        return ", ".join(descriptions)
 
     def run(self) -> None:
         """Main entry point for the application"""
         # Parse arguments
         self.parse_arguments()
 
+        # A running daemon answers from memory
+        if self._uses_daemon() and self._handle_daemon_request():
+            return
+
+        # All controller commands share one runner, so the deadline covers the whole run
+        self.runner = CommandRunner(max_concurrency=self.max_concurrency, timeout=self.command_timeout,
+                                    logger=self.logger)
+        if self.deadline is not None:
+            self.runner.deadline = time.monotonic() + self.deadline
+
         # Initialize TrueNAS API
         self.truenas_api = TrueNASAPI(logger=self.logger)
 
@@ -188,21 +506,55 @@ class StorageTopology:
             self._handle_query()
             return
 
+        # Load configuration (the NVMe backend needs its slot table)
+        self.config_manager = ConfigManager(logger=self.logger)
+
         # Handle enclosure info
         if self.enclosure_id is not None:
             self._handle_enclosure_info()
             return
 
+        self.topology_cache = TopologyCache(logger=self.logger)
+
+        if self.daemon:
+            self._run_daemon()
+            return
+
+        if self.refresh_slot_location:
+            self._handle_refresh_slot()
+            return
+
+        if self.watch_interval is not None:
+            self._handle_watch()
+            return
+
+        # Background refresh started by a --stale-ok run
+        if self.refresh_cache:
+            self._refresh_topology_cache()
+            return
+
+        # Lookups served from the topology cache skip the controller scan
+        cached_disks = self._load_cached_disks() if self._uses_topology_cache() else None
+        if cached_disks is not None and not (self.locate_disk_name or self.locate_off_disk_name):
+            self.disks = cached_disks
+            self._display_results()
+            return
+
         # Detect controller
         self.controller = self.detect_controller()
 
+        self.disk_mapper = DiskMapper(self.config_manager, logger=self.logger)
+
         # Handle LED operations
+        if any((self.locate_disk_name, self.locate_off_disk_name, self.locate_all, self.locate_all_off)):
+            self._setup_led_timer()
+
         if self.locate_disk_name:
-            self._handle_locate_disk(self.locate_disk_name, False)
+            self._handle_locate_disk(self.locate_disk_name, False, cached_disks)
             return
 
         if self.locate_off_disk_name:
-            self._handle_locate_disk(self.locate_off_disk_name, True)
+            self._handle_locate_disk(self.locate_off_disk_name, True, cached_disks)
             return
 
         if self.locate_all:
@@ -213,34 +565,401 @@ class StorageTopology:
             self._handle_locate_all_disks(True)
             return
 
-        # Load configuration
-        self.config_manager = ConfigManager(logger=self.logger)
-        self.disk_mapper = DiskMapper(self.config_manager, logger=self.logger)
+        # Get disks and enclosures from controller, mapped to their locations
+        fingerprint = self._get_topology_fingerprint()
+        self.disks, enclosures, complete = self._collect_topology()
+
+        # A partial topology is not cached
+        if complete:
+            self.topology_cache.save(fingerprint, self.disks, enclosures)
+
+        # Handle update operations
+        if self.update_disk:
+            self._handle_update_disk()
+            return
+
+        if self.update_all_disks:
+            self._handle_update_all_disks()
+            return
+
+        # Display results
+        self._display_results()
+
+    def _collect_topology(self) -> Tuple[List[Disk], List[Enclosure], bool]:
+        """Collect disks and enclosures from the controller and map their locations
 
-        # Get disks and enclosures from controller
+        Returns:
+            Tuple of (mapped disks, enclosures, whether all sources finished in time)
+        """
         self.logger.info("Collecting disk information from controller...")
         controller_disks = self.controller.get_disks()
 
         self.logger.info("Getting enclosure information...")
         enclosures = self.controller.get_enclosures()
 
+        incomplete_sources = self.controller.get_incomplete_sources()
+        if incomplete_sources:
+            self.logger.warning(
+                f"Partial topology: {', '.join(incomplete_sources)} did not finish in time; "
+                f"affected disks are marked incomplete"
+            )
+
         # Match with system devices
-        self.disks = self.disk_mapper.match_with_system_devices(controller_disks)
+        disks = self.disk_mapper.match_with_system_devices(controller_disks)
 
         # Map locations
-        self.disks = self.disk_mapper.map_locations(self.disks, enclosures)
+        disks = self.disk_mapper.map_locations(disks, enclosures)
 
-        # Handle update operations
-        if self.update_disk:
-            self._handle_update_disk()
-            return
+        return disks, enclosures, not incomplete_sources
 
-        if self.update_all_disks:
-            self._handle_update_all_disks()
+    def _get_topology_fingerprint(self) -> str:
+        """Fingerprint of the block devices, configuration and backend options for the topology cache"""
+        options = {"controller": self.controller_type, "sas_sysfs": self.sas_sysfs, "enrich": self.enrich,
+                   "ses": self.ses}
+        return self.topology_cache.fingerprint(self.config_manager.config_file, options)
+
+    def _uses_topology_cache(self) -> bool:
+        """Check if this run may be answered from the topology cache
+
+        Only listings and single disk LED lookups are; updates and
+        --locate-all always work on a fresh scan.
+        """
+        if self.max_age is None and not self.stale_ok:
+            return False
+        return not any((self.update_disk, self.update_all_disks, self.locate_all, self.locate_all_off))
+
+    def _load_cached_disks(self) -> Optional[List[Disk]]:
+        """Load the mapped disks from the topology cache
+
+        Returns:
+            Cached disks, or None if there is no usable cache entry
+        """
+        cached = self.topology_cache.load(self._get_topology_fingerprint())
+        if cached is None:
+            return None
+
+        disks, _, age = cached
+        if age <= (self.max_age or 0):
+            self.logger.info(f"Using cached topology ({age:.0f}s old)")
+            return disks
+
+        if self.stale_ok:
+            self.logger.info(f"Using cached topology ({age:.0f}s old), refreshing it in the background")
+            self._spawn_cache_refresh()
+            return disks
+
+        self.logger.debug(f"Cached topology is {age:.0f}s old, rescanning")
+        return None
+
+    def _spawn_cache_refresh(self) -> None:
+        """Start a detached run of this script that rescans and saves the topology cache"""
+        script = os.path.abspath(sys.argv[0])
+        if not os.path.isfile(script):
+            self.logger.debug(f"Cannot refresh the topology cache in the background: {script} not found")
             return
 
-        # Display results
-        self._display_results()
+        cmd = [sys.executable, script, "--refresh-cache", "--quiet",
+               "--timeout", str(self.command_timeout), "--max-concurrency", str(self.max_concurrency)]
+        if self.controller_type:
+            cmd.extend(["--controller", self.controller_type])
+        if self.sas_sysfs:
+            cmd.append("--sas-sysfs")
+        if self.enrich:
+            cmd.append("--enrich")
+        if self.ses:
+            cmd.append("--ses")
+
+        try:
+            subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, start_new_session=True)
+        except OSError as e:
+            self.logger.debug(f"Could not start background topology refresh: {e}")
+
+    def _refresh_topology_cache(self) -> None:
+        """Rescan the topology and save it to the cache, unless another refresh is running"""
+        with self.topology_cache.refresh_lock() as acquired:
+            if not acquired:
+                self.logger.debug("Another topology refresh is already running")
+                return
+
+            fingerprint = self._get_topology_fingerprint()
+            self.controller = self.detect_controller()
+            self.disk_mapper = DiskMapper(self.config_manager, logger=self.logger)
+
+            disks, enclosures, complete = self._collect_topology()
+            if complete:
+                self.topology_cache.save(fingerprint, disks, enclosures)
+
+    def _uses_daemon(self) -> bool:
+        """Check if this run may be answered by a running daemon
+
+        Runs that select other backends, probe again or need TrueNAS
+        queries, enclosure details or foreground LED waits scan locally.
+        """
+        if self.daemon or self.no_daemon or self.refresh_cache or self.watch_interval is not None:
+            return False
+        if self.query_disk or self.enclosure_id is not None or self.wait_foreground:
+            return False
+        return not (self.controller_type or self.sas_sysfs or self.enrich or self.ses or self.redetect)
+
+    def _handle_daemon_request(self) -> bool:
+        """Send the requested operation to a running daemon
+
+        Returns:
+            bool: True if the daemon answered, False to fall back to a local scan
+        """
+        if self.locate_disk_name or self.locate_off_disk_name:
+            request = {"command": "locate", "disk": self.locate_disk_name or self.locate_off_disk_name,
+                       "off": bool(self.locate_off_disk_name), "wait": self.wait_seconds}
+        elif self.locate_all or self.locate_all_off:
+            wait_time = self.wait_seconds if self.wait_seconds is not None else 5
+            request = {"command": "locate", "all": True, "off": self.locate_all_off, "wait": wait_time}
+        elif self.refresh_slot_location:
+            request = {"command": "refresh_slot", "location": self.refresh_slot_location}
+        elif self.update_disk:
+            request = {"command": "update", "disk": self.update_disk}
+        elif self.update_all_disks:
+            request = {"command": "update", "all": True}
+        else:
+            request = {"command": "list"}
+
+        response = DaemonClient(timeout=self.command_timeout).request(request)
+        if response is None:
+            return False
+
+        if not response.get("ok"):
+            self.logger.error(response.get("error", "Daemon request failed"))
+            sys.exit(1)
+
+        self.logger.debug(f"Answered by daemon: {request['command']}")
+        action = "off" if request.get("off") else "on"
+
+        if request["command"] in ("list", "refresh_slot"):
+            self.disks = [Disk.from_dict(entry) for entry in response.get("disks", [])]
+            if request["command"] == "refresh_slot" and not self.disks and not self.json_output:
+                print(f"Slot {self.refresh_slot_location} is empty")
+            else:
+                self._display_results()
+        elif request["command"] == "locate" and request.get("all"):
+            print(f"Successfully turned {action} {response.get('success', 0)} disk LEDs")
+            if response.get("failed", 0) > 0:
+                print(f"Failed to turn {action} {response['failed']} disk LEDs")
+        elif request["command"] == "locate":
+            print(f"Successfully turned {action} LED for disk {request['disk']}")
+        elif request.get("all"):
+            print(f"\nSummary: Updated {response.get('updated', 0)} disks, "
+                  f"skipped {response.get('skipped', 0)} disks")
+        elif response.get("updated"):
+            print(f"Successfully updated disk: {response.get('disk')}")
+
+        return True
+
+    def _handle_watch(self) -> None:
+        """Print topology changes until interrupted
+
+        A running daemon is polled, as it keeps itself current. Otherwise
+        the topology is held in memory here: hotplug events patch it and
+        wake the watcher, and without them every interval checks whether the
+        block devices changed and rescans if so.
+        """
+        client = None
+        if not (self.no_daemon or self.controller_type or self.sas_sysfs or self.enrich or self.ses or
+                self.redetect):
+            client = DaemonClient(timeout=self.command_timeout)
+            if not client.is_running():
+                client = None
+
+        # Collection progress would bury the changes
+        if not self.verbose:
+            self.logger.setLevel(logging.WARNING)
+
+        if client:
+            self.logger.debug("Watching the topology of the running daemon")
+
+            def fetch() -> Optional[Topology]:
+                response = client.request({"command": "list"})
+                if not response or not response.get("ok"):
+                    return None
+                return [Disk.from_dict(entry) for entry in response.get("disks", [])], response.get("pools", {})
+
+            wait = time.sleep
+        else:
+            self.controller = self.detect_controller()
+            self.disk_mapper = DiskMapper(self.config_manager, logger=self.logger)
+            topology = TopologyDaemon(self, logger=self.logger)
+            topology.start_hotplug()
+
+            first = True
+
+            def fetch() -> Optional[Topology]:
+                # Later refreshes rescan only when block devices or configuration changed
+                nonlocal first
+                rescan, first = first, False
+                return topology.get_topology(rescan=rescan)
+
+            def wait(seconds: float) -> None:
+                # The hotplug thread holds the topology lock until its patch is applied
+                if topology.changed.wait(seconds):
+                    topology.changed.clear()
+
+        try:
+            TopologyWatcher(fetch, wait, self.watch_interval, json_output=self.json_output,
+                            logger=self.logger).run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if not client:
+                topology.stop_hotplug()
+
+    def _run_daemon(self) -> None:
+        """Scan the topology once and serve it until terminated"""
+        self.controller = self.detect_controller()
+        self.disk_mapper = DiskMapper(self.config_manager, logger=self.logger)
+        self._setup_led_timer()
+
+        try:
+            TopologyDaemon(self, logger=self.logger).serve_forever()
+        except DaemonError as e:
+            self.logger.error(str(e))
+            sys.exit(1)
+        except KeyboardInterrupt:
+            pass
+
+    def _find_bay(self, disks: List[Disk], enclosures: List[Enclosure],
+                  location: str) -> Optional[Tuple[str, str, int]]:
+        """Resolve ENCL:SLOT to the bay as the controller backend reports it
+
+        The location is looked up as enclosure name and physical slot of a
+        disk first, then as the backend's enclosure ID and slot, which also
+        works for a bay that was empty.
+
+        Returns:
+            Tuple of (controller ID, enclosure ID, slot), or None if unknown
+        """
+        name, _, slot_str = location.rpartition(":")
+        if not slot_str.isdigit():
+            return None
+        slot = int(slot_str)
+
+        for disk in disks:
+            if disk.enclosure_name == name and disk.physical_slot == slot:
+                return disk.controller, disk.enclosure, disk.slot
+        for disk in disks:
+            if disk.enclosure == name and disk.slot == slot:
+                return disk.controller, disk.enclosure, disk.slot
+        for enclosure in enclosures:
+            if enclosure.enclosure_id == name:
+                return enclosure.controller_id, enclosure.enclosure_id, slot
+
+        return None
+
+    def _refresh_bay(self, disks: List[Disk], enclosures: List[Enclosure],
+                     bay: Tuple[str, str, int]) -> Optional[List[Disk]]:
+        """Read one bay again and patch it into a topology
+
+        Args:
+            disks: Mapped disks of the topology
+            enclosures: Enclosures of the topology
+            bay: Tuple of (controller ID, enclosure ID, slot)
+
+        Returns:
+            Updated disks, or None if the backend cannot read a single bay
+        """
+        controller_id, enclosure_id, slot = bay
+        controller_disks = self.controller.refresh_slot(enclosure_id, slot, controller_id)
+        if controller_disks is None:
+            return None
+
+        # Backends reading sysfs already know the block device
+        devices = [disk.dev_name for disk in controller_disks]
+        matched = self.disk_mapper.match_with_system_devices(controller_disks, devices if all(devices) else None)
+        mapped = self.disk_mapper.map_locations(matched, enclosures)
+
+        dev_names = {disk.dev_name for disk in mapped}
+        return [disk for disk in disks
+                if (disk.controller, disk.enclosure, disk.slot) != bay and disk.dev_name not in dev_names] + mapped
+
+    def _changed_outside_bay(self, changed: Optional[Set[str]], old_disks: List[Disk],
+                             disks: List[Disk], bay: Tuple[str, str, int]) -> bool:
+        """Check if block devices changed that do not belong to a refreshed bay
+
+        Args:
+            changed: Names of block devices added, removed or changed since the
+                topology was collected, or None if unknown
+            old_disks: Disks before the bay was read again
+            disks: Disks after the bay was read again
+            bay: Tuple of (controller ID, enclosure ID, slot)
+
+        Returns:
+            bool: True if the rest of the topology may be outdated as well
+        """
+        if changed is None:
+            return True
+
+        kept = {id(disk) for disk in disks}
+        affected = [disk for disk in old_disks if id(disk) not in kept]
+        affected += [disk for disk in disks if (disk.controller, disk.enclosure, disk.slot) == bay]
+
+        device_names = set()
+        for disk in affected:
+            for dev in [disk.dev_name] + disk.paths:
+                if dev:
+                    device_names.add(os.path.basename(os.path.realpath(dev)))
+
+        return not changed <= device_names
+
+    def _handle_refresh_slot(self) -> None:
+        """Read a single bay again and update the cached topology
+
+        The cached entry keeps its age. If block devices outside the bay
+        changed since it was collected, the full topology is collected instead.
+        """
+        location = self.refresh_slot_location
+        fingerprint = self._get_topology_fingerprint()
+        cached = self.topology_cache.load_for_patch(fingerprint)
+
+        self.controller = self.detect_controller()
+        self.disk_mapper = DiskMapper(self.config_manager, logger=self.logger)
+
+        disks = None
+        bay = None
+        created = None
+        if cached is None:
+            self.logger.info("No cached topology, collecting the full topology")
+        else:
+            old_disks, enclosures, created, changed = cached
+            bay = self._find_bay(old_disks, enclosures, location)
+            if bay is None:
+                self.logger.error(f"Unknown bay: {location}")
+                sys.exit(1)
+
+            disks = self._refresh_bay(old_disks, enclosures, bay)
+            if disks is None:
+                self.logger.info(f"The {self.controller.controller_type} backend cannot read a single bay, "
+                                 f"collecting the full topology")
+            elif self._changed_outside_bay(changed, old_disks, disks, bay):
+                self.logger.info(f"Block devices outside slot {location} changed, collecting the full topology")
+                disks = None
+                self.controller.invalidate_snapshot()
+            complete = self.controller.complete
+
+        if disks is None:
+            disks, enclosures, complete = self._collect_topology()
+            bay = self._find_bay(disks, enclosures, location)
+            created = None
+
+        if complete:
+            self.topology_cache.save(fingerprint, disks, enclosures, created)
+
+        if bay is None:
+            self.logger.error(f"Unknown bay: {location}")
+            sys.exit(1)
+
+        self.disks = [disk for disk in disks if (disk.controller, disk.enclosure, disk.slot) == bay]
+        if not self.disks and not self.json_output:
+            print(f"Slot {location} is empty")
+        else:
+            self._display_results()
 
     def _handle_query(self) -> None:
         """Handle disk query operation"""
@@ -353,13 +1072,33 @@ class StorageTopology:
             print(f'    start_slot: 1')
             print()
 
-    def _handle_locate_disk(self, disk_name: str, turn_off: bool) -> None:
-        """Handle single disk LED operation"""
-        # Find disk by name
+    def _setup_led_timer(self) -> None:
+        """Attach the background LED timer so --wait does not block"""
+        led_timer = LedTimerService(logger=self.logger)
+
+        # Pick up turn-offs left behind by a helper that died
+        led_timer.resume_pending()
+
+        if not self.wait_foreground and led_timer.available:
+            self.controller.set_led_timer(led_timer)
+
+    def _handle_locate_disk(self, disk_name: str, turn_off: bool, cached_disks: Optional[List[Disk]] = None) -> None:
+        """Handle single disk LED operation
+
+        Args:
+            disk_name: Device name of the disk
+            turn_off: Whether to turn the LED off
+            cached_disks: Disks from the topology cache, if it may be used
+        """
+        # Find disk by name; controller disks only get device names from lsblk
         disk_name_short = disk_name.replace("/dev/", "")
+        if cached_disks is not None:
+            disks = cached_disks
+        else:
+            disks = self.disk_mapper.match_with_system_devices(self.controller.get_disks())
 
-        for disk in self.controller.get_disks():
-            if disk.dev_name.endswith(disk_name_short):
+        for disk in disks:
+            if disk.short_name == disk_name_short or f"/dev/{disk_name_short}" in disk.paths:
                 success = self.controller.locate_disk(disk, turn_off, self.wait_seconds)
                 if success:
                     action = "off" if turn_off else "on"
@@ -497,6 +1236,9 @@ class StorageTopology:
 
         # Create disk lookup dictionary
         disk_info = {disk.dev_name: disk for disk in self.disks}
+        for disk in self.disks:
+            for path in disk.paths:
+                disk_info.setdefault(path, disk)
 
         # Get zpool status
         try:
@@ -0,0 +1,39 @@
+"""Helpers for reading sysfs attributes"""
+
+import os
+
+
+def read_sysfs_attr(directory: str, name: str) -> str:
+    """Read a sysfs attribute
+
+    Args:
+        directory: Directory of the sysfs object
+        name: Attribute name, or a path relative to the directory
+
+    Returns:
+        str: Attribute value without surrounding whitespace, or "" if it cannot be read
+    """
+    try:
+        with open(os.path.join(directory, name), 'r', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def get_scsi_host_driver(kernel_name: str, sysfs_root: str = "/sys") -> str:
+    """Get the driver of the SCSI host a block device is attached to
+
+    Args:
+        kernel_name: Kernel name of the block device (e.g. 'sda')
+        sysfs_root: Root of the sysfs tree
+
+    Returns:
+        str: Driver name of the host (e.g. 'mpt3sas', 'megaraid_sas'), or "" if unknown
+    """
+    device_path = os.path.realpath(os.path.join(sysfs_root, "block", kernel_name, "device"))
+    while os.path.dirname(device_path) != device_path:
+        name = os.path.basename(device_path)
+        if name.startswith("host") and name[4:].isdigit():
+            return read_sysfs_attr(os.path.join(sysfs_root, "class", "scsi_host", name), "proc_name")
+        device_path = os.path.dirname(device_path)
+    return ""
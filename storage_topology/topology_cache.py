@@ -0,0 +1,249 @@
+"""Persistent cache of the mapped storage topology"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .models import Disk, Enclosure
+from .state import get_state_file, read_json, write_json
+from .sysfs import read_sysfs_attr
+
+
+class TopologyCache:
+    """Caches the mapped disks and enclosures of the last full run
+
+    An entry is valid while its fingerprint matches: the block devices in
+    /sys/block with their WWIDs, the modification time and size of the
+    configuration file and the options that select controller backends.
+    A valid entry older than the allowed age is stale; it may still be
+    served while a background run refreshes it.
+
+    Each entry also keeps the block devices it was collected with, so an
+    update of a single bay can tell whether other devices changed since.
+    """
+
+    CACHE_VERSION = 3
+    CACHE_FILE = "topology-cache.json"
+    LOCK_FILE = "topology-cache.lock"
+
+    # Block device maps of this many recent fingerprints are kept in memory
+    MAX_KNOWN_BLOCK_DEVICES = 16
+
+    def __init__(self, cache_file: Optional[str] = None, sysfs_root: str = "/sys",
+                 logger: Optional[logging.Logger] = None):
+        """Initialize topology cache
+
+        Args:
+            cache_file: Path to cache file (default: state directory)
+            sysfs_root: Root of the sysfs tree
+            logger: Logger instance
+        """
+        self.cache_file = cache_file or get_state_file(self.CACHE_FILE)
+        self.sysfs_root = sysfs_root
+        self.logger = logger or logging.getLogger(__name__)
+
+        # Block devices by the digest they were hashed to in fingerprint()
+        self._block_devices: Dict[str, Dict[str, str]] = {}
+
+    def fingerprint(self, config_file: str, options: Dict) -> str:
+        """Compute the fingerprint of the current block devices and configuration
+
+        Args:
+            config_file: Path to the configuration file
+            options: Command line options that change the collected topology
+
+        Returns:
+            str: '<setup digest>:<block device digest>', identifying the current setup
+        """
+        try:
+            stat = os.stat(config_file)
+            config = [os.path.abspath(config_file), stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            config = None
+
+        setup = {"config": config, "options": options}
+        block_devices = self._get_block_devices()
+        block_digest = self._digest(block_devices)
+
+        self._block_devices.pop(block_digest, None)
+        self._block_devices[block_digest] = block_devices
+        while len(self._block_devices) > self.MAX_KNOWN_BLOCK_DEVICES:
+            del self._block_devices[next(iter(self._block_devices))]
+
+        return f"{self._digest(setup)}:{block_digest}"
+
+    def changed_block_devices(self, old_fingerprint: str, fingerprint: str) -> Optional[Set[str]]:
+        """Get the block devices that differ between two fingerprints
+
+        Args:
+            old_fingerprint: Earlier fingerprint
+            fingerprint: Current fingerprint
+
+        Returns:
+            Names of added, removed or changed block devices, or None if either
+            fingerprint is unknown or the configuration or options differ
+        """
+        if old_fingerprint.split(":")[0] != fingerprint.split(":")[0]:
+            return None
+
+        old = self._block_devices.get(old_fingerprint.split(":")[-1])
+        current = self._block_devices.get(fingerprint.split(":")[-1])
+        if old is None or current is None:
+            return None
+
+        return self._diff_block_devices(old, current)
+
+    def load(self, fingerprint: str,
+             ignore_block_devices: bool = False) -> Optional[Tuple[List[Disk], List[Enclosure], float]]:
+        """Load the cached topology
+
+        Args:
+            fingerprint: Current fingerprint
+            ignore_block_devices: Accept an entry whose block devices differ, for
+                callers that update the changed disks themselves
+
+        Returns:
+            Tuple of (disks, enclosures, age in seconds), or None if missing or invalid
+        """
+        entry = self._read_entry(fingerprint, ignore_block_devices)
+        if entry is None:
+            return None
+
+        disks, enclosures, created, _ = entry
+        return disks, enclosures, max(0.0, time.time() - created)
+
+    def load_for_patch(self, fingerprint: str
+                       ) -> Optional[Tuple[List[Disk], List[Enclosure], float, Optional[Set[str]]]]:
+        """Load the cached topology for updating part of it
+
+        Args:
+            fingerprint: Current fingerprint
+
+        Returns:
+            Tuple of (disks, enclosures, creation time, names of block devices
+            added, removed or changed since, or None if unknown), or None if
+            missing or invalid
+        """
+        entry = self._read_entry(fingerprint, ignore_block_devices=True)
+        if entry is None:
+            return None
+
+        disks, enclosures, created, block_devices = entry
+        current = self._block_devices.get(fingerprint.split(":")[-1])
+        if block_devices is None or current is None:
+            return disks, enclosures, created, None
+
+        return disks, enclosures, created, self._diff_block_devices(block_devices, current)
+
+    def save(self, fingerprint: str, disks: List[Disk], enclosures: List[Enclosure],
+             created: Optional[float] = None) -> None:
+        """Save a mapped topology
+
+        Args:
+            fingerprint: Fingerprint taken before the topology was collected
+            disks: Mapped disks
+            enclosures: Enclosures
+            created: When the topology was collected (default: now), kept by
+                callers that only updated part of a cached topology
+        """
+        if not self.cache_file:
+            return
+
+        data = {
+            "version": self.CACHE_VERSION,
+            "fingerprint": fingerprint,
+            "created": time.time() if created is None else created,
+            "block_devices": self._block_devices.get(fingerprint.split(":")[-1]),
+            "disks": [disk.to_dict() for disk in disks],
+            "enclosures": [enclosure.to_dict() for enclosure in enclosures]
+        }
+        if write_json(self.cache_file, data):
+            self.logger.debug(f"Saved topology cache to {self.cache_file}")
+        else:
+            self.logger.debug(f"Could not write topology cache {self.cache_file}")
+
+    @contextmanager
+    def refresh_lock(self) -> Iterator[bool]:
+        """Hold the refresh lock, so only one background refresh runs at a time
+
+        Yields:
+            bool: True if the lock was acquired, False if another refresh holds it
+        """
+        lock_path = get_state_file(self.LOCK_FILE)
+        if not lock_path:
+            yield True
+            return
+
+        with open(lock_path, 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+
+    def _read_entry(self, fingerprint: str, ignore_block_devices: bool
+                    ) -> Optional[Tuple[List[Disk], List[Enclosure], float, Optional[Dict[str, str]]]]:
+        """Read the cache entry if it matches the fingerprint
+
+        Returns:
+            Tuple of (disks, enclosures, creation time, block devices of the
+            entry), or None if missing, invalid or not matching
+        """
+        if not self.cache_file:
+            return None
+
+        data = read_json(self.cache_file)
+        if not isinstance(data, dict) or data.get("version") != self.CACHE_VERSION:
+            return None
+
+        cached = str(data.get("fingerprint", ""))
+        if ignore_block_devices:
+            matches = cached.split(":")[0] == fingerprint.split(":")[0]
+        else:
+            matches = cached == fingerprint
+        if not matches:
+            self.logger.debug("Topology cache does not match the current block devices or configuration")
+            return None
+
+        try:
+            disks = [Disk.from_dict(entry) for entry in data.get("disks", [])]
+            enclosures = [Enclosure.from_dict(entry) for entry in data.get("enclosures", [])]
+            created = float(data.get("created", 0))
+        except (AttributeError, TypeError, ValueError) as e:
+            self.logger.debug(f"Ignoring invalid topology cache {self.cache_file}: {e}")
+            return None
+
+        block_devices = data.get("block_devices")
+        return disks, enclosures, created, block_devices if isinstance(block_devices, dict) else None
+
+    @staticmethod
+    def _diff_block_devices(old: Dict[str, str], current: Dict[str, str]) -> Set[str]:
+        """Get the names of block devices added, removed or with another WWID"""
+        return {name for name in set(old) | set(current) if old.get(name) != current.get(name)}
+
+    @staticmethod
+    def _digest(data) -> str:
+        """Hash JSON-serializable data"""
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def _get_block_devices(self) -> Dict[str, str]:
+        """Get all block devices in sysfs with their WWIDs"""
+        block_dir = os.path.join(self.sysfs_root, "block")
+        devices = {}
+
+        try:
+            names = os.listdir(block_dir)
+        except OSError:
+            return devices
+
+        for name in names:
+            devices[name] = (read_sysfs_attr(os.path.join(block_dir, name, "device"), "wwid")
+                             or read_sysfs_attr(os.path.join(block_dir, name), "wwid"))
+
+        return devices
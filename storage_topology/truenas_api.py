@@ -6,6 +6,7 @@ import subprocess
 import re
 from typing import List, Dict, Any, Optional
 
+from .command_runner import CommandRunner
 from .models import Disk
 
 
@@ -19,6 +20,7 @@ class TrueNASAPI:
             logger: Logger instance
         """
         self.logger = logger or logging.getLogger(__name__)
+        self.runner = CommandRunner(logger=self.logger)
 
     def query_disk(self, disk_name: str = None) -> List[Dict[str, Any]]:
         """Query disk information from TrueNAS
@@ -328,8 +330,8 @@ class TrueNASAPI:
         """Execute a command and return output"""
         self.logger.debug(f"Executing command: {' '.join(cmd)}")
         try:
-            output = subprocess.check_output(cmd, universal_newlines=True)
-            return output
+            output = self.runner.run(cmd, merge_stderr=False).check()
+            return output.decode('utf-8', errors='replace')
         except subprocess.CalledProcessError as e:
             self.logger.error(f"Command failed: {' '.join(cmd)}")
             raise
@@ -0,0 +1,136 @@
+"""Live watch mode printing only changes of the storage topology"""
+
+import json
+import logging
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .models import Disk
+
+# Topology as returned by a watch source: disks and pool mapping by disk name
+Topology = Tuple[List[Disk], Dict[str, Dict[str, str]]]
+
+
+def _disk_key(disk: Disk) -> str:
+    """Identify a disk across refreshes, independent of device name and slot"""
+    return disk.serial or disk.wwn or disk.dev_name
+
+
+def _location(disk: Disk) -> str:
+    """Get the displayed location of a disk"""
+    return disk.location or f"{disk.enclosure}:{disk.slot}"
+
+
+def _pool_states(pools: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    """Get the state of each pool from the pool mapping by disk name"""
+    return {info.get("pool", ""): info.get("state", "") for info in pools.values() if info.get("pool")}
+
+
+def diff_topology(old: Topology, new: Topology) -> List[Dict[str, str]]:
+    """Compare two topologies
+
+    Args:
+        old: Previous disks and pool mapping
+        new: Current disks and pool mapping
+
+    Returns:
+        List of changes, each with 'change' set to added, removed, moved,
+        renamed or pool_state and the details of the disk or pool
+    """
+    changes = []
+    old_disks = {_disk_key(disk): disk for disk in old[0]}
+    new_disks = {_disk_key(disk): disk for disk in new[0]}
+
+    for key, disk in new_disks.items():
+        previous = old_disks.get(key)
+        if previous is None:
+            changes.append({"change": "added", "serial": disk.serial, "dev_name": disk.dev_name,
+                            "location": _location(disk)})
+            continue
+
+        if _location(previous) != _location(disk):
+            changes.append({"change": "moved", "serial": disk.serial, "dev_name": disk.dev_name,
+                            "from": _location(previous), "to": _location(disk)})
+        if previous.dev_name != disk.dev_name:
+            changes.append({"change": "renamed", "serial": disk.serial, "location": _location(disk),
+                            "from": previous.dev_name, "to": disk.dev_name})
+
+    for key, disk in old_disks.items():
+        if key not in new_disks:
+            changes.append({"change": "removed", "serial": disk.serial, "dev_name": disk.dev_name,
+                            "location": _location(disk)})
+
+    old_pools = _pool_states(old[1])
+    new_pools = _pool_states(new[1])
+    for pool in sorted(set(old_pools) | set(new_pools)):
+        if old_pools.get(pool) != new_pools.get(pool):
+            changes.append({"change": "pool_state", "pool": pool,
+                            "from": old_pools.get(pool, "absent"), "to": new_pools.get(pool, "absent")})
+
+    return changes
+
+
+def format_change(change: Dict[str, str]) -> str:
+    """Format a change as a line of text"""
+    kind = change["change"]
+    if kind == "added":
+        return f"+ {change['dev_name']} (S/N: {change['serial']}) added in {change['location']}"
+    if kind == "removed":
+        return f"- {change['dev_name']} (S/N: {change['serial']}) removed from {change['location']}"
+    if kind == "moved":
+        return f"~ {change['dev_name']} (S/N: {change['serial']}) moved from {change['from']} to {change['to']}"
+    if kind == "renamed":
+        return f"~ {change['from']} (S/N: {change['serial']}) in {change['location']} is now {change['to']}"
+    return f"~ pool {change['pool']} state changed from {change['from']} to {change['to']}"
+
+
+class TopologyWatcher:
+    """Refreshes the topology and prints what changed since the last refresh"""
+
+    def __init__(self, fetch: Callable[[], Optional[Topology]], wait: Callable[[float], None],
+                 interval: float, json_output: bool = False, logger: Optional[logging.Logger] = None):
+        """Initialize the watcher
+
+        Args:
+            fetch: Returns the current topology, or None if it is unavailable
+            wait: Sleeps up to the given number of seconds, returning early on hotplug events
+            interval: Seconds between refreshes
+            json_output: Print one JSON object per change instead of text
+            logger: Logger instance
+        """
+        self.fetch = fetch
+        self.wait = wait
+        self.interval = interval
+        self.json_output = json_output
+        self.logger = logger or logging.getLogger(__name__)
+
+    def run(self) -> None:
+        """Print changes until interrupted"""
+        current = self.fetch()
+        while current is None:
+            self.wait(self.interval)
+            current = self.fetch()
+
+        # Status goes to stderr, so stdout only carries changes
+        print(f"Watching {len(current[0])} disks, refreshing every {self.interval:g}s", file=sys.stderr)
+
+        while True:
+            self.wait(self.interval)
+            topology = self.fetch()
+            if topology is None:
+                self.logger.debug("Topology unavailable, keeping the previous one")
+                continue
+
+            for change in diff_topology(current, topology):
+                self._print_change(change)
+            current = topology
+
+    def _print_change(self, change: Dict[str, str]) -> None:
+        """Print a single change with a timestamp"""
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if self.json_output:
+            print(json.dumps({"time": timestamp, **change}))
+        else:
+            print(f"{timestamp} {format_change(change)}")
+        sys.stdout.flush()